@@ -1,14 +1,33 @@
 
 from http import HTTPStatus
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash
+from flask import Flask, Request, Response, render_template, request, redirect, url_for, session, jsonify, flash, send_file, stream_with_context
 import sqlite3
+import json
 import os
+import click
+import hashlib
 import secrets
+from werkzeug.http import is_resource_modified
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
 import datetime
 from datetime import timedelta
-from services.certificate_service import process_certificate
+from services import bulk_ingest, duplicate_index, export_jobs, ocr_queue
+from services.batch_verify import ResultCache, verify_batch
+from services.achievement_import import import_achievements, read_csv_rows
+from services.user_import import import_users
+from services.upload_service import (
+    SpooledUpload, collect_garbage, discard_upload, import_legacy_uploads, receive_upload, store_blob
+)
+from services.export_service import get_export, gzip_stream, iter_csv
+from services.export_jobs import FORMATS as EXPORT_FORMATS, download_name, enqueue_export, job_status
+from utils import db, migrations
+from utils.stats import SYSTEM_COUNTER_QUERIES, check_system_counters, rebuild_teacher_stats
+from utils.db import get_db
+from utils.pagination import paginate, page_size, page_url
+from utils.verification_token import REVOKED, STALE, RevocationSet, make_token, read_token
+from utils.card_renderer import FORMATS as CARD_FORMATS, card_values, open_cached_card, download_name as card_download_name
+from utils.qr_handler import get_qr_png, get_token_verification_url, get_verification_url
 from flask_wtf import CSRFProtect
 
 try:
@@ -27,6 +46,10 @@ app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=2)
 app.config['SESSION_COOKIE_SECURE'] = os.environ.get('FLASK_ENV') == 'production'
 
+# Teacher dashboard performance tiers: minimum achievements per student
+app.config['TOP_PERFORMER_MIN_ACHIEVEMENTS'] = int(os.environ.get('TOP_PERFORMER_MIN_ACHIEVEMENTS', 5))
+app.config['AVERAGE_PERFORMER_MIN_ACHIEVEMENTS'] = int(os.environ.get('AVERAGE_PERFORMER_MIN_ACHIEVEMENTS', 2))
+
 @app.before_request
 def make_session_permanent():
     session.permanent = True
@@ -35,66 +58,73 @@ def make_session_permanent():
 
 
 # ✅ Portable DB path (works on Windows/Linux/Vercel)
-DB_PATH = os.path.join(os.path.dirname(__file__), "ams.db")
+DB_PATH = os.environ.get("DB_PATH", os.path.join(os.path.dirname(__file__), "ams.db"))
+app.config["DB_PATH"] = DB_PATH
+
+# Pooled per-thread SQLite connections, handed to each request via flask.g
+db.init_app(app)
 
 # Define upload folder path for certificates
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "uploads")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 
-def ensure_achievements_schema(connection):
-    cursor = connection.cursor()
-    cursor.execute("PRAGMA table_info(achievements)")
-    columns = cursor.fetchall()
-    column_names = [c[1] for c in columns]
-
-    # Add teacher_id if missing
-    if "teacher_id" not in column_names:
-        cursor.execute("ALTER TABLE achievements ADD COLUMN teacher_id TEXT DEFAULT 'unknown'")
-
-    # Add created_at if missing
-    if "created_at" not in column_names:
-        cursor.execute("ALTER TABLE achievements ADD COLUMN created_at TEXT")
-        cursor.execute("UPDATE achievements SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
-
-    # Add certificate_hash if missing
-    if "certificate_hash" not in column_names:
-        cursor.execute("ALTER TABLE achievements ADD COLUMN certificate_hash TEXT")
-    
-    # This works even if the column was added via ALTER TABLE earlier
-    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_cert_hash ON achievements (certificate_hash)")
+class UploadRequest(Request):
+    """Request whose certificate uploads are parsed straight into UPLOAD_FOLDER, hashed"""
 
-    connection.commit()
+    # Routes whose file parts end up in UPLOAD_FOLDER
+    spooled_endpoints = {"submit_achievements"}
 
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint in self.spooled_endpoints:
+            return SpooledUpload(UPLOAD_FOLDER)
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
 
 
-def add_profile_picture_column():
-    """
-    Add profile_picture column to student table if it doesn't exist
-    """
-    try:
-        connection = sqlite3.connect(DB_PATH)
-        cursor = connection.cursor()
+app.request_class = UploadRequest
 
-        # Check if profile_picture column exists in student table
-        cursor.execute("PRAGMA table_info(student)")
-        columns = cursor.fetchall()
-        column_names = [column[1] for column in columns]
+# Finished background exports are written here and served for download
+app.config["EXPORT_FOLDER"] = os.environ.get("EXPORT_FOLDER", os.path.join(app.instance_path, "exports"))
+app.config["EXPORT_WORKERS"] = int(os.environ.get("EXPORT_WORKERS", 2))
 
-        if "profile_picture" not in column_names:
-            print("Adding profile_picture column to student table...")
-            cursor.execute(
-                "ALTER TABLE student ADD COLUMN profile_picture TEXT"
-            )
-            connection.commit()
-            print("profile_picture column added successfully!")
-        else:
-            print("profile_picture column already exists in student table")
+# Hamming distance (of 64 dHash bits) under which two certificates are flagged as likely duplicates
+app.config["NEAR_DUPLICATE_MAX_DISTANCE"] = int(os.environ.get("NEAR_DUPLICATE_MAX_DISTANCE", 10))
 
-        connection.close()
-    except sqlite3.Error as e:
-        print(f"Error adding profile_picture column: {e}")
+# Certificate OCR worker threads per app process; 0 leaves it to `flask ocr-worker`
+app.config["OCR_WORKERS"] = int(os.environ.get("OCR_WORKERS", 2))
+
+# Rows accepted by one bulk achievement import request
+app.config["BULK_IMPORT_MAX_ROWS"] = int(os.environ.get("BULK_IMPORT_MAX_ROWS", 2000))
+
+# Admin CSV onboarding: rows per upload, and password hashing processes (0: one per CPU)
+app.config["USER_IMPORT_MAX_ROWS"] = int(os.environ.get("USER_IMPORT_MAX_ROWS", 10000))
+app.config["USER_IMPORT_WORKERS"] = int(os.environ.get("USER_IMPORT_WORKERS", 0))
 
+# Rendered verification QR codes, keyed by the URL they encode
+app.config["QR_CACHE_FOLDER"] = os.environ.get("QR_CACHE_FOLDER", os.path.join(app.instance_path, "qr"))
+QR_MAX_AGE = 365 * 24 * 3600
+
+# Public verification page caching: browsers, then shared caches/CDNs (seconds)
+app.config["VERIFY_MAX_AGE"] = int(os.environ.get("VERIFY_MAX_AGE", 60))
+app.config["VERIFY_SHARED_MAX_AGE"] = int(os.environ.get("VERIFY_SHARED_MAX_AGE", 300))
+# Bump when verify_achievement.html changes so cached pages are replaced
+VERIFY_PAGE_VERSION = 2
+
+# QR codes carry signed tokens; set a stable key so they survive restarts
+app.config["VERIFY_TOKEN_SECRET"] = os.environ.get("VERIFY_TOKEN_SECRET", app.secret_key)
+# How stale the in-memory token revocation set may get (seconds)
+app.config["VERIFY_REVOCATION_TTL"] = float(os.environ.get("VERIFY_REVOCATION_TTL", 10))
+token_revocations = RevocationSet()
+
+# Batch verification API: ids per request, and the per-id result cache
+app.config["VERIFY_BATCH_MAX_ITEMS"] = int(os.environ.get("VERIFY_BATCH_MAX_ITEMS", 500))
+verify_batch_cache = ResultCache(
+    max_size=int(os.environ.get("VERIFY_BATCH_CACHE_SIZE", 10000)),
+    ttl=float(os.environ.get("VERIFY_BATCH_CACHE_TTL", app.config["VERIFY_MAX_AGE"]))
+)
+
+# Server-rendered export cards (PNG/PDF), one folder per achievement
+app.config["CARD_CACHE_FOLDER"] = os.environ.get("CARD_CACHE_FOLDER", os.path.join(app.instance_path, "cards"))
 
 
 # Define a function to check allowed file extensions
@@ -106,7 +136,7 @@ def allowed_file(filename):
 # Initialize database on startup
 # Initialize database on startup
 def init_db():
-    connection = sqlite3.connect(DB_PATH)
+    connection = db.connect(DB_PATH)
     cursor = connection.cursor()
 
     # Student table
@@ -252,8 +282,174 @@ def init_db():
 
 
 
+def migrate_db():
+    """Apply pending schema migrations (see utils/migrations.py)."""
+    connection = db.connect(DB_PATH)
+    try:
+        return migrations.run_migrations(connection)
+    finally:
+        connection.close()
+
+
+def fail_stale_export_jobs():
+    """Export jobs run in-process, so any whose process died never finish"""
+    connection = db.connect(DB_PATH)
+    try:
+        return export_jobs.fail_stale(connection)
+    finally:
+        connection.close()
+
+
+@app.cli.command("migrate")
+def migrate_command():
+    """Apply pending schema migrations: flask --app app migrate"""
+    init_db()
+    applied = migrate_db()
+    for version, description in applied:
+        print(f"Applied migration {version}: {description}")
+    if not applied:
+        print("Database schema is up to date")
+
+
+@app.cli.command("rebuild-stats")
+def rebuild_stats_command():
+    """Recompute teacher dashboard statistics: flask --app app rebuild-stats"""
+    connection = db.connect(DB_PATH)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        teachers = rebuild_teacher_stats(connection)
+        connection.commit()
+    finally:
+        connection.close()
+    print(f"Rebuilt statistics for {teachers} teachers")
+
+
+@app.cli.command("ocr-worker")
+@click.option("--once", is_flag=True, help="Process the jobs queued now and exit.")
+@click.option("--reprocess", is_flag=True, help="Queue every certificate again first (uses cached OCR text).")
+def ocr_worker_command(once, reprocess):
+    """Run certificate OCR jobs: flask --app app ocr-worker [--once] [--reprocess]"""
+    if reprocess:
+        connection = db.connect(DB_PATH)
+        try:
+            queued = ocr_queue.requeue_all(connection, os.path.dirname(UPLOAD_FOLDER))
+        finally:
+            connection.close()
+        print(f"Queued {queued} certificates for reprocessing")
+    if once:
+        try:
+            print(f"Processed {ocr_queue.drain(DB_PATH)} OCR jobs")
+        finally:
+            db.close_thread_connections()
+    else:
+        ocr_queue.run_forever(DB_PATH)
+
+
+@app.cli.command("import-uploads")
+def import_uploads_command():
+    """Move legacy certificate files into content-addressed storage: flask --app app import-uploads"""
+    connection = db.connect(DB_PATH)
+    try:
+        report = import_legacy_uploads(connection, UPLOAD_FOLDER)
+    finally:
+        connection.close()
+    print(f"Moved {report['moved']} files, removed {report['duplicates']} duplicates "
+          f"({report['bytes_reclaimed']} bytes reclaimed)")
+
+
+@app.cli.command("gc-uploads")
+def gc_uploads_command():
+    """Delete certificate files no achievement references: flask --app app gc-uploads"""
+    connection = db.connect(DB_PATH)
+    try:
+        removed = collect_garbage(connection, UPLOAD_FOLDER)
+    finally:
+        connection.close()
+    print(f"Removed {removed} unreferenced certificate files")
+
+
+@app.cli.command("backfill-phash")
+def backfill_phash_command():
+    """Compute perceptual hashes for older certificates: flask --app app backfill-phash"""
+    connection = db.connect(DB_PATH)
+    try:
+        rows = connection.execute("""
+            SELECT id, certificate_path FROM achievements
+            WHERE certificate_phash IS NULL AND certificate_path IS NOT NULL
+        """).fetchall()
+        updates = []
+        for achievement_id, certificate_path in rows:
+            phash = duplicate_index.certificate_phash(os.path.join(os.path.dirname(UPLOAD_FOLDER), certificate_path))
+            if phash:
+                updates.append((phash, achievement_id))
+        with connection:
+            connection.executemany("UPDATE achievements SET certificate_phash = ? WHERE id = ?", updates)
+    finally:
+        connection.close()
+    duplicate_index.reset()
+    print(f"Hashed {len(updates)} of {len(rows)} certificates")
+
+
+@app.cli.command("ingest-certificates")
+@click.argument("source", type=click.Path(exists=True))
+@click.option("--teacher", "teacher_id", required=True, help="Teacher the achievements are recorded under.")
+@click.option("--manifest", type=click.Path(exists=True, dir_okay=False),
+              help="CSV manifest (default: manifest.csv inside SOURCE).")
+@click.option("--workers", type=int, default=None, help="OCR processes (default: one per CPU).")
+@click.option("--batch-size", type=int, default=bulk_ingest.DEFAULT_BATCH_SIZE, show_default=True,
+              help="Achievements inserted per transaction.")
+def ingest_certificates_command(source, teacher_id, manifest, workers, batch_size):
+    """Load a directory or ZIP of certificates: flask --app app ingest-certificates SOURCE --teacher T001"""
+    connection = db.connect(DB_PATH)
+    try:
+        report = bulk_ingest.ingest(
+            connection, source, UPLOAD_FOLDER, teacher_id, manifest_path=manifest,
+            workers=workers, batch_size=batch_size,
+            max_distance=app.config["NEAR_DUPLICATE_MAX_DISTANCE"],
+            progress=lambda done, total: print(f"  inserted {done}/{total}"),
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    finally:
+        connection.close()
+
+    for line, name, message in report["errors"]:
+        print(f"line {line} ({name}): {message}")
+    timings = report["timings"]
+    print(f"{report['inserted']} of {report['rows']} rows inserted, {report['duplicates']} duplicates, "
+          f"{len(report['errors'])} skipped")
+    print(f"OCR: {report['ocr_run']} run, {report['ocr_cached']} from cache, {report['queued']} queued for ocr-worker")
+    print(f"{report['bytes'] / 1e6:.1f} MB in {timings['total']:.1f}s "
+          f"(copy and hash {timings['stage']:.1f}s, OCR and insert {timings['process']:.1f}s): "
+          f"{report['inserted'] / max(timings['total'], 1e-9):.1f} certificates/s")
+
+
+@app.cli.command("check-counters")
+@click.option("--repair", is_flag=True, help="Overwrite drifted counters with recounted values.")
+def check_counters_command(repair):
+    """Verify admin dashboard counters: flask --app app check-counters [--repair]"""
+    connection = db.connect(DB_PATH)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        drift = check_system_counters(connection, repair=repair)
+        connection.commit()
+    finally:
+        connection.close()
+
+    for name, (stored, actual) in drift.items():
+        print(f"{name}: stored {stored}, actual {actual}")
+    if not drift:
+        print("System counters are consistent")
+    elif repair:
+        print(f"Repaired {len(drift)} counters")
+
+
 # Call initialization function
 init_db()
+migrate_db()
+fail_stale_export_jobs()
+# Jobs queued before a restart (or by ingest-certificates) shouldn't wait for the next upload
+ocr_queue.start_workers(DB_PATH, app.config["OCR_WORKERS"])
 
 # Permission decorators for RBAC
 def login_required(f):
@@ -307,6 +503,9 @@ def teacher_required(f):
     return decorated_function
 
 
+app.jinja_env.globals["page_url"] = page_url
+
+
 @app.context_processor
 def inject_csrf():
     """Provide csrf_token() for templates that expect it (e.g. tests)."""
@@ -410,8 +609,6 @@ def submit_achievements():
 
     if request.method == "POST":
         try:
-            import hashlib
-            
             # Extract standard form data
             student_id = request.form.get("student_id")
             achievement_type = request.form.get("achievement_type")
@@ -442,6 +639,19 @@ def submit_achievements():
 
             certificate_path = None
             certificate_hash = None
+            certificate_phash = None
+            near_duplicate = None
+
+            connection = get_db()
+            cursor = connection.cursor()
+
+            # Validate Student before any file is stored
+            cursor.execute("SELECT student_name FROM student WHERE student_id = ?", (student_id,))
+            student_row = cursor.fetchone()
+            if not student_row:
+                return render_template("submit_achievements.html", error="Student ID not found.")
+
+            student_name = student_row[0]
 
             # -----------------------------
             # FILE & HASH HANDLING
@@ -453,86 +663,182 @@ def submit_achievements():
                     if not allowed_file(file.filename):
                         return render_template("submit_achievements.html", error="Invalid file type.")
 
-                    # 1. Read bytes for hashing
-                    file.seek(0) 
-                    file_bytes = file.read()
-                    certificate_hash = hashlib.sha256(file_bytes).hexdigest()
-                    file.seek(0) # 2. Reset pointer so we can save it later
-
-                    # 3. DB Check for existing Hash
-                    with sqlite3.connect(DB_PATH) as check_conn:
-                        cursor = check_conn.cursor()
-                        cursor.execute("SELECT id FROM achievements WHERE certificate_hash = ?", (certificate_hash,))
-                        if cursor.fetchone():
-                            return render_template("submit_achievements.html", 
-                                                 error="Duplicate detected! This certificate is already registered.")
-
-                    # 4. Save File if check passed
-                    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-                    secure_name = f"{timestamp}_{secure_filename(file.filename)}"
-                    file_path = os.path.join(UPLOAD_FOLDER, secure_name)
-                    file.save(file_path)
-                    certificate_path = f"uploads/{secure_name}"
-
-                    # 5. Optional OCR
-                    try:
-                        res = process_certificate(file_path)
-                        parsed = res.get("parsed_data", {})
-                        event_name = event_name or parsed.get("event_name")
-                        achievement_date = achievement_date or parsed.get("achievement_date")
-                    except Exception as ocr_err:
-                        print(f"OCR failed: {ocr_err}")
+                    # 1. Stream to a temp file, hashing in the same pass
+                    upload = receive_upload(file, UPLOAD_FOLDER)
+                    certificate_hash = upload.sha256
+
+                    # 2. DB Check for existing Hash
+                    cursor.execute("SELECT id FROM achievements WHERE certificate_hash = ?", (certificate_hash,))
+                    if cursor.fetchone():
+                        discard_upload(upload)
+                        return render_template("submit_achievements.html", 
+                                             error="Duplicate detected! This certificate is already registered.")
+
+                    # 3. Store under its hash if check passed (ab/cd/<sha256>.<ext>). The
+                    # blobs row is written in the same transaction as the achievement;
+                    # if that rolls back, gc-uploads sweeps the file.
+                    extension = file.filename.rsplit(".", 1)[1].lower()
+                    file_path, certificate_path = store_blob(cursor, upload, UPLOAD_FOLDER, extension)
+
+                    # 4. Flag re-scans/re-compressed copies the exact hash misses
+                    certificate_phash = duplicate_index.certificate_phash(file_path)
+                    similar = duplicate_index.find_near_duplicates(
+                        connection, certificate_phash, app.config["NEAR_DUPLICATE_MAX_DISTANCE"], limit=1
+                    )
+                    near_duplicate = similar[0] if similar else None
+
+                    # 5. OCR runs in the background and fills in whatever
+                    # the form left blank once it finishes
+                    event_name = event_name or ""
+                    achievement_date = achievement_date or ""
+                    organizer = organizer or ""
+                    position = position or ""
 
             # -----------------------------
             # DATABASE INSERT
             # -----------------------------
-            with sqlite3.connect(DB_PATH) as connection:
-                cursor = connection.cursor()
-                ensure_achievements_schema(connection)
-
-                # Validate Student
-                cursor.execute("SELECT student_name FROM student WHERE student_id = ?", (student_id,))
-                student_row = cursor.fetchone()
-                if not student_row:
-                    return render_template("submit_achievements.html", error="Student ID not found.")
-                
-                student_name = student_row[0]
-
-                query = """
-                    INSERT INTO achievements (
-                        student_id, teacher_id, achievement_type, event_name, achievement_date,
-                        organizer, position, achievement_description, certificate_path,
-                        symposium_theme, programming_language, coding_platform, paper_title,
-                        journal_name, conference_level, conference_role, team_size,
-                        project_title, database_type, difficulty_level, other_description,
-                        certificate_hash
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """
-                
-                params = (
+            query = """
+                INSERT INTO achievements (
                     student_id, teacher_id, achievement_type, event_name, achievement_date,
                     organizer, position, achievement_description, certificate_path,
-                    details["symposium_theme"], details["programming_language"], 
-                    details["coding_platform"], details["paper_title"], details["journal_name"], 
-                    details["conference_level"], details["conference_role"], team_size,
-                    details["project_title"], details["database_type"], 
-                    details["difficulty_level"], details["other_description"], certificate_hash
-                )
+                    symposium_theme, programming_language, coding_platform, paper_title,
+                    journal_name, conference_level, conference_role, team_size,
+                    project_title, database_type, difficulty_level, other_description,
+                    certificate_hash, certificate_phash, near_duplicate_of
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """
+            
+            params = (
+                student_id, teacher_id, achievement_type, event_name, achievement_date,
+                organizer, position, achievement_description, certificate_path,
+                details["symposium_theme"], details["programming_language"], 
+                details["coding_platform"], details["paper_title"], details["journal_name"], 
+                details["conference_level"], details["conference_role"], team_size,
+                details["project_title"], details["database_type"], 
+                details["difficulty_level"], details["other_description"], certificate_hash,
+                certificate_phash, near_duplicate["id"] if near_duplicate else None
+            )
+
+            cursor.execute(query, params)
+            if certificate_path:
+                ocr_queue.enqueue_ocr(cursor, cursor.lastrowid, file_path)
+            connection.commit()
 
-                cursor.execute(query, params)
-                connection.commit()
+            if certificate_path:
+                ocr_queue.start_workers(DB_PATH, app.config["OCR_WORKERS"])
+                ocr_queue.notify()
+
+            warning = None
+            if near_duplicate:
+                warning = (f"This certificate looks very similar to achievement #{near_duplicate['id']} "
+                           f"({near_duplicate['event_name'] or 'untitled'}, student {near_duplicate['student_id']}). "
+                           f"It has been flagged for review.")
 
             return render_template("submit_achievements.html", 
-                                 success=f"Success! Achievement for {student_name} recorded.")
+                                 success=f"Success! Achievement for {student_name} recorded.",
+                                 warning=warning)
 
         except sqlite3.IntegrityError:
+            # Drops the blobs row too; gc-uploads then removes the stored file
+            get_db().rollback()
             return render_template("submit_achievements.html", error="Database error: Duplicate certificate hash.")
         except Exception as e:
+            get_db().rollback()
             return render_template("submit_achievements.html", error=f"Error: {str(e)}")
 
     return render_template("submit_achievements.html")
 
 
+@app.route("/achievement/<int:achievement_id>/ocr-status")
+@login_required
+def achievement_ocr_status(achievement_id):
+    """Progress of background OCR for an achievement's certificate"""
+    row = get_db().execute("""
+        SELECT a.student_id, a.teacher_id, a.ocr_status, a.ocr_data, a.event_name, a.achievement_date,
+               j.status AS job_status, j.attempts, j.error
+        FROM achievements a
+        LEFT JOIN ocr_jobs j ON j.id = (SELECT MAX(id) FROM ocr_jobs WHERE achievement_id = a.id)
+        WHERE a.id = ?
+    """, (achievement_id,)).fetchone()
+
+    allowed = row is not None and (
+        session.get("admin_id")
+        or session.get("teacher_id") == row["teacher_id"]
+        or session.get("student_id") == row["student_id"]
+    )
+    if not allowed:
+        return jsonify({"success": False, "error": "Achievement not found"}), HTTPStatus.NOT_FOUND
+
+    return jsonify({
+        "success": True,
+        "ocr_status": row["ocr_status"],
+        "job_status": row["job_status"],
+        "attempts": row["attempts"],
+        "error": row["error"],
+        "parsed": json.loads(row["ocr_data"]) if row["ocr_data"] else None,
+        "event_name": row["event_name"],
+        "achievement_date": row["achievement_date"]
+    })
+
+
+def bulk_results_response(results):
+    """JSON for per-row bulk results: 201 if every row was created, 207 if some were, 422 if none"""
+    created = sum(1 for result in results if result["status"] == "created")
+    if created == len(results) and results:
+        status = HTTPStatus.CREATED
+    elif created:
+        status = HTTPStatus.MULTI_STATUS
+    else:
+        status = HTTPStatus.UNPROCESSABLE_ENTITY
+    return jsonify({
+        "success": created > 0,
+        "created": created,
+        "failed": len(results) - created,
+        "results": results
+    }), status
+
+
+@app.route("/api/achievements/bulk", methods=["POST"])
+@teacher_required
+def bulk_import_achievements():
+    """
+    Record many achievements in one request.
+
+    Accepts a JSON list of objects (or {"achievements": [...]}), a CSV body
+    (Content-Type: text/csv) or a CSV upload in the "file" form field. Each
+    row takes the submit form's fields plus an optional certificate_hash.
+
+    Returns: per-row results; 201 if every row was created, 207 if some
+    were, 422 if none
+    """
+    if request.is_json:
+        payload = request.get_json(silent=True)
+        rows = payload.get("achievements") if isinstance(payload, dict) else payload
+    elif request.mimetype == "text/csv":
+        rows = read_csv_rows(request.get_data(as_text=True))
+    elif "file" in request.files:
+        rows = read_csv_rows(request.files["file"].read().decode("utf-8-sig"))
+    else:
+        rows = None
+
+    if not isinstance(rows, list):
+        return jsonify({"success": False, "error": "Expected a JSON list of achievements or a CSV file"}), \
+            HTTPStatus.BAD_REQUEST
+    if len(rows) > app.config["BULK_IMPORT_MAX_ROWS"]:
+        return jsonify({"success": False,
+                        "error": f"At most {app.config['BULK_IMPORT_MAX_ROWS']} rows per request"}), \
+            HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+
+    try:
+        results = import_achievements(get_db(), session["teacher_id"], rows)
+    except sqlite3.IntegrityError:
+        # A concurrent submission registered one of the certificates first
+        return jsonify({"success": False, "error": "Duplicate certificate hash, nothing was recorded"}), \
+            HTTPStatus.CONFLICT
+
+    return bulk_results_response(results)
+
+
 @app.route("/student-achievements", endpoint="student-achievements")
 @student_required
 def student_achievements():
@@ -542,7 +848,33 @@ def student_achievements():
         "name": session.get("student_name"),
         "dept": session.get("student_dept"),
     }
-    return render_template("student_achievements_1.html", student=student_data)
+
+    cursor = get_db().cursor()
+    page = paginate(
+        cursor,
+        """
+        SELECT a.id, a.achievement_type, a.event_name, a.achievement_date,
+               a.organizer, a.position, a.achievement_description,
+               a.certificate_path
+        FROM achievements a
+        WHERE a.student_id = ?
+        """,
+        [student_data["id"]],
+        keys=[("a.achievement_date", "achievement_date"), ("a.id", "id")],
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        limit=page_size(request.args.get("limit")),
+    )
+
+    if request.args.get("format") == "json":
+        return jsonify({
+            "achievements": [dict(row) for row in page.rows],
+            "next_cursor": page.next_cursor,
+            "prev_cursor": page.prev_cursor,
+        })
+
+    return render_template("student_achievements_1.html", student=student_data,
+                           achievements=page.rows, page=page)
 
 
 @app.route("/student-dashboard", endpoint="student-dashboard")
@@ -565,16 +897,13 @@ def student_profile():
     student_id = session.get('student_id')
     
     # Connect to database
-    connection = sqlite3.connect(DB_PATH)
-    connection.row_factory = sqlite3.Row
+    connection = get_db()
     cursor = connection.cursor()
     
     # Get student data from database
     cursor.execute("SELECT * FROM student WHERE student_id = ?", (student_id,))
     student = cursor.fetchone()
     
-    connection.close()
-    
     if not student:
         # Student not found in database (should not happen)
         session.clear()
@@ -611,7 +940,7 @@ def student_profile_edit():
         confirm_password = request.form.get('confirm_password')
         
         # Connect to database
-        connection = sqlite3.connect(DB_PATH)
+        connection = get_db()
         cursor = connection.cursor()
         
         # Get current student data
@@ -619,7 +948,6 @@ def student_profile_edit():
         student = cursor.fetchone()
         
         if not student:
-            connection.close()
             session.clear()
             return redirect(url_for('student'))
         
@@ -627,19 +955,16 @@ def student_profile_edit():
         if current_password and new_password and confirm_password:
             # Verify current password
             if not check_password_hash(student[4], current_password):
-                connection.close()
                 flash('Current password is incorrect', 'danger')
                 return redirect(url_for('student-profile'))
             
             # Verify new passwords match
             if new_password != confirm_password:
-                connection.close()
                 flash('New passwords do not match', 'danger')
                 return redirect(url_for('student-profile'))
             
             # Verify password length
             if len(new_password) < 6:
-                connection.close()
                 flash('New password must be at least 6 characters long', 'danger')
                 return redirect(url_for('student-profile'))
             
@@ -676,7 +1001,6 @@ def student_profile_edit():
                             except:
                                 pass  # Ignore error if file doesn't exist
                 else:
-                    connection.close()
                     flash('Invalid file type. Please upload JPG, JPEG, or PNG files.', 'danger')
                     return redirect(url_for('student-profile'))
         
@@ -700,7 +1024,6 @@ def student_profile_edit():
                   student_dept, hashed_password, student_id))
         
         connection.commit()
-        connection.close()
         
         # Update session data
         session['student_name'] = student_name
@@ -726,24 +1049,32 @@ def teacher_dashboard():
         "dept": session.get("teacher_dept"),
     }
 
-    connection = sqlite3.connect(DB_PATH)
-    connection.row_factory = sqlite3.Row
+    connection = get_db()
     cursor = connection.cursor()
 
-    # ✅ Ensure schema exists so query never crashes
-    ensure_achievements_schema(connection)
-
-    cursor.execute("SELECT COUNT(*) FROM achievements WHERE teacher_id = ?", (teacher_id,))
-    total_achievements = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(DISTINCT student_id) FROM achievements WHERE teacher_id = ?", (teacher_id,))
-    students_managed = cursor.fetchone()[0]
+    # ===============================
+    # BASIC STATS (required for dashboard)
+    # ===============================
+    # teacher_stats and teacher_student_counts are kept current by triggers
+    # on achievements, so none of this scans the teacher's history.
+    cursor.execute("""
+        SELECT total_achievements, students_managed
+        FROM teacher_stats
+        WHERE teacher_id = ?
+    """, (teacher_id,))
+    totals = cursor.fetchone()
 
     one_week_ago = (datetime.datetime.now() - datetime.timedelta(days=7)).strftime("%Y-%m-%d")
     cursor.execute("SELECT COUNT(*) FROM achievements WHERE teacher_id = ? AND achievement_date >= ?",
                    (teacher_id, one_week_ago))
     this_week_count = cursor.fetchone()[0]
 
+    stats = {
+        "total_achievements": totals["total_achievements"] if totals else 0,
+        "students_managed": totals["students_managed"] if totals else 0,
+        "this_week": this_week_count,
+    }
+
     cursor.execute("""
         SELECT a.id, a.student_id, s.student_name, a.achievement_type,
                a.event_name, a.achievement_date
@@ -755,44 +1086,35 @@ def teacher_dashboard():
     """, (teacher_id,))
     recent_entries = cursor.fetchall()
 
-    # ===============================
-    # BASIC STATS (required for dashboard)
-    # ===============================
-    stats = {
-        "total_achievements": total_achievements,
-        "students_managed": students_managed,
-        "this_week": this_week_count,
-    }
-    # ===============================
-    # 📊 PERFORMANCE ANALYTICS COUNTS
-    # ===============================
-        
     cursor.execute("""
-        SELECT student_id, COUNT(*) as total
-        FROM achievements
-        WHERE teacher_id = ?
-        GROUP BY student_id
+        SELECT c.student_id,
+               COALESCE(s.student_name, c.student_id) AS student_name,
+               c.total
+        FROM teacher_student_counts c
+        LEFT JOIN student s ON s.student_id = c.student_id
+        WHERE c.teacher_id = ?
+        ORDER BY c.total DESC, c.student_id
     """, (teacher_id,))
     rows = cursor.fetchall()
-    
+
+    # ===============================
+    # 📊 PERFORMANCE ANALYTICS COUNTS
+    # ===============================
+    top_min = app.config["TOP_PERFORMER_MIN_ACHIEVEMENTS"]
+    avg_min = app.config["AVERAGE_PERFORMER_MIN_ACHIEVEMENTS"]
+
     top_students = []
     avg_students = []
     low_students = []
     
     for r in rows:
-        sid = r["student_id"]
-        total = r["total"]
-    
-        cursor.execute("SELECT student_name FROM student WHERE student_id = ?", (sid,))
-        name_row = cursor.fetchone()
-        name = name_row["student_name"] if name_row else sid
-    
-        if total >= 5:
-            top_students.append((name, total))
-        elif total >= 2:
-            avg_students.append((name, total))
+        entry = (r["student_name"], r["total"])
+        if r["total"] >= top_min:
+            top_students.append(entry)
+        elif r["total"] >= avg_min:
+            avg_students.append(entry)
         else:
-            low_students.append((name, total))
+            low_students.append(entry)
     
     # counts for chart
     top_count = len(top_students)
@@ -819,24 +1141,34 @@ def all_achievements():
 
     teacher_id = session.get("teacher_id")
 
-    connection = sqlite3.connect(DB_PATH)
-    connection.row_factory = sqlite3.Row
+    connection = get_db()
     cursor = connection.cursor()
 
-    cursor.execute("""
+    page = paginate(
+        cursor,
+        """
         SELECT a.id, a.student_id, s.student_name, a.achievement_type,
                a.event_name, a.achievement_date, a.position, a.organizer,
                a.certificate_path
         FROM achievements a
         JOIN student s ON a.student_id = s.student_id
         WHERE a.teacher_id = ?
-        ORDER BY a.achievement_date DESC
-    """, (teacher_id,))
+        """,
+        [teacher_id],
+        keys=[("a.achievement_date", "achievement_date"), ("a.id", "id")],
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        limit=page_size(request.args.get("limit")),
+    )
 
-    achievements = cursor.fetchall()
-    connection.close()
+    if request.args.get("format") == "json":
+        return jsonify({
+            "achievements": [dict(row) for row in page.rows],
+            "next_cursor": page.next_cursor,
+            "prev_cursor": page.prev_cursor,
+        })
 
-    return render_template("all_achievements.html", achievements=achievements)
+    return render_template("all_achievements.html", achievements=page.rows, page=page)
 
 
 # ==================== ADMIN ROUTES ====================
@@ -848,11 +1180,10 @@ def admin_login():
         admin_id = request.form.get("admin_id")
         password = request.form.get("password")
 
-        connection = sqlite3.connect(DB_PATH)
+        connection = get_db()
         cursor = connection.cursor()
         cursor.execute("SELECT * FROM admin WHERE admin_id = ?", (admin_id,))
         admin_data = cursor.fetchone()
-        connection.close()
 
         if admin_data and check_password_hash(admin_data[3], password):
             session["logged_in"] = True
@@ -870,25 +1201,17 @@ def admin_login():
 @admin_required
 def admin_dashboard():
     """Admin dashboard with system statistics"""
-    connection = sqlite3.connect(DB_PATH)
-    connection.row_factory = sqlite3.Row
+    connection = get_db()
     cursor = connection.cursor()
 
-    # System statistics
-    cursor.execute("SELECT COUNT(*) FROM student")
-    total_students = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(*) FROM teacher")
-    total_teachers = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(*) FROM achievements")
-    total_achievements = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(*) FROM student WHERE is_approved = 0")
-    pending_student_approvals = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(*) FROM teacher WHERE is_approved = 0")
-    pending_teacher_approvals = cursor.fetchone()[0]
+    # System statistics (single row kept exact by triggers)
+    cursor.execute("""
+        SELECT total_students, total_teachers, total_achievements,
+               pending_student_approvals, pending_teacher_approvals
+        FROM system_counters
+        WHERE id = 1
+    """)
+    counters = cursor.fetchone()
 
     # Recent activities
     cursor.execute("""
@@ -921,15 +1244,7 @@ def admin_dashboard():
     """)
     dept_stats = cursor.fetchall()
 
-    connection.close()
-
-    stats = {
-        "total_students": total_students,
-        "total_teachers": total_teachers,
-        "total_achievements": total_achievements,
-        "pending_student_approvals": pending_student_approvals,
-        "pending_teacher_approvals": pending_teacher_approvals,
-    }
+    stats = dict(counters) if counters else dict.fromkeys(SYSTEM_COUNTER_QUERIES, 0)
 
     return render_template(
         "admin_dashboard.html",
@@ -948,42 +1263,47 @@ def admin_users():
     user_type = request.args.get("type", "students")
     status = request.args.get("status", "all")
     
-    connection = sqlite3.connect(DB_PATH)
-    connection.row_factory = sqlite3.Row
+    connection = get_db()
     cursor = connection.cursor()
 
     if user_type == "students":
-        query = "SELECT * FROM student WHERE 1=1"
-        params = []
-        
-        if status == "pending":
-            query += " AND is_approved = 0"
-        elif status == "approved":
-            query += " AND is_approved = 1"
-        
-        query += " ORDER BY created_at DESC"
-        cursor.execute(query, params)
-        users = cursor.fetchall()
+        query = "SELECT rowid AS row_id, * FROM student WHERE 1=1"
         user_type_name = "Students"
     else:
-        query = "SELECT * FROM teacher WHERE 1=1"
-        params = []
-        
-        if status == "pending":
-            query += " AND is_approved = 0"
-        elif status == "approved":
-            query += " AND is_approved = 1"
-        
-        query += " ORDER BY created_at DESC"
-        cursor.execute(query, params)
-        users = cursor.fetchall()
+        query = "SELECT rowid AS row_id, * FROM teacher WHERE 1=1"
         user_type_name = "Teachers"
 
-    connection.close()
+    if status == "pending":
+        query += " AND is_approved = 0"
+    elif status == "approved":
+        query += " AND is_approved = 1"
+
+    # Newest first; rowid breaks ties between rows created in the same second
+    page = paginate(
+        cursor, query, [],
+        keys=[("created_at", "created_at"), ("rowid", "row_id")],
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        limit=page_size(request.args.get("limit")),
+    )
+
+    if request.args.get("format") == "json":
+        users = []
+        for row in page.rows:
+            user = dict(row)
+            user.pop("password", None)
+            user.pop("row_id", None)
+            users.append(user)
+        return jsonify({
+            "users": users,
+            "next_cursor": page.next_cursor,
+            "prev_cursor": page.prev_cursor,
+        })
 
     return render_template(
         "admin_users.html",
-        users=users,
+        users=page.rows,
+        page=page,
         user_type=user_type,
         user_type_name=user_type_name,
         status=status,
@@ -1001,7 +1321,7 @@ def admin_approve_user():
 
     if user_type not in ["student", "teacher"]:
          return jsonify({"success": False, "error": "Invalid user type"}), HTTPStatus.BAD_REQUEST
-    connection = sqlite3.connect(DB_PATH)
+    connection = get_db()
     cursor = connection.cursor()
 
     if action == "approve":
@@ -1018,17 +1338,50 @@ def admin_approve_user():
         message = f"{user_type.capitalize()} rejected and removed"
 
     connection.commit()
-    connection.close()
 
     return jsonify({"success": True, "message": message})
 
 
+@app.route("/admin/users/import", methods=["POST"])
+@admin_required
+def admin_import_users():
+    """
+    Onboard students or teachers from an uploaded CSV ("file") whose header
+    uses the table's column names plus password, e.g.
+    student_id,student_name,email,password,student_dept.
+    user_type selects the table; approve=1 activates the accounts at once.
+
+    Returns: per-row results; 201 if every row was created, 207 if some
+    were, 422 if none
+    """
+    user_type = request.form.get("user_type", "student")
+    upload = request.files.get("file")
+    if upload is None or upload.filename == "":
+        return jsonify({"success": False, "error": "No CSV file uploaded"}), HTTPStatus.BAD_REQUEST
+
+    rows = read_csv_rows(upload.read().decode("utf-8-sig"))
+    if len(rows) > app.config["USER_IMPORT_MAX_ROWS"]:
+        return jsonify({"success": False,
+                        "error": f"At most {app.config['USER_IMPORT_MAX_ROWS']} rows per upload"}), \
+            HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+
+    try:
+        results = import_users(
+            get_db(), user_type, rows,
+            approve=request.form.get("approve") in ("1", "true", "on"),
+            workers=app.config["USER_IMPORT_WORKERS"] or None
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), HTTPStatus.BAD_REQUEST
+
+    return bulk_results_response(results)
+
+
 @app.route("/admin/departments")
 @admin_required
 def admin_departments():
     """Manage departments"""
-    connection = sqlite3.connect(DB_PATH)
-    connection.row_factory = sqlite3.Row
+    connection = get_db()
     cursor = connection.cursor()
 
     cursor.execute("SELECT * FROM departments ORDER BY dept_name")
@@ -1047,8 +1400,6 @@ def admin_departments():
     """)
     dept_stats = cursor.fetchall()
 
-    connection.close()
-
     return render_template(
         "admin_departments.html",
         departments=departments,
@@ -1071,19 +1422,16 @@ def admin_add_department():
     if not dept_code or not dept_name:
         return jsonify({"success": False, "error": "Department code and name are required"}), HTTPStatus.BAD_REQUEST
 
-    connection = sqlite3.connect(DB_PATH)
+    connection = get_db()
     cursor = connection.cursor()
 
     try:
         cursor.execute("INSERT INTO departments (dept_code, dept_name) VALUES (?, ?)", (dept_code, dept_name))
         connection.commit()
-        connection.close()
         return jsonify({"success": True, "message": "Department added successfully"})
     except sqlite3.IntegrityError:
-        connection.close()
         return jsonify({"success": False, "error": "Department code already exists"}), HTTPStatus.BAD_REQUEST
     except Exception as e:
-        connection.close()
         return jsonify({"success": False, "error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
 
 
@@ -1093,7 +1441,7 @@ def admin_delete_department():
     """Delete a department (super admin only)"""
     dept_id = request.form.get("dept_id")
 
-    connection = sqlite3.connect(DB_PATH)
+    connection = get_db()
     cursor = connection.cursor()
 
     # Check if department is in use
@@ -1104,16 +1452,13 @@ def admin_delete_department():
     teacher_count = cursor.fetchone()[0]
 
     if student_count > 0 or teacher_count > 0:
-        connection.close()
         return jsonify({"success": False, "error": "Cannot delete department that is in use"}), HTTPStatus.BAD_REQUEST
 
     try:
         cursor.execute("DELETE FROM departments WHERE id = ?", (dept_id,))
         connection.commit()
-        connection.close()
         return jsonify({"success": True, "message": "Department deleted successfully"})
     except Exception as e:
-        connection.close()
         return jsonify({"success": False, "error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
 
 
@@ -1121,8 +1466,7 @@ def admin_delete_department():
 @admin_required
 def admin_categories():
     """Manage achievement categories"""
-    connection = sqlite3.connect(DB_PATH)
-    connection.row_factory = sqlite3.Row
+    connection = get_db()
     cursor = connection.cursor()
 
     cursor.execute("SELECT * FROM achievement_categories ORDER BY category_name")
@@ -1139,8 +1483,6 @@ def admin_categories():
     """)
     category_stats = cursor.fetchall()
 
-    connection.close()
-
     return render_template(
         "admin_categories.html",
         categories=categories,
@@ -1161,20 +1503,17 @@ def admin_add_category():
     if not category_code or not category_name:
         return jsonify({"success": False, "error": "Category code and name are required"}), HTTPStatus.BAD_REQUEST
 
-    connection = sqlite3.connect(DB_PATH)
+    connection = get_db()
     cursor = connection.cursor()
 
     try:
         cursor.execute("INSERT INTO achievement_categories (category_code, category_name, description) VALUES (?, ?, ?)", 
                       (category_code, category_name, description))
         connection.commit()
-        connection.close()
         return jsonify({"success": True, "message": "Category added successfully"})
     except sqlite3.IntegrityError:
-        connection.close()
         return jsonify({"success": False, "error": "Category code already exists"}), HTTPStatus.BAD_REQUEST
     except Exception as e:
-        connection.close()
         return jsonify({"success": False, "error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
 
 
@@ -1183,116 +1522,87 @@ def admin_add_category():
 def admin_export():
     """Export system data"""
     export_type = request.args.get("type", "students")
-    
-    connection = sqlite3.connect(DB_PATH)
-    connection.row_factory = sqlite3.Row
-    cursor = connection.cursor()
+    export = get_export(export_type)
 
-    if export_type == "students":
-        cursor.execute("SELECT * FROM student ORDER BY student_name")
-        data = cursor.fetchall()
-        filename = "students_export.csv"
-        headers = ["Student ID", "Name", "Email", "Phone", "Gender", "Department", "Approved", "Created At"]
-        
-        # Create CSV content
-        import io
-        import csv
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(headers)
-        
-        for row in data:
-            writer.writerow([
-                row["student_id"],
-                row["student_name"],
-                row["email"],
-                row["phone_number"] or "",
-                row["student_gender"] or "",
-                row["student_dept"] or "",
-                "Yes" if row["is_approved"] else "No",
-                row["created_at"]
-            ])
-        
-        content = output.getvalue()
-        output.close()
-        
-    elif export_type == "teachers":
-        cursor.execute("SELECT * FROM teacher ORDER BY teacher_name")
-        data = cursor.fetchall()
-        filename = "teachers_export.csv"
-        headers = ["Teacher ID", "Name", "Email", "Phone", "Gender", "Department", "Approved", "Created At"]
-        
-        import io
-        import csv
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(headers)
-        
-        for row in data:
-            writer.writerow([
-                row["teacher_id"],
-                row["teacher_name"],
-                row["email"],
-                row["phone_number"] or "",
-                row["teacher_gender"] or "",
-                row["teacher_dept"] or "",
-                "Yes" if row["is_approved"] else "No",
-                row["created_at"]
-            ])
-        
-        content = output.getvalue()
-        output.close()
-        
-    else:  # achievements
-        cursor.execute("""
-            SELECT a.*, s.student_name, t.teacher_name
-            FROM achievements a
-            JOIN student s ON a.student_id = s.student_id
-            JOIN teacher t ON a.teacher_id = t.teacher_id
-            ORDER BY a.achievement_date DESC
-        """)
-        data = cursor.fetchall()
-        filename = "achievements_export.csv"
-        headers = ["ID", "Student ID", "Student Name", "Teacher ID", "Teacher Name", 
-                  "Achievement Type", "Event Name", "Date", "Organizer", "Position", 
-                  "Description", "Certificate Path", "Created At"]
-        
-        import io
-        import csv
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(headers)
-        
-        for row in data:
-            writer.writerow([
-                row["id"],
-                row["student_id"],
-                row["student_name"],
-                row["teacher_id"],
-                row["teacher_name"],
-                row["achievement_type"],
-                row["event_name"],
-                row["achievement_date"],
-                row["organizer"],
-                row["position"],
-                row["achievement_description"] or "",
-                row["certificate_path"] or "",
-                row["created_at"]
-            ])
-        
-        content = output.getvalue()
-        output.close()
+    chunks = iter_csv(get_db(), export_type)
+    headers = {"Content-Disposition": f"attachment;filename={export['filename']}"}
 
-    connection.close()
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        chunks = gzip_stream(chunks)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
 
-    from flask import Response
+    # Rows are read and written one fetchmany() batch at a time while the
+    # response is being sent; stream_with_context keeps the request's
+    # pooled connection alive until the last chunk.
     return Response(
-        content,
+        stream_with_context(chunks),
         mimetype="text/csv",
-        headers={"Content-Disposition": f"attachment;filename={filename}"}
+        headers=headers
+    )
+
+
+@app.route("/admin/export/jobs", methods=["POST"])
+@admin_required
+def admin_export_job_create():
+    """Queue an export to be written in the background; poll the returned status URL"""
+    payload = request.get_json(silent=True) or request.form
+    export_type = payload.get("type", "students")
+    fmt = payload.get("format", "csv")
+    filters = payload.get("filters") or {}
+    if not isinstance(filters, dict):
+        return jsonify({"success": False, "error": "filters must be an object"}), HTTPStatus.BAD_REQUEST
+
+    try:
+        job_id = enqueue_export(
+            get_db(),
+            app.config["DB_PATH"],
+            app.config["EXPORT_FOLDER"],
+            export_type,
+            filters=filters,
+            fmt=fmt,
+            requested_by=session.get("admin_id"),
+            workers=app.config["EXPORT_WORKERS"]
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), HTTPStatus.BAD_REQUEST
+
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "status_url": url_for("admin_export_job_status", job_id=job_id)
+    }), HTTPStatus.ACCEPTED
+
+
+@app.route("/admin/export/jobs/<int:job_id>")
+@admin_required
+def admin_export_job_status(job_id):
+    """Progress of a background export"""
+    export_jobs.fail_stale(get_db(), job_id)
+    job = get_db().execute("SELECT * FROM export_jobs WHERE id = ?", (job_id,)).fetchone()
+    if job is None:
+        return jsonify({"success": False, "error": "Export job not found"}), HTTPStatus.NOT_FOUND
+
+    data = job_status(job)
+    if job["status"] == "done":
+        data["download_url"] = url_for("admin_export_job_download", job_id=job_id)
+    return jsonify({"success": True, "job": data})
+
+
+@app.route("/admin/export/jobs/<int:job_id>/download")
+@admin_required
+def admin_export_job_download(job_id):
+    """Download a finished export; supports Range and conditional requests"""
+    job = get_db().execute("SELECT * FROM export_jobs WHERE id = ?", (job_id,)).fetchone()
+    if job is None or job["status"] != "done" or not os.path.exists(job["file_path"] or ""):
+        return jsonify({"success": False, "error": "Export not available"}), HTTPStatus.NOT_FOUND
+
+    return send_file(
+        job["file_path"],
+        mimetype=EXPORT_FORMATS[job["format"]]["mimetype"],
+        as_attachment=True,
+        download_name=download_name(job),
+        conditional=True
     )
 
 
@@ -1333,7 +1643,7 @@ def student_new():
         student_gender = request.form.get("student_gender")
         student_dept = request.form.get("student_dept")
 
-        connection = sqlite3.connect(DB_PATH)
+        connection = get_db()
         cursor = connection.cursor()
 
         try:
@@ -1346,8 +1656,6 @@ def student_new():
                                  success="Registration submitted! Your account will be activated after admin approval.")
         except sqlite3.Error as e:
             return render_template("student_new_2.html", error=f"Database error: {e}")
-        finally:
-            connection.close()
 
     return render_template("student_new_2.html")
 
@@ -1364,7 +1672,7 @@ def teacher_new():
         teacher_gender = request.form.get("teacher_gender")
         teacher_dept = request.form.get("teacher_dept")
 
-        connection = sqlite3.connect(DB_PATH)
+        connection = get_db()
         cursor = connection.cursor()
 
         try:
@@ -1377,8 +1685,6 @@ def teacher_new():
                                  success="Registration submitted! Your account will be activated after admin approval.")
         except sqlite3.Error as e:
             return render_template("teacher_new_2.html", error=f"Database error: {e}")
-        finally:
-            connection.close()
 
     return render_template("teacher_new_2.html")
 
@@ -1391,11 +1697,10 @@ def student():
         student_id = request.form.get("sname")
         password = request.form.get("password")
 
-        connection = sqlite3.connect(DB_PATH)
+        connection = get_db()
         cursor = connection.cursor()
         cursor.execute("SELECT * FROM student WHERE student_id = ?", (student_id,))
         student_data = cursor.fetchone()
-        connection.close()
 
         if student_data and check_password_hash(student_data[4], password):
             # Check if student is approved
@@ -1424,11 +1729,10 @@ def teacher():
         teacher_id = request.form.get("tname")
         password = request.form.get("password")
 
-        connection = sqlite3.connect(DB_PATH)
+        connection = get_db()
         cursor = connection.cursor()
         cursor.execute("SELECT * FROM teacher WHERE teacher_id = ?", (teacher_id,))
         teacher_data = cursor.fetchone()
-        connection.close()
 
         if teacher_data and check_password_hash(teacher_data[4], password):
             # Check if teacher is approved
@@ -1460,12 +1764,11 @@ def api_get_achievement(achievement_id):
     Only accessible to authenticated students.
     Students can only access their own achievements.
     
-    Returns: JSON with achievement details and QR code
+    Returns: JSON with achievement details and the QR code image URL
     """
     student_id = session.get("student_id")
     
-    connection = sqlite3.connect(DB_PATH)
-    connection.row_factory = sqlite3.Row
+    connection = get_db()
     cursor = connection.cursor()
     
     # Fetch achievement with owner check
@@ -1477,28 +1780,53 @@ def api_get_achievement(achievement_id):
     """, (achievement_id, student_id))
     
     achievement = cursor.fetchone()
-    connection.close()
     
     if not achievement:
         return jsonify({"error": "Achievement not found or access denied"}), HTTPStatus.NOT_FOUND
     
-    try:
-        from utils.qr_handler import generate_qr_code, get_verification_url
-        
-        # Generate QR code
-        verification_url = get_verification_url(request.host, achievement_id)
-        qr_code_data = generate_qr_code(verification_url)
-        
-        # Convert row to dictionary
-        achievement_dict = dict(achievement)
-        achievement_dict["qr_code"] = qr_code_data
-        achievement_dict["verification_url"] = verification_url
-        
-        return jsonify(achievement_dict)
-        
-    except Exception as e:
-        print(f"Error generating QR code: {e}")
-        return jsonify({"error": "Failed to generate QR code"}), HTTPStatus.INTERNAL_SERVER_ERROR
+    # Convert row to dictionary; the QR image is fetched (and cached) separately
+    achievement_dict = dict(achievement)
+    record = verification_record(connection, achievement_id)
+    achievement_dict["qr_code_url"] = qr_image_url(record)
+    achievement_dict["verification_url"] = signed_verification_url(record)
+
+    return jsonify(achievement_dict)
+
+
+@app.route("/qr/<int:achievement_id>-<fingerprint>.png")
+@login_required
+def achievement_qr(achievement_id, fingerprint):
+    """
+    QR code carrying an achievement's signed verification token.
+
+    Only the student, the teacher who recorded it and admins get the image,
+    so tokens cannot be collected by walking ids. The URL names a hash of
+    the token itself: any change to a signed field, including OCR filling
+    in a blank one without a revision bump, moves the image to a new URL,
+    so each one can be cached by the browser for a year without going stale.
+    """
+    record = verification_record(get_db(), achievement_id)
+    if record is None or not can_view_achievement(record):
+        return jsonify({"error": "Achievement not found or access denied"}), HTTPStatus.NOT_FOUND
+    if fingerprint != token_fingerprint(record):
+        return redirect(qr_image_url(record))
+
+    png, etag = get_qr_png(signed_verification_url(record), app.config["QR_CACHE_FOLDER"])
+    response = Response(png, mimetype="image/png")
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = QR_MAX_AGE
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+
+def can_view_achievement(record):
+    """Whether the session belongs to the achievement's student, its teacher or an admin"""
+    return bool(
+        session.get("admin_id")
+        or (session.get("student_id") and session["student_id"] == record["student_id"])
+        or (session.get("teacher_id") and session["teacher_id"] == record["teacher_id"])
+    )
 
 
 @app.route("/verify-achievement/<int:achievement_id>")
@@ -1512,11 +1840,32 @@ def verify_achievement(achievement_id):
     - Student name and ID
     - Verification badge
     - Authenticity metadata
+
+    The page depends only on the achievement and student rows, so its ETag
+    is built from their row_version columns. A revalidation costs one
+    primary-key probe of those versions and no render; shared caches may
+    serve the page for VERIFY_SHARED_MAX_AGE seconds without asking.
     """
-    connection = sqlite3.connect(DB_PATH)
-    connection.row_factory = sqlite3.Row
+    connection = get_db()
     cursor = connection.cursor()
-    
+
+    cursor.execute("""
+        SELECT a.row_version AS achievement_version, s.row_version AS student_version,
+               MAX(COALESCE(a.updated_at, a.created_at, ''), COALESCE(s.updated_at, s.created_at, '')) AS last_modified
+        FROM achievements a
+        JOIN student s ON a.student_id = s.student_id
+        WHERE a.id = ?
+    """, (achievement_id,))
+    probe = cursor.fetchone()
+
+    if not probe:
+        return render_template("404.html"), HTTPStatus.NOT_FOUND
+
+    etag = f"{achievement_id}.{probe['achievement_version']}.{probe['student_version']}.{VERIFY_PAGE_VERSION}"
+    last_modified = parse_db_timestamp(probe["last_modified"])
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return verify_cache_headers(Response(status=HTTPStatus.NOT_MODIFIED), etag, last_modified)
+
     # Fetch achievement details
     cursor.execute("""
         SELECT a.*, s.student_name, s.student_id, s.student_dept
@@ -1526,25 +1875,148 @@ def verify_achievement(achievement_id):
     """, (achievement_id,))
     
     achievement = cursor.fetchone()
-    connection.close()
     
     if not achievement:
         return render_template("404.html"), HTTPStatus.NOT_FOUND
     
-    # Format dates for display
-    issued_date = datetime.datetime.now().strftime("%B %d, %Y")
-    verified_timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC")
-    
     # Convert to dictionary for easier templating
     achievement_data = dict(achievement)
-    
-    return render_template(
+
+    # Nothing time-of-request goes into the page, so equal versions mean equal bytes
+    response = Response(render_template(
         "verify_achievement.html",
         achievement=achievement_data,
-        issued_date=issued_date,
-        verified_timestamp=verified_timestamp,
-        verification_url=request.url
-    )
+        issued_date=card_issued_date(achievement_data),
+        last_updated=last_modified.strftime("%Y-%m-%d %H:%M:%S UTC") if last_modified else "",
+        verification_url=get_verification_url(request.host, achievement_id)
+    ))
+    return verify_cache_headers(response, etag, last_modified)
+
+
+def parse_db_timestamp(value):
+    """SQLite CURRENT_TIMESTAMP text (UTC) as an aware datetime, or None"""
+    try:
+        return datetime.datetime.fromisoformat(str(value)).replace(tzinfo=datetime.timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+def verify_cache_headers(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = app.config["VERIFY_MAX_AGE"]
+    response.cache_control.s_maxage = app.config["VERIFY_SHARED_MAX_AGE"]
+    return response
+
+
+def verification_record(connection, achievement_id):
+    """Signed fields, current token revision and teacher of an achievement, or None"""
+    row = connection.execute("""
+        SELECT a.id, COALESCE(r.revision, 1) AS revision, a.student_id, s.student_name, s.student_dept,
+               a.achievement_type, a.event_name, a.position, a.achievement_date, a.organizer,
+               a.certificate_hash, a.created_at, a.teacher_id
+        FROM achievements a
+        JOIN student s ON a.student_id = s.student_id
+        LEFT JOIN token_revocations r ON r.achievement_id = a.id
+        WHERE a.id = ?
+    """, (achievement_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def signed_verification_url(record):
+    """Signed-token verification URL for a verification_record (what QR codes encode)"""
+    token = make_token(app.config["VERIFY_TOKEN_SECRET"], record)
+    return get_token_verification_url(request.host, token)
+
+
+def verification_token_url(connection, achievement_id):
+    """Signed-token verification URL for an achievement, or None"""
+    record = verification_record(connection, achievement_id)
+    return signed_verification_url(record) if record else None
+
+
+def token_fingerprint(record):
+    """Short hash of a verification_record's signed token"""
+    token = make_token(app.config["VERIFY_TOKEN_SECRET"], record)
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+
+def qr_image_url(record):
+    """URL of a verification_record's QR image; it moves whenever the signed token does"""
+    return url_for("achievement_qr", achievement_id=record["id"], fingerprint=token_fingerprint(record))
+
+
+@app.route("/verify/<token>")
+def verify_token(token):
+    """
+    Public verification from a signed QR token.
+
+    The page is rendered from the token's signed fields; the only database
+    read is the periodic reload of the small revocation set. A token for a
+    record edited since it was signed redirects to the live page by id.
+    """
+    try:
+        claims = read_token(app.config["VERIFY_TOKEN_SECRET"], token)
+    except ValueError:
+        return render_template("404.html"), HTTPStatus.NOT_FOUND
+
+    status = token_revocations.status(get_db(), claims, app.config["VERIFY_REVOCATION_TTL"])
+    if status == REVOKED:
+        return render_template("404.html"), HTTPStatus.NOT_FOUND
+    if status == STALE:
+        return redirect(url_for("verify_achievement", achievement_id=claims["id"]))
+
+    etag = f"t.{hashlib.sha256(token.encode('utf-8')).hexdigest()[:32]}.{VERIFY_PAGE_VERSION}"
+    if not is_resource_modified(request.environ, etag=etag):
+        return verify_cache_headers(Response(status=HTTPStatus.NOT_MODIFIED), etag, None)
+
+    response = Response(render_template(
+        "verify_achievement.html",
+        achievement=claims,
+        issued_date=card_issued_date(claims),
+        last_updated="",
+        verification_url=get_token_verification_url(request.host, token)
+    ))
+    return verify_cache_headers(response, etag, None)
+
+
+@app.route("/api/verify", methods=["POST"])
+def verify_achievements_batch():
+    """
+    Public batch verification.
+
+    Accepts a JSON list (or {"achievements": [...]}) of achievement ids
+    and/or signed QR tokens, at most VERIFY_BATCH_MAX_ITEMS of them.
+
+    Returns: one result per item, in order, with the public fields of each
+    verified achievement
+    """
+    payload = request.get_json(silent=True)
+    items = payload.get("achievements") if isinstance(payload, dict) else payload
+
+    if not isinstance(items, list):
+        return jsonify({"success": False, "error": "Expected a JSON list of achievement ids or tokens"}), \
+            HTTPStatus.BAD_REQUEST
+    if len(items) > app.config["VERIFY_BATCH_MAX_ITEMS"]:
+        return jsonify({"success": False,
+                        "error": f"At most {app.config['VERIFY_BATCH_MAX_ITEMS']} achievements per request"}), \
+            HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+
+    results = verify_batch(get_db(), items, verify_batch_cache, app.config["VERIFY_TOKEN_SECRET"],
+                           token_revocations, app.config["VERIFY_REVOCATION_TTL"])
+    for result in results:
+        if result["status"] == "verified":
+            result["verification_url"] = get_verification_url(request.host, result["achievement"]["id"])
+
+    verified = sum(1 for result in results if result["status"] == "verified")
+    return jsonify({
+        "success": True,
+        "verified": verified,
+        "failed": len(results) - verified,
+        "results": results
+    })
 
 
 @app.route("/export-achievement/<int:achievement_id>")
@@ -1562,8 +2034,7 @@ def export_achievement(achievement_id):
     """
     student_id = session.get("student_id")
     
-    connection = sqlite3.connect(DB_PATH)
-    connection.row_factory = sqlite3.Row
+    connection = get_db()
     cursor = connection.cursor()
     
     # Fetch achievement with ownership verification
@@ -1575,29 +2046,24 @@ def export_achievement(achievement_id):
     """, (achievement_id, student_id))
     
     achievement = cursor.fetchone()
-    connection.close()
     
     if not achievement:
         return render_template("404.html"), HTTPStatus.NOT_FOUND
     
     try:
-        from utils.qr_handler import generate_qr_code, get_verification_url
-        
-        # Generate QR code
-        verification_url = get_verification_url(request.host, achievement_id)
-        qr_code_data = generate_qr_code(verification_url)
-        
-        # Format dates
-        issued_date = datetime.datetime.now().strftime("%B %d, %Y")
+        record = verification_record(connection, achievement_id)
+        verification_url = signed_verification_url(record)
         
         achievement_dict = dict(achievement)
         
         return render_template(
             "achievement_export.html",
             achievement=achievement_dict,
-            qr_code_data=qr_code_data,
+            qr_code_url=qr_image_url(record),
+            card_png_url=url_for("export_achievement_card", achievement_id=achievement_id, fmt="png"),
+            card_pdf_url=url_for("export_achievement_card", achievement_id=achievement_id, fmt="pdf"),
             verification_url=verification_url,
-            issued_date=issued_date
+            issued_date=card_issued_date(achievement_dict)
         )
         
     except Exception as e:
@@ -1606,8 +2072,64 @@ def export_achievement(achievement_id):
         return redirect(url_for("student-achievements"))
 
 
+def card_issued_date(achievement):
+    """
+    Issue date printed on the export card: the day the achievement was
+    recorded, else its own date. Taken from the record alone, so the same
+    record always renders the same card.
+    """
+    for field in ("created_at", "achievement_date"):
+        try:
+            return datetime.datetime.fromisoformat(str(achievement[field])).strftime("%B %d, %Y")
+        except (KeyError, IndexError, TypeError, ValueError):
+            continue
+    return ""
+
+
+@app.route("/export-achievement/<int:achievement_id>/card.<fmt>")
+@student_required
+def export_achievement_card(achievement_id, fmt):
+    """
+    The export card rendered on the server as PNG or PDF.
+    Cached on disk per achievement and content version; supports
+    conditional requests, so a repeat download is a 304.
+    """
+    if fmt not in CARD_FORMATS:
+        return render_template("404.html"), HTTPStatus.NOT_FOUND
+
+    achievement = get_db().execute("""
+        SELECT a.*, s.student_name, s.student_id
+        FROM achievements a
+        JOIN student s ON a.student_id = s.student_id
+        WHERE a.id = ? AND a.student_id = ?
+    """, (achievement_id, session.get("student_id"))).fetchone()
+    if not achievement:
+        return render_template("404.html"), HTTPStatus.NOT_FOUND
+
+    achievement = dict(achievement)
+    verification_url = verification_token_url(get_db(), achievement_id)
+    values = card_values(achievement, verification_url, card_issued_date(achievement))
+    card, version = open_cached_card(
+        app.config["CARD_CACHE_FOLDER"], values, fmt,
+        lambda: get_qr_png(verification_url, app.config["QR_CACHE_FOLDER"])[0]
+    )
+
+    response = send_file(
+        card,
+        mimetype=CARD_FORMATS[fmt],
+        as_attachment=True,
+        download_name=card_download_name(values, fmt),
+        etag=f"{version}-{fmt}",
+        conditional=True
+    )
+    # Private to the owner, but always revalidated so an edit shows up at once
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
 if __name__ == "__main__":
     init_db()
-    add_profile_picture_column()
+    migrate_db()
     app.run(debug=True)
 
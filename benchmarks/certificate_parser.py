@@ -0,0 +1,93 @@
+# benchmarks/certificate_parser.py
+"""
+Throughput and per-field accuracy of utils.certificate_parser.
+
+Runs the rule engine over benchmarks/certificate_corpus.json (texts with
+the fields a correct read should produce), alongside the original
+three-field regex parser as a baseline.
+
+    python benchmarks/certificate_parser.py [--corpus FILE] [--rules FILE] [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.certificate_parser import DEFAULT_RULES_PATH, load_rules
+
+DEFAULT_CORPUS = os.path.join(ROOT, "benchmarks", "certificate_corpus.json")
+
+
+def legacy_parse(text):
+    """The parser this engine replaced: a few re.search loops, first match wins."""
+    parsed = {"student_name": None, "event_name": None, "achievement_date": None}
+    for pattern in (r"Presented to\s+(.*)", r"Awarded to\s+(.*)", r"This certifies that\s+(.*)"):
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            parsed["student_name"] = match.group(1).strip()
+            break
+    for pattern in (r"\b(\d{1,2}\s+\w+\s+\d{4})\b", r"\b(\d{2}/\d{2}/\d{4})\b"):
+        match = re.search(pattern, text)
+        if match:
+            parsed["achievement_date"] = match.group(1)
+            break
+    for pattern in (r"for participating in\s+(.*)", r"in recognition of\s+(.*)", r"for\s+(.*)\s+held at"):
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            parsed["event_name"] = match.group(1).strip()
+            break
+    return parsed
+
+
+def measure(parse, corpus, repeat):
+    texts = [case["text"] for case in corpus]
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            parse(text)
+    elapsed = time.perf_counter() - started
+
+    correct, total = {}, {}
+    for case in corpus:
+        result = parse(case["text"])
+        for field, expected in case["expected"].items():
+            if field not in result:
+                continue
+            total[field] = total.get(field, 0) + 1
+            if (result.get(field) or None) == (expected or None):
+                correct[field] = correct.get(field, 0) + 1
+    return elapsed, {field: correct.get(field, 0) / total[field] for field in total}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--rules", default=DEFAULT_RULES_PATH)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = json.load(f)
+    extractor = load_rules(args.rules)
+    documents = len(corpus) * args.repeat
+    size = sum(len(case["text"].encode("utf-8")) for case in corpus) * args.repeat
+
+    print(f"{len(corpus)} certificates x {args.repeat} repeats ({size / 1e6:.2f} MB)\n")
+    results = {"rule engine": measure(extractor.extract, corpus, args.repeat),
+               "legacy parser": measure(legacy_parse, corpus, args.repeat)}
+
+    fields = list(corpus[0]["expected"])
+    print(f"{'':16}{'docs/s':>10}{'MB/s':>8}  " + "  ".join(f"{field[:12]:>12}" for field in fields))
+    for name, (elapsed, accuracy) in results.items():
+        cells = "  ".join(f"{accuracy[field]:>12.0%}" if field in accuracy else f"{'-':>12}" for field in fields)
+        print(f"{name:16}{documents / elapsed:>10,.0f}{size / elapsed / 1e6:>8.2f}  {cells}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# benchmarks/ocr_preprocessing.py
+"""
+Compare certificate OCR with and without utils.image_preprocess.
+
+For every image under the given directory (default: static/uploads) this
+reports preprocessing time, Tesseract time on the raw and preprocessed
+image, mean word confidence and how many of the parser's fields
+(student_name, event_name, achievement_date) were found.
+
+    python benchmarks/ocr_preprocessing.py [directory] [--expected expected.json]
+
+expected.json optionally maps file names to the field values a correct
+read should produce, e.g. {"cert.jpeg": {"event_name": "Hit the Bug"}};
+matches are then counted instead of merely non-empty fields.
+
+Without a working tesseract binary only the preprocessing timings are
+reported, and the run still exits 0. It exits 1 when no images were found
+or an image could not be read.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytesseract
+from PIL import Image
+
+from utils.certificate_ocr import ocr_engine_version
+from utils.certificate_parser import parse_certificate_text
+from utils.image_preprocess import preprocess_for_ocr
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static", "uploads")
+
+
+def find_images(directory):
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def run_ocr(image):
+    started = time.perf_counter()
+    data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+    elapsed = time.perf_counter() - started
+    words = [(text, float(conf)) for text, conf in zip(data["text"], data["conf"]) if text.strip()]
+    text = " ".join(word for word, _ in words)
+    confidence = statistics.mean(conf for _, conf in words if conf >= 0) if words else 0.0
+    return text, elapsed, confidence
+
+
+def usable_engine():
+    """Engine version if tesseract is installed and can OCR an image, else None."""
+    engine = ocr_engine_version()
+    if engine is None:
+        return None
+    try:
+        pytesseract.image_to_data(Image.new("L", (32, 32), 255))
+    except (pytesseract.TesseractError, pytesseract.TesseractNotFoundError, OSError) as e:
+        print(f"{engine} cannot OCR: {e}")
+        return None
+    return engine
+
+
+def field_score(parsed, expected):
+    if expected:
+        return sum(1 for key, value in expected.items()
+                   if (parsed.get(key) or "").strip().lower() == str(value).strip().lower())
+    return sum(1 for value in parsed.values() if value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", default=DEFAULT_DIRECTORY)
+    parser.add_argument("--expected", help="JSON file of expected parser fields per image")
+    args = parser.parse_args()
+
+    expected = {}
+    if args.expected:
+        with open(args.expected) as f:
+            expected = json.load(f)
+
+    images = list(find_images(args.directory))
+    if not images:
+        print(f"No images found in {args.directory}", file=sys.stderr)
+        return 1
+
+    engine = usable_engine()
+    if engine is None:
+        print("tesseract unavailable: reporting preprocessing time only\n")
+
+    header = f"{'image':40} {'pixels':>11} {'prep ms':>8}"
+    if engine:
+        header += f" {'raw ms':>8} {'prep+ocr':>8} {'raw conf':>8} {'prep conf':>9} {'fields':>7}"
+    print(header)
+
+    totals = {"prep": 0.0, "raw": 0.0, "pre": 0.0, "raw_fields": 0, "pre_fields": 0}
+    failed = []
+    for path in images:
+        name = os.path.basename(path)
+        try:
+            with Image.open(path) as opened:
+                image = opened.copy()
+        except OSError as e:
+            print(f"{name[:40]:40} unreadable: {e}")
+            failed.append(name)
+            continue
+
+        started = time.perf_counter()
+        prepared = preprocess_for_ocr(image)
+        prep_time = time.perf_counter() - started
+        totals["prep"] += prep_time
+
+        line = f"{name[:40]:40} {image.width * image.height:>11,} {prep_time * 1000:>8.1f}"
+        if engine:
+            raw_text, raw_time, raw_conf = run_ocr(image)
+            pre_text, pre_time, pre_conf = run_ocr(prepared)
+            raw_fields = field_score(parse_certificate_text(raw_text), expected.get(name))
+            pre_fields = field_score(parse_certificate_text(pre_text), expected.get(name))
+            totals["raw"] += raw_time
+            totals["pre"] += prep_time + pre_time
+            totals["raw_fields"] += raw_fields
+            totals["pre_fields"] += pre_fields
+            line += (f" {raw_time * 1000:>8.1f} {(prep_time + pre_time) * 1000:>8.1f}"
+                     f" {raw_conf:>8.1f} {pre_conf:>9.1f} {raw_fields:>3}->{pre_fields:<3}")
+        print(line)
+
+    count = len(images) - len(failed)
+    if not count:
+        print(f"\nNo readable images in {args.directory}", file=sys.stderr)
+        return 1
+    print(f"\n{count} images, mean preprocessing {totals['prep'] / count * 1000:.1f} ms")
+    if engine:
+        print(f"engine: {engine}")
+        print(f"mean OCR raw {totals['raw'] / count * 1000:.1f} ms, "
+              f"preprocessed {totals['pre'] / count * 1000:.1f} ms (including preprocessing)")
+        print(f"fields found: raw {totals['raw_fields']}, preprocessed {totals['pre_fields']}")
+    if failed:
+        print(f"{len(failed)} unreadable images: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
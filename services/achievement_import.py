@@ -0,0 +1,140 @@
+"""
+Bulk achievement import.
+
+A teacher posts many achievements at once (JSON or CSV rows with the same
+fields as the submit form). Instead of one SELECT per student and one
+INSERT per row, every row is validated locally, student ids and
+certificate hashes are checked with chunked IN queries, and the valid rows
+are inserted with a single executemany in one transaction. Each row gets
+its own result, so one bad line does not sink the rest.
+"""
+
+import csv
+import io
+import re
+
+from utils.sql import select_existing
+
+
+REQUIRED_FIELDS = ("student_id", "achievement_type", "event_name", "achievement_date", "organizer", "position")
+FORM_COLUMNS = (
+    "event_name", "achievement_date", "organizer", "position", "achievement_description",
+    "symposium_theme", "programming_language", "coding_platform", "paper_title",
+    "journal_name", "conference_level", "conference_role", "team_size",
+    "project_title", "database_type", "difficulty_level", "other_description",
+)
+
+_SHA256 = re.compile(r"[0-9a-f]{64}")
+
+_INSERT = f"""
+    INSERT INTO achievements (
+        teacher_id, student_id, achievement_type, {", ".join(FORM_COLUMNS)}, certificate_hash
+    ) VALUES ({", ".join("?" * (len(FORM_COLUMNS) + 4))})
+"""
+
+
+def read_csv_rows(text):
+    """Rows of a CSV document as dicts keyed by its header."""
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def _clean(row):
+    cleaned = {}
+    for key, value in row.items():
+        if key is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        elif value is not None and not isinstance(value, bool):
+            value = str(value)
+        cleaned[key.strip()] = value or None
+    return cleaned
+
+
+def _row_error(row):
+    missing = [field for field in REQUIRED_FIELDS if not row.get(field)]
+    if missing:
+        return f"Missing {', '.join(missing)}"
+    if row.get("team_size") and not str(row["team_size"]).isdigit():
+        return "team_size must be a whole number"
+    if row.get("certificate_hash") and not _SHA256.fullmatch(row["certificate_hash"].lower()):
+        return "certificate_hash must be a SHA-256 hex digest"
+    return None
+
+
+def import_achievements(connection, teacher_id, rows):
+    """
+    Validate and insert many achievements for one teacher.
+
+    Args:
+        rows (list): dicts with the submit form's fields, plus an optional
+            certificate_hash for duplicate detection
+
+    Returns:
+        list: One result per input row, in order: {"row", "status", "id"}
+              for inserted rows, {"row", "status", "error"} otherwise
+    """
+    results = [{"row": number} for number in range(1, len(rows) + 1)]
+    cleaned = []
+    for result, row in zip(results, rows):
+        if not isinstance(row, dict):
+            result.update(status="error", error="Row must be an object")
+            cleaned.append(None)
+            continue
+        row = _clean(row)
+        if row.get("certificate_hash"):
+            row["certificate_hash"] = row["certificate_hash"].lower()
+        error = _row_error(row)
+        if error:
+            result.update(status="error", error=error)
+            row = None
+        cleaned.append(row)
+
+    candidates = [row for row in cleaned if row]
+    students = select_existing(connection, "SELECT student_id FROM student WHERE student_id IN ({placeholders})",
+                               {row["student_id"] for row in candidates})
+    registered = select_existing(connection, "SELECT certificate_hash FROM achievements "
+                                             "WHERE certificate_hash IN ({placeholders})",
+                                 {row["certificate_hash"] for row in candidates if row.get("certificate_hash")})
+
+    pending, first_row = [], {}
+    for result, row in zip(results, cleaned):
+        if row is None:
+            continue
+        certificate_hash = row.get("certificate_hash")
+        if row["student_id"] not in students:
+            result.update(status="error", error=f"Student ID {row['student_id']} not found")
+        elif certificate_hash in registered:
+            result.update(status="error", error="Duplicate certificate: already registered")
+        elif certificate_hash in first_row:
+            result.update(status="error", error=f"Duplicate certificate: same as row {first_row[certificate_hash]}")
+        else:
+            if certificate_hash:
+                first_row[certificate_hash] = result["row"]
+            pending.append((result, row))
+
+    if not pending:
+        return results
+
+    values = []
+    for _, row in pending:
+        fields = [row.get(column) for column in FORM_COLUMNS]
+        fields[FORM_COLUMNS.index("team_size")] = int(row["team_size"]) if row.get("team_size") else None
+        values.append((teacher_id, row["student_id"], row["achievement_type"], *fields, row.get("certificate_hash")))
+
+    # The write lock is held from BEGIN IMMEDIATE, so ids above the current
+    # maximum are exactly this batch, in insertion order
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        before = connection.execute("SELECT COALESCE(MAX(id), 0) FROM achievements").fetchone()[0]
+        connection.executemany(_INSERT, values)
+        ids = [row[0] for row in connection.execute(
+            "SELECT id FROM achievements WHERE id > ? ORDER BY id", (before,))]
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+
+    for (result, _), achievement_id in zip(pending, ids):
+        result.update(status="created", id=achievement_id)
+    return results
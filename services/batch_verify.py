@@ -0,0 +1,156 @@
+"""
+Batch verification for employers and placement cells.
+
+One request carries many achievement ids and/or signed QR tokens. Tokens
+are checked against their signature and the revocation set, without a
+database read. Ids are answered from a per-id result cache first, and the
+rest are fetched with one chunked IN query. A batch of a few hundred
+candidates costs at most a couple of queries instead of a page render each.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from utils.sql import chunks
+from utils.verification_token import HASH_PREFIX, REVOKED, STALE, TOKEN_FIELDS, read_token
+
+
+# What a verifier sees: the signed token fields, minus the revision counter
+PUBLIC_FIELDS = tuple(field for field in TOKEN_FIELDS if field != "revision")
+
+_LOOKUP = """
+    SELECT a.id, a.student_id, s.student_name, s.student_dept, a.achievement_type, a.event_name,
+           a.position, a.achievement_date, a.organizer, a.certificate_hash, a.created_at
+    FROM achievements a
+    JOIN student s ON a.student_id = s.student_id
+    WHERE a.id IN ({placeholders})
+"""
+
+
+def public_record(record):
+    """The PUBLIC_FIELDS of a database row or token, shaped the same either way."""
+    public = {field: record.get(field) for field in PUBLIC_FIELDS}
+    if public["certificate_hash"]:
+        public["certificate_hash"] = public["certificate_hash"][:HASH_PREFIX]
+    if public["created_at"]:
+        public["created_at"] = str(public["created_at"])[:10]
+    return public
+
+
+class ResultCache:
+    """
+    Bounded LRU of id -> public record (None for unknown ids), each entry
+    kept for at most `ttl` seconds so edits show up within that window.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, ids):
+        """Cached entries among `ids`, as a dict."""
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for achievement_id in ids:
+                entry = self._entries.get(achievement_id)
+                if entry is None:
+                    continue
+                if entry[0] <= now:
+                    del self._entries[achievement_id]
+                    continue
+                self._entries.move_to_end(achievement_id)
+                found[achievement_id] = entry[1]
+        return found
+
+    def put_many(self, records):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for achievement_id, record in records.items():
+                self._entries[achievement_id] = (expires, record)
+                self._entries.move_to_end(achievement_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def lookup(connection, ids, cache):
+    """Public records for `ids` (None where unknown), from the cache or one chunked IN query."""
+    records = cache.get_many(ids) if cache.ttl > 0 else {}
+    missing = [achievement_id for achievement_id in ids if achievement_id not in records]
+    if missing:
+        fetched = dict.fromkeys(missing)
+        for chunk in chunks(missing):
+            for row in connection.execute(_LOOKUP.format(placeholders=", ".join("?" * len(chunk))), chunk):
+                fetched[row["id"]] = public_record(dict(row))
+        if cache.ttl > 0:
+            cache.put_many(fetched)
+        records.update(fetched)
+    return records
+
+
+def _parse_id(item):
+    if isinstance(item, bool):
+        return None
+    if isinstance(item, int):
+        return item
+    if isinstance(item, str) and item.strip().isdigit():
+        return int(item)
+    return None
+
+
+def verify_batch(connection, items, cache, secret, revocations, revocation_ttl):
+    """
+    Verify a mix of achievement ids and signed tokens.
+
+    Args:
+        items (list): Integer ids (or digit strings) and token strings
+        cache (ResultCache): Per-id results shared between requests
+        secret (str): Token signing key
+        revocations (RevocationSet): Token revocation snapshot
+
+    Returns:
+        list: One {"input", "status"[, "source", "achievement"]} per item, in
+              order. status is "verified", "not_found", "revoked" or
+              "invalid"; source says whether the record came from the token
+              or the database (stale tokens fall back to the database).
+    """
+    results, by_id = [], []
+    for item in items:
+        result = {"input": item}
+        results.append(result)
+        achievement_id = _parse_id(item)
+        if achievement_id is not None:
+            by_id.append((result, achievement_id))
+            continue
+        if not isinstance(item, str):
+            result["status"] = "invalid"
+            continue
+        try:
+            claims = read_token(secret, item)
+        except ValueError:
+            result["status"] = "invalid"
+            continue
+
+        status = revocations.status(connection, claims, revocation_ttl)
+        if status == REVOKED:
+            result["status"] = "revoked"
+        elif status == STALE:
+            by_id.append((result, claims["id"]))
+        else:
+            result.update(status="verified", source="token", achievement=public_record(claims))
+
+    records = lookup(connection, list(dict.fromkeys(achievement_id for _, achievement_id in by_id)), cache)
+    for result, achievement_id in by_id:
+        record = records.get(achievement_id)
+        if record is None:
+            result["status"] = "not_found"
+        else:
+            result.update(status="verified", source="database", achievement=record)
+    return results
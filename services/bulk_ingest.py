@@ -0,0 +1,361 @@
+"""
+Bulk certificate ingestion from a directory or ZIP plus a CSV manifest.
+
+The manifest has one row per achievement: `file` (path inside the
+directory or ZIP), `student_id`, `achievement_type` and optionally any of
+the form's other fields. Ingestion runs in stages so each cost is paid
+once and in bulk:
+
+1. validate every row, checking students with chunked IN queries
+2. copy each certificate into the upload folder, hashing in the same pass
+3. drop files seen earlier in the manifest or already registered
+4. move the rest into content-addressed storage (see upload_service)
+5. OCR, parse and perceptually hash them in a process pool, reusing
+   ocr_results for bytes read before
+6. insert achievements with executemany, `batch_size` rows per transaction,
+   while the pool keeps working on the next batch. A batch that violates a
+   constraint (say a hash registered by someone else meanwhile) is rolled
+   back and retried row by row; only the offending rows are skipped.
+
+Without a Tesseract binary step 5 only hashes; the rows are inserted with
+ocr_status 'pending' and queued for `flask ocr-worker`. A file whose OCR
+fails is queued the same way, so the worker's retries apply to it.
+"""
+
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import time
+import zipfile
+
+from services.achievement_import import FORM_COLUMNS
+from services.certificate_service import store_ocr_results
+from services.duplicate_index import DEFAULT_MAX_DISTANCE, certificate_phash, find_near_duplicates
+from services.upload_service import discard_upload, receive_stream, store_blob
+from utils.certificate_ocr import extract_text_from_certificate, ocr_engine_version
+from utils.certificate_parser import parse_certificate_text
+from utils.image_hash import BKTree, hex_to_hash
+from utils.sql import chunks, select_existing
+
+
+MANIFEST_NAME = "manifest.csv"
+REQUIRED_COLUMNS = ("file", "student_id", "achievement_type")
+ALLOWED_EXTENSIONS = {"pdf", "png", "jpg", "jpeg"}
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100
+
+_INSERT = f"""
+    INSERT INTO achievements (
+        teacher_id, student_id, achievement_type, {", ".join(FORM_COLUMNS)},
+        certificate_path, certificate_hash, certificate_phash, near_duplicate_of,
+        ocr_status, ocr_text, ocr_data
+    ) VALUES ({", ".join("?" * (len(FORM_COLUMNS) + 10))})
+"""
+
+
+class _DirectorySource:
+    def __init__(self, root):
+        self.root = os.path.realpath(root)
+
+    def open(self, name):
+        path = os.path.realpath(os.path.join(self.root, name))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise FileNotFoundError(name)
+        return open(path, "rb")
+
+    def close(self):
+        pass
+
+
+class _ZipSource:
+    def __init__(self, path):
+        self.archive = zipfile.ZipFile(path)
+
+    def open(self, name):
+        # Members are only ever read into temp files, never extracted by name
+        try:
+            return self.archive.open(name.replace(os.sep, "/"))
+        except KeyError:
+            raise FileNotFoundError(name) from None
+
+    def close(self):
+        self.archive.close()
+
+
+def open_source(path):
+    """A directory or ZIP archive of certificates."""
+    if os.path.isdir(path):
+        return _DirectorySource(path)
+    if zipfile.is_zipfile(path):
+        return _ZipSource(path)
+    raise ValueError(f"{path} is neither a directory nor a ZIP archive")
+
+
+def read_manifest(stream):
+    """
+    Parse a manifest from a text stream.
+
+    Raises:
+        ValueError: If a required column is missing
+
+    Returns:
+        list: (line number, row dict) pairs; values are stripped
+    """
+    reader = csv.DictReader(stream)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Manifest is missing columns: {', '.join(missing)}")
+    return [
+        (reader.line_num, {key: (value or "").strip() for key, value in row.items() if key})
+        for row in reader
+    ]
+
+
+def _cached_text(connection, hashes, engine_version):
+    cached = {}
+    for chunk in chunks(hashes):
+        rows = connection.execute(
+            f"SELECT sha256, raw_text FROM ocr_results "
+            f"WHERE engine_version = ? AND sha256 IN ({', '.join('?' * len(chunk))})",
+            [engine_version, *chunk]
+        )
+        cached.update((sha256, raw_text) for sha256, raw_text in rows)
+    return cached
+
+
+def _validate(connection, rows):
+    students = select_existing(connection, "SELECT student_id FROM student WHERE student_id IN ({placeholders})",
+                               {row["student_id"] for _, row in rows})
+    valid, errors = [], []
+    for line, row in rows:
+        if not row["file"] or not row["student_id"] or not row["achievement_type"]:
+            errors.append((line, row["file"], "file, student_id and achievement_type are required"))
+        elif "." not in row["file"] or row["file"].rsplit(".", 1)[1].lower() not in ALLOWED_EXTENSIONS:
+            errors.append((line, row["file"], "Invalid file type"))
+        elif row["student_id"] not in students:
+            errors.append((line, row["file"], f"Student ID {row['student_id']} not found"))
+        elif row.get("team_size") and not row["team_size"].isdigit():
+            errors.append((line, row["file"], "team_size must be a whole number"))
+        else:
+            valid.append((line, row))
+    return valid, errors
+
+
+def _analyse(task):
+    """Pool worker: OCR (unless cached or unavailable), parse and dHash one stored file."""
+    file_path, raw_text, run_ocr = task
+    duration_ms = None
+    if raw_text is None and run_ocr:
+        started = time.perf_counter()
+        try:
+            raw_text = extract_text_from_certificate(file_path)
+            duration_ms = int((time.perf_counter() - started) * 1000)
+        except Exception as e:
+            # Left to the OCR queue, which retries; nothing is cached
+            logger.warning("OCR failed for %s: %s", file_path, e)
+    parsed = parse_certificate_text(raw_text) if raw_text is not None else None
+    return raw_text, parsed, duration_ms, certificate_phash(file_path)
+
+
+def _flush(connection, batch, teacher_id, engine_version, max_distance):
+    """
+    Insert one batch of analysed rows in a single transaction.
+
+    Rows are checked for near-duplicates against the stored index and
+    against the batch's earlier rows, which the index cannot see until the
+    batch is committed.
+    """
+    values, new_results, queued, batch_matches = [], [], [], []
+    batch_tree = BKTree()
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        before = connection.execute("SELECT COALESCE(MAX(id), 0) FROM achievements").fetchone()[0]
+        for position, (row, blob, (raw_text, parsed, duration_ms, phash)) in enumerate(batch):
+            fields = {column: row.get(column) or None for column in FORM_COLUMNS}
+            fields["team_size"] = int(fields["team_size"]) if fields["team_size"] else None
+            # The manifest wins; OCR fills the gaps, as on the upload form
+            for column in ("event_name", "achievement_date", "organizer", "position"):
+                fields[column] = fields[column] or (parsed or {}).get(column) or ""
+
+            similar = find_near_duplicates(connection, phash, max_distance, limit=1)
+            if phash is not None:
+                earlier = batch_tree.search(hex_to_hash(phash), max_distance)
+                if earlier and (not similar or earlier[0][0] < similar[0]["distance"]):
+                    similar = []
+                    batch_matches.append((position, earlier[0][1]))
+                batch_tree.add(hex_to_hash(phash), position)
+            values.append((
+                teacher_id, row["student_id"], row["achievement_type"], *fields.values(),
+                blob["path"], blob["sha256"], phash, similar[0]["id"] if similar else None,
+                "done" if raw_text is not None else "pending",
+                raw_text, json.dumps(parsed) if parsed is not None else None,
+            ))
+            if duration_ms is not None and engine_version is not None:
+                new_results.append((blob["sha256"], raw_text, parsed, engine_version, duration_ms))
+            if raw_text is None:
+                queued.append((blob["file_path"], blob["sha256"]))
+
+        connection.executemany(_INSERT, values)
+        if batch_matches:
+            # The write lock is held, so ids above `before` are this batch, in order
+            ids = [r[0] for r in connection.execute(
+                "SELECT id FROM achievements WHERE id > ? ORDER BY id", (before,))]
+            connection.executemany("UPDATE achievements SET near_duplicate_of = ? WHERE id = ?",
+                                   [(ids[earlier], ids[position]) for position, earlier in batch_matches])
+        store_ocr_results(connection, new_results)
+        connection.executemany("""
+            INSERT INTO ocr_jobs (achievement_id, file_path, status)
+            SELECT id, ?, 'queued' FROM achievements WHERE certificate_hash = ?
+        """, queued)
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    return len(values), len(queued)
+
+
+def _flush_or_skip(connection, batch, teacher_id, engine_version, max_distance, errors):
+    """
+    _flush() a batch of (line, row, blob, result); on an IntegrityError the
+    batch is rolled back and its rows are retried one at a time, and those
+    that still fail are reported in `errors` instead of aborting the run.
+    """
+    try:
+        return _flush(connection, [item[1:] for item in batch], teacher_id, engine_version, max_distance)
+    except sqlite3.IntegrityError as e:
+        if len(batch) == 1:
+            line, row = batch[0][:2]
+            errors.append((line, row["file"], f"Not inserted: {e}"))
+            return 0, 0
+        logger.warning("Batch of %s rows rolled back (%s); retrying row by row", len(batch), e)
+        inserted = queued = 0
+        for item in batch:
+            rows, jobs = _flush_or_skip(connection, [item], teacher_id, engine_version, max_distance, errors)
+            inserted += rows
+            queued += jobs
+        return inserted, queued
+
+
+def ingest(connection, source_path, upload_root, teacher_id, manifest_path=None,
+           workers=None, batch_size=DEFAULT_BATCH_SIZE, max_distance=DEFAULT_MAX_DISTANCE,
+           progress=None):
+    """
+    Ingest every certificate listed in a manifest.
+
+    Args:
+        source_path (str): Directory or ZIP archive holding the certificates
+        upload_root (str): The app's upload folder
+        manifest_path (str): CSV manifest; defaults to manifest.csv inside the source
+        workers (int): OCR processes; None for one per CPU, 0 or 1 to run inline
+        progress (callable): Called with (rows done, rows total) after each batch
+
+    Raises:
+        ValueError: Unknown teacher, unreadable source or malformed manifest
+
+    Returns:
+        dict: counts, per-row errors as (line, file, message) and stage timings
+    """
+    started = time.perf_counter()
+    if connection.execute("SELECT 1 FROM teacher WHERE teacher_id = ?", (teacher_id,)).fetchone() is None:
+        raise ValueError(f"Teacher ID {teacher_id} not found")
+
+    source = open_source(source_path)
+    try:
+        if manifest_path:
+            with open(manifest_path, newline="", encoding="utf-8-sig") as f:
+                rows = read_manifest(f)
+        else:
+            try:
+                with source.open(MANIFEST_NAME) as f:
+                    rows = read_manifest(io.TextIOWrapper(f, encoding="utf-8-sig", newline=""))
+            except FileNotFoundError:
+                raise ValueError(f"No {MANIFEST_NAME} in {source_path}; pass the manifest explicitly") from None
+
+        report = {"rows": len(rows), "inserted": 0, "duplicates": 0, "queued": 0,
+                  "ocr_run": 0, "ocr_cached": 0, "bytes": 0, "errors": []}
+        valid, report["errors"] = _validate(connection, rows)
+
+        # Copy and hash
+        staged = []
+        for line, row in valid:
+            try:
+                with source.open(row["file"]) as f:
+                    staged.append((line, row, receive_stream(f, upload_root)))
+            except (FileNotFoundError, IsADirectoryError):
+                report["errors"].append((line, row["file"], "File not found"))
+    finally:
+        source.close()
+    staged_at = time.perf_counter()
+
+    # Dedupe within the manifest, then against the database
+    registered = select_existing(connection, "SELECT certificate_hash FROM achievements "
+                                             "WHERE certificate_hash IN ({placeholders})",
+                                 {upload.sha256 for _, _, upload in staged})
+    first_line, unique = {}, []
+    for line, row, upload in staged:
+        if upload.sha256 in registered or upload.sha256 in first_line:
+            discard_upload(upload)
+            report["duplicates"] += 1
+            reason = ("Already registered" if upload.sha256 in registered
+                      else f"Duplicate of line {first_line[upload.sha256]}")
+            report["errors"].append((line, row["file"], reason))
+            continue
+        first_line[upload.sha256] = line
+        unique.append((line, row, upload))
+
+    # Into blob storage; unreferenced blobs from an aborted run are removed by gc-uploads
+    blobs = []
+    with connection:
+        cursor = connection.cursor()
+        for line, row, upload in unique:
+            ext = row["file"].rsplit(".", 1)[1].lower()
+            file_path, path = store_blob(cursor, upload, upload_root, ext)
+            report["bytes"] += upload.size
+            blobs.append({"file_path": file_path, "path": path, "sha256": upload.sha256})
+
+    engine_version = ocr_engine_version()
+    cached = _cached_text(connection, [blob["sha256"] for blob in blobs], engine_version) if engine_version else {}
+    report["ocr_cached"] = len(cached)
+    tasks = [(blob["file_path"], cached.get(blob["sha256"]), engine_version is not None) for blob in blobs]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    pool = multiprocessing.Pool(min(workers, len(tasks))) if workers > 1 and len(tasks) > 1 else None
+    try:
+        results = pool.imap(_analyse, tasks) if pool else map(_analyse, tasks)
+        batch = []
+        for (line, row, _), blob, result in zip(unique, blobs, results):
+            if result[2] is not None:
+                report["ocr_run"] += 1
+            batch.append((line, row, blob, result))
+            if len(batch) >= batch_size:
+                inserted, queued = _flush_or_skip(connection, batch, teacher_id, engine_version, max_distance,
+                                                  report["errors"])
+                report["inserted"] += inserted
+                report["queued"] += queued
+                batch = []
+                if progress:
+                    progress(report["inserted"], len(unique))
+        if batch:
+            inserted, queued = _flush_or_skip(connection, batch, teacher_id, engine_version, max_distance,
+                                              report["errors"])
+            report["inserted"] += inserted
+            report["queued"] += queued
+            if progress:
+                progress(report["inserted"], len(unique))
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    finished = time.perf_counter()
+    report["errors"].sort()
+    report["timings"] = {"stage": staged_at - started, "process": finished - staged_at, "total": finished - started}
+    return report
+
@@ -1,5 +1,8 @@
-import hashlib
-from utils.certificate_ocr import extract_text_from_certificate
+import json
+import time
+
+from services.upload_service import hash_file
+from utils.certificate_ocr import extract_text_from_certificate, ocr_engine_version
 from utils.certificate_parser import parse_certificate_text
 
 
@@ -7,26 +10,78 @@ def generate_file_hash(file_path):
     """
     Generate SHA256 hash for duplicate detection.
     """
-    sha256 = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        while chunk := f.read(4096):
-            sha256.update(chunk)
-    return sha256.hexdigest()
+    return hash_file(file_path)
+
+
+def get_cached_ocr(connection, file_hash, engine_version):
+    """
+    Raw OCR text previously produced for these exact bytes by this engine.
+    Returns None on a miss.
+    """
+    row = connection.execute(
+        "SELECT raw_text FROM ocr_results WHERE sha256 = ? AND engine_version = ?",
+        (file_hash, engine_version)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def store_ocr_result(connection, file_hash, raw_text, parsed_data, engine_version, duration_ms):
+    """Remember an OCR result; commits so concurrent workers see it straight away."""
+    with connection:
+        store_ocr_results(connection, [(file_hash, raw_text, parsed_data, engine_version, duration_ms)])
+
+
+def store_ocr_results(connection, results):
+    """
+    Upsert many (sha256, raw_text, parsed_data, engine_version, duration_ms)
+    tuples in the caller's transaction.
+    """
+    connection.executemany("""
+        INSERT INTO ocr_results (sha256, raw_text, parsed_data, engine_version, duration_ms)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(sha256) DO UPDATE SET
+            raw_text = excluded.raw_text,
+            parsed_data = excluded.parsed_data,
+            engine_version = excluded.engine_version,
+            duration_ms = excluded.duration_ms,
+            created_at = CURRENT_TIMESTAMP
+    """, [(file_hash, raw_text, json.dumps(parsed_data), engine_version, duration_ms)
+          for file_hash, raw_text, parsed_data, engine_version, duration_ms in results])
 
 
-def process_certificate(file_path):
+def process_certificate(file_path, file_hash=None, connection=None):
     """
     Orchestrates:
-    - OCR
-    - Parsing
-    - Hash generation
+    - OCR (skipped when ocr_results already has text for these bytes)
+    - Parsing (always re-run, so parser changes apply to cached text)
+    - Hash generation (skipped when the caller already hashed the upload)
+
+    Raises whatever the OCR step raised; nothing is cached for a failed
+    run, so the OCR queue retries it.
     """
-    raw_text = extract_text_from_certificate(file_path)
+    if file_hash is None:
+        file_hash = generate_file_hash(file_path)
+
+    engine_version = ocr_engine_version()
+    raw_text = None
+    if connection is not None and engine_version is not None:
+        raw_text = get_cached_ocr(connection, file_hash, engine_version)
+    cached = raw_text is not None
+
+    if not cached:
+        started = time.perf_counter()
+        raw_text = extract_text_from_certificate(file_path)
+        duration_ms = int((time.perf_counter() - started) * 1000)
+
     parsed_data = parse_certificate_text(raw_text)
-    file_hash = generate_file_hash(file_path)
+
+    # Without a working engine the empty text is an error, not a result
+    if not cached and connection is not None and engine_version is not None:
+        store_ocr_result(connection, file_hash, raw_text, parsed_data, engine_version, duration_ms)
 
     return {
         "raw_text": raw_text,
         "parsed_data": parsed_data,
-        "file_hash": file_hash
+        "file_hash": file_hash,
+        "cached": cached
     }
@@ -0,0 +1,98 @@
+"""
+Process-wide near-duplicate index over stored certificate hashes.
+
+The BK-tree is built from achievements.certificate_phash the first time it
+is queried, then caught up incrementally: every lookup first loads rows
+with an id above the highest one already indexed, so rows inserted by
+other workers or processes are picked up without a rebuild. Updates to
+existing rows (backfill-phash) bump index_generations, which triggers a
+full rebuild in every process on its next lookup. Deleted rows are
+filtered out when matches are confirmed against the database.
+"""
+
+import logging
+import threading
+
+from utils.image_hash import BKTree, dhash, hash_to_hex, hex_to_hash
+
+
+IMAGE_EXTENSIONS = {"png", "jpg", "jpeg"}
+DEFAULT_MAX_DISTANCE = 10
+
+_lock = threading.Lock()
+_tree = BKTree()
+_last_id = 0
+_generation = None
+
+logger = logging.getLogger(__name__)
+
+
+def certificate_phash(file_path):
+    """
+    Perceptual hash of an image certificate as stored in the database.
+
+    Returns:
+        str: Hex dHash, or None for PDFs and files Pillow can't read
+    """
+    if file_path.rsplit(".", 1)[-1].lower() not in IMAGE_EXTENSIONS:
+        return None
+    try:
+        return hash_to_hex(dhash(file_path))
+    except Exception as e:
+        logger.warning("Perceptual hash failed for %s: %s", file_path, e)
+        return None
+
+
+def _catch_up(connection):
+    global _tree, _last_id, _generation
+    generation = connection.execute(
+        "SELECT generation FROM index_generations WHERE name = 'certificate_phash'").fetchone()[0]
+    if generation != _generation:
+        _tree, _last_id, _generation = BKTree(), 0, generation
+
+    rows = connection.execute("""
+        SELECT id, certificate_phash FROM achievements
+        WHERE id > ? AND certificate_phash IS NOT NULL
+        ORDER BY id
+    """, (_last_id,)).fetchall()
+    for achievement_id, phash in rows:
+        _tree.add(hex_to_hash(phash), achievement_id)
+    if rows:
+        _last_id = rows[-1][0]
+
+
+def find_near_duplicates(connection, phash, max_distance=DEFAULT_MAX_DISTANCE, limit=5):
+    """
+    Stored certificates that look like `phash`.
+
+    Returns:
+        list: sqlite3.Row (id, student_id, event_name, distance) for up to
+              `limit` existing achievements, closest first
+    """
+    if phash is None:
+        return []
+
+    with _lock:
+        _catch_up(connection)
+        candidates = _tree.search(hex_to_hash(phash), max_distance)
+
+    matches = []
+    for distance, achievement_id in candidates:
+        row = connection.execute(
+            "SELECT id, student_id, event_name, ? AS distance FROM achievements WHERE id = ?",
+            (distance, achievement_id)
+        ).fetchone()
+        if row is not None:
+            matches.append(row)
+            if len(matches) >= limit:
+                break
+    return matches
+
+
+def reset():
+    """Drop the in-memory index; the next lookup rebuilds it from the database."""
+    global _tree, _last_id, _generation
+    with _lock:
+        _tree = BKTree()
+        _last_id = 0
+        _generation = None
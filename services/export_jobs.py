@@ -0,0 +1,252 @@
+"""
+Background admin exports.
+
+An export job is a row in export_jobs. Enqueuing records the request and
+hands it to a small thread pool; the worker streams the export to a file
+under the export folder, updating rows_written as it goes, so the HTTP
+request that asked for it returns immediately.
+
+The pool lives in the web process, so a restart or crash strands whatever
+it was working on. Each job records the process that owns it and a
+heartbeat the worker refreshes after every batch. fail_stale() runs at
+startup and whenever a job's status is read, and fails jobs whose owner is
+gone or whose heartbeat stopped, so they do not show as in progress
+forever. Another live process's jobs are left alone.
+"""
+
+import json
+import logging
+import os
+import socket
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from services.export_service import build_query, count_rows, get_export, gzip_stream, iter_csv
+from utils import db
+
+
+FORMATS = {
+    "csv": {"suffix": ".csv", "mimetype": "text/csv"},
+    "csv.gz": {"suffix": ".csv.gz", "mimetype": "application/gzip"},
+}
+
+# A running job whose heartbeat is older than this has stopped making progress
+HEARTBEAT_TIMEOUT_SECONDS = 300
+# A queued job owned by another host may wait its turn in that host's pool
+# this long before it is presumed lost
+STALE_AFTER_SECONDS = 3600
+
+# host:pid:boot. The boot token tells this process apart from an earlier
+# one that had the same pid (containers often run as pid 1).
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_executor = None
+_executor_workers = None
+
+logger = logging.getLogger(__name__)
+
+
+def _get_executor(workers):
+    global _executor, _executor_workers
+    if _executor is None or _executor_workers != workers:
+        if _executor is not None:
+            # Lets submitted jobs finish, then its threads exit
+            _executor.shutdown(wait=False)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export-job")
+        _executor_workers = workers
+    return _executor
+
+
+def _process_id():
+    # Recomputed after fork(): the child must not inherit the parent's identity
+    global PROCESS_ID
+    host, pid, _ = PROCESS_ID.rsplit(":", 2)
+    if int(pid) != os.getpid():
+        PROCESS_ID = f"{host}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    return PROCESS_ID
+
+
+def owner_gone(owner):
+    """
+    True if `owner` is a process on this host that no longer exists.
+
+    Owners on other hosts can't be probed; their heartbeat decides.
+    """
+    if not owner:
+        return True  # recorded before jobs had owners
+    if owner == _process_id():
+        return False
+    host, pid, _ = owner.rsplit(":", 2)
+    if host != socket.gethostname():
+        return False
+    if int(pid) == os.getpid():
+        return True  # an earlier process that had our pid
+    if os.name == "nt":
+        return False  # os.kill(pid, 0) would send CTRL_C_EVENT there
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+def enqueue_export(connection, db_path, export_folder, export_type, filters=None,
+                   fmt="csv", requested_by=None, workers=2):
+    """
+    Record an export job and start it in the background.
+
+    Raises:
+        ValueError: For an unknown format or an unsupported filter
+
+    Returns:
+        int: The new job's id
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    filters = {k: v for k, v in (filters or {}).items() if v not in (None, "")}
+    build_query(export_type, filters)  # validate filters before queueing
+
+    cursor = connection.cursor()
+    cursor.execute("""
+        INSERT INTO export_jobs (export_type, filters, format, status, requested_by,
+                                 owner, heartbeat_at)
+        VALUES (?, ?, ?, 'queued', ?, ?, CURRENT_TIMESTAMP)
+    """, (export_type, json.dumps(filters), fmt, requested_by, _process_id()))
+    job_id = cursor.lastrowid
+    connection.commit()
+
+    _get_executor(workers).submit(run_export_job, db_path, export_folder, job_id)
+    return job_id
+
+
+def fail_stale(connection, job_id=None, heartbeat_timeout=HEARTBEAT_TIMEOUT_SECONDS,
+               stale_after=STALE_AFTER_SECONDS):
+    """
+    Mark jobs orphaned by a dead process as failed: the owner is gone, a
+    running job's heartbeat stopped, or a queued job waited too long.
+
+    Args:
+        job_id (int): Check only this job (status reads); None checks all
+
+    Returns:
+        int: Number of jobs marked failed
+    """
+    rows = connection.execute(f"""
+        SELECT id, status, owner,
+               COALESCE(heartbeat_at, started_at, created_at) < datetime('now', ?) AS silent,
+               COALESCE(heartbeat_at, started_at, created_at) < datetime('now', ?) AS expired
+        FROM export_jobs
+        WHERE status IN ('queued', 'running') {"AND id = ?" if job_id is not None else ""}
+    """, (f"-{int(heartbeat_timeout)} seconds", f"-{int(stale_after)} seconds",
+          *([job_id] if job_id is not None else []))).fetchall()
+
+    stale = [row[0] for row in rows
+             if owner_gone(row[2]) or row[3 if row[1] == "running" else 4]]
+    if not stale:
+        return 0
+    with connection:
+        connection.executemany("""
+            UPDATE export_jobs
+            SET status = 'failed', error = 'Interrupted by a server restart; please request it again',
+                finished_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status IN ('queued', 'running')
+        """, [(job,) for job in stale])
+    for job in stale:
+        logger.warning("Export job %s was orphaned; marked failed", job)
+    return len(stale)
+
+
+def run_export_job(db_path, export_folder, job_id):
+    """
+    Write one export job's artifact to disk.
+
+    Runs on a worker thread with that thread's own pooled connection. The
+    file is written under a temporary name and renamed into place only once
+    complete, so a download never sees a partial file.
+    """
+    connection = db.get_connection(db_path)
+    job = connection.execute("SELECT * FROM export_jobs WHERE id = ?", (job_id,)).fetchone()
+    if job is None:
+        return
+
+    export_type = job["export_type"]
+    filters = json.loads(job["filters"] or "{}")
+    fmt = FORMATS[job["format"]]
+    final_path = os.path.join(export_folder, f"export_{job_id}_{export_type}{fmt['suffix']}")
+    temp_path = final_path + ".part"
+
+    def progress(written):
+        connection.execute("""
+            UPDATE export_jobs SET rows_written = ?, heartbeat_at = CURRENT_TIMESTAMP WHERE id = ?
+        """, (written, job_id))
+        connection.commit()
+
+    try:
+        os.makedirs(export_folder, exist_ok=True)
+        total = count_rows(connection, export_type, filters)
+        connection.execute("""
+            UPDATE export_jobs
+            SET status = 'running', rows_total = ?, rows_written = 0,
+                started_at = CURRENT_TIMESTAMP, heartbeat_at = CURRENT_TIMESTAMP, owner = ?
+            WHERE id = ?
+        """, (total, _process_id(), job_id))
+        connection.commit()
+
+        # Read the export in its own snapshot so the progress commits above
+        # and below never interleave with the open SELECT
+        reader = db.connect(db_path)
+        try:
+            chunks = iter_csv(reader, export_type, filters=filters, progress=progress)
+            if job["format"] == "csv.gz":
+                data = gzip_stream(chunks)
+            else:
+                data = (chunk.encode("utf-8") for chunk in chunks)
+            with open(temp_path, "wb") as f:
+                for block in data:
+                    f.write(block)
+        finally:
+            reader.close()
+
+        os.replace(temp_path, final_path)
+        connection.execute("""
+            UPDATE export_jobs
+            SET status = 'done', file_path = ?, finished_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (final_path, job_id))
+        connection.commit()
+    except Exception as e:
+        logger.warning("Export job %s failed: %s", job_id, e)
+        if connection.in_transaction:
+            connection.rollback()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        connection.execute("""
+            UPDATE export_jobs
+            SET status = 'failed', error = ?, finished_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (str(e), job_id))
+        connection.commit()
+
+
+def job_status(row):
+    """JSON-friendly view of an export_jobs row."""
+    return {
+        "id": row["id"],
+        "type": row["export_type"],
+        "format": row["format"],
+        "filters": json.loads(row["filters"] or "{}"),
+        "status": row["status"],
+        "rows_written": row["rows_written"],
+        "rows_total": row["rows_total"],
+        "error": row["error"],
+        "created_at": row["created_at"],
+        "finished_at": row["finished_at"],
+    }
+
+
+def download_name(row):
+    """Filename offered to the browser for a finished job."""
+    base = get_export(row["export_type"])["filename"].rsplit(".csv", 1)[0]
+    return f"{base}{FORMATS[row['format']]['suffix']}"
@@ -0,0 +1,202 @@
+import csv
+import io
+import zlib
+
+
+def _student_row(row):
+    return [
+        row["student_id"],
+        row["student_name"],
+        row["email"],
+        row["phone_number"] or "",
+        row["student_gender"] or "",
+        row["student_dept"] or "",
+        "Yes" if row["is_approved"] else "No",
+        row["created_at"]
+    ]
+
+
+def _teacher_row(row):
+    return [
+        row["teacher_id"],
+        row["teacher_name"],
+        row["email"],
+        row["phone_number"] or "",
+        row["teacher_gender"] or "",
+        row["teacher_dept"] or "",
+        "Yes" if row["is_approved"] else "No",
+        row["created_at"]
+    ]
+
+
+def _achievement_row(row):
+    return [
+        row["id"],
+        row["student_id"],
+        row["student_name"],
+        row["teacher_id"],
+        row["teacher_name"],
+        row["achievement_type"],
+        row["event_name"],
+        row["achievement_date"],
+        row["organizer"],
+        row["position"],
+        row["achievement_description"] or "",
+        row["certificate_path"] or "",
+        row["created_at"]
+    ]
+
+
+# Everything needed to produce one kind of admin export. "filters" maps the
+# filter names an export accepts to the SQL condition each one adds.
+EXPORTS = {
+    "students": {
+        "filename": "students_export.csv",
+        "headers": ["Student ID", "Name", "Email", "Phone", "Gender", "Department", "Approved", "Created At"],
+        "select": "SELECT * FROM student",
+        "order_by": "student_name",
+        "filters": {
+            "dept": "student_dept = ?",
+            "approved": "is_approved = ?",
+        },
+        "row": _student_row,
+    },
+    "teachers": {
+        "filename": "teachers_export.csv",
+        "headers": ["Teacher ID", "Name", "Email", "Phone", "Gender", "Department", "Approved", "Created At"],
+        "select": "SELECT * FROM teacher",
+        "order_by": "teacher_name",
+        "filters": {
+            "dept": "teacher_dept = ?",
+            "approved": "is_approved = ?",
+        },
+        "row": _teacher_row,
+    },
+    "achievements": {
+        "filename": "achievements_export.csv",
+        "headers": ["ID", "Student ID", "Student Name", "Teacher ID", "Teacher Name",
+                    "Achievement Type", "Event Name", "Date", "Organizer", "Position",
+                    "Description", "Certificate Path", "Created At"],
+        "select": """
+            SELECT a.*, s.student_name, t.teacher_name
+            FROM achievements a
+            JOIN student s ON a.student_id = s.student_id
+            JOIN teacher t ON a.teacher_id = t.teacher_id
+        """,
+        "order_by": "a.achievement_date DESC",
+        "filters": {
+            "teacher_id": "a.teacher_id = ?",
+            "student_id": "a.student_id = ?",
+            "achievement_type": "a.achievement_type = ?",
+            "date_from": "a.achievement_date >= ?",
+            "date_to": "a.achievement_date <= ?",
+        },
+        "row": _achievement_row,
+    },
+}
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def get_export(export_type):
+    """
+    Look up an export definition.
+    Unknown types fall back to achievements, as the admin export always has.
+    """
+    return EXPORTS.get(export_type, EXPORTS["achievements"])
+
+
+def _filtered(export, filters):
+    """Return (SELECT ... WHERE ..., params) for the given filters."""
+    conditions = []
+    params = []
+    for name, value in (filters or {}).items():
+        if value in (None, ""):
+            continue
+        if name not in export["filters"]:
+            raise ValueError(f"Unknown export filter: {name}")
+        conditions.append(export["filters"][name])
+        params.append(value)
+
+    query = export["select"]
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    return query, params
+
+
+def build_query(export_type, filters=None):
+    """
+    Build the ordered export query.
+
+    Returns:
+        tuple: (sql, params)
+
+    Raises:
+        ValueError: If a filter is not supported by this export type
+    """
+    export = get_export(export_type)
+    query, params = _filtered(export, filters)
+    return f"{query} ORDER BY {export['order_by']}", params
+
+
+def count_rows(connection, export_type, filters=None):
+    """Number of rows an export with these filters will contain."""
+    query, params = _filtered(get_export(export_type), filters)
+    return connection.execute(f"SELECT COUNT(*) FROM ({query})", params).fetchone()[0]
+
+
+def iter_csv(connection, export_type, batch_size=DEFAULT_BATCH_SIZE, filters=None, progress=None):
+    """
+    Stream an export as CSV text chunks.
+
+    Rows are read with fetchmany() and each batch is written and yielded
+    before the next is fetched, so memory is bounded by batch_size rather
+    than by table size.
+
+    Args:
+        filters (dict): Optional filters, see EXPORTS[...]["filters"]
+        progress (callable): Called with the running row count after each batch
+
+    Yields:
+        str: The header line first, then one chunk per batch
+    """
+    export = get_export(export_type)
+    query, params = build_query(export_type, filters)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(export["headers"])
+    yield buffer.getvalue()
+
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    written = 0
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(export["row"](row) for row in rows)
+            written += len(rows)
+            if progress:
+                progress(written)
+            yield buffer.getvalue()
+    finally:
+        cursor.close()
+
+
+def gzip_stream(chunks):
+    """
+    Gzip a stream of text chunks on the fly.
+
+    Yields:
+        bytes: gzip-framed compressed data
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        # Sync-flush per chunk so each batch reaches the client as soon as
+        # it is read instead of sitting in the compressor's window
+        yield compressor.compress(chunk.encode("utf-8")) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
@@ -0,0 +1,245 @@
+"""
+Persistent OCR job queue.
+
+Certificate uploads are OCR'd off the request thread. Submitting an
+achievement inserts an ocr_jobs row in the same transaction as the
+achievement itself; worker threads (or a separate `flask ocr-worker`
+process) claim queued jobs one at a time, run process_certificate() and
+write the result back onto the achievement row. Because the queue lives in
+SQLite, jobs survive restarts and any number of processes can share it.
+
+A failed job is retried after an exponential backoff (not_before), and
+every worker periodically returns jobs orphaned by a dead worker to the
+queue.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from services.certificate_service import process_certificate
+from utils import db
+
+
+MAX_ATTEMPTS = 3
+POLL_INTERVAL = 2.0
+# A job left 'running' this long is assumed orphaned by a crashed worker
+STALE_AFTER_SECONDS = 600
+# How often each worker looks for such jobs
+REQUEUE_INTERVAL = 60
+# Retry n waits RETRY_BASE_SECONDS * 2**n, so a transient error can clear
+RETRY_BASE_SECONDS = 5
+
+_wake = threading.Event()
+_workers = []
+_workers_lock = threading.Lock()
+# Threads don't survive fork(); a forked server process starts its own
+_workers_pid = None
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_ocr(cursor, achievement_id, file_path):
+    """
+    Queue OCR for an achievement's certificate.
+
+    Runs inside the caller's transaction and does not commit, so the job
+    exists if and only if the achievement does. Call notify() after commit.
+    """
+    cursor.execute("""
+        INSERT INTO ocr_jobs (achievement_id, file_path, status)
+        VALUES (?, ?, 'queued')
+    """, (achievement_id, file_path))
+    job_id = cursor.lastrowid
+    cursor.execute("UPDATE achievements SET ocr_status = 'pending' WHERE id = ?", (achievement_id,))
+    return job_id
+
+
+def requeue_all(connection, static_root):
+    """
+    Queue OCR again for every achievement with a certificate, e.g. after a
+    parser change. Certificates already in ocr_results skip Tesseract.
+
+    Returns:
+        int: Number of jobs queued
+    """
+    with connection:
+        cursor = connection.execute("""
+            INSERT INTO ocr_jobs (achievement_id, file_path, status)
+            SELECT id, ? || certificate_path, 'queued' FROM achievements
+            WHERE certificate_path IS NOT NULL
+        """, (static_root.rstrip("/") + "/",))
+        connection.execute("""
+            UPDATE achievements SET ocr_status = 'pending' WHERE certificate_path IS NOT NULL
+        """)
+    return cursor.rowcount
+
+
+def notify():
+    """Wake idle workers so a freshly committed job is picked up immediately."""
+    _wake.set()
+
+
+def claim_job(connection):
+    """
+    Atomically take the oldest queued job whose retry backoff has passed.
+
+    Returns:
+        sqlite3.Row: (id, achievement_id, file_path, attempts), or None if the queue is empty
+    """
+    row = connection.execute("""
+        UPDATE ocr_jobs
+        SET status = 'running', attempts = attempts + 1, started_at = CURRENT_TIMESTAMP
+        WHERE id = (
+            SELECT id FROM ocr_jobs
+            WHERE status = 'queued' AND (not_before IS NULL OR not_before <= CURRENT_TIMESTAMP)
+            ORDER BY id LIMIT 1
+        )
+        RETURNING id, achievement_id, file_path, attempts
+    """).fetchone()
+    connection.commit()
+    return row
+
+
+def _finish(connection, job, result):
+    parsed = result.get("parsed_data") or {}
+    with connection:
+        # Only fill in fields the teacher left blank
+        connection.execute("""
+            UPDATE achievements
+            SET ocr_status = 'done',
+                ocr_text = ?,
+                ocr_data = ?,
+                event_name = COALESCE(NULLIF(event_name, ''), ?, event_name),
+                achievement_date = COALESCE(NULLIF(achievement_date, ''), ?, achievement_date),
+                organizer = COALESCE(NULLIF(organizer, ''), ?, organizer),
+                position = COALESCE(NULLIF(position, ''), ?, position)
+            WHERE id = ?
+        """, (
+            result.get("raw_text"),
+            json.dumps(parsed),
+            parsed.get("event_name"),
+            parsed.get("achievement_date"),
+            parsed.get("organizer"),
+            parsed.get("position"),
+            job["achievement_id"],
+        ))
+        connection.execute("""
+            UPDATE ocr_jobs SET status = 'done', error = NULL, finished_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (job["id"],))
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next attempt of a job that failed `attempts` times."""
+    return RETRY_BASE_SECONDS * 2 ** attempts
+
+
+def _fail(connection, job, error):
+    retry = job["attempts"] < MAX_ATTEMPTS
+    with connection:
+        connection.execute("""
+            UPDATE ocr_jobs
+            SET status = ?, error = ?, finished_at = CURRENT_TIMESTAMP,
+                not_before = datetime('now', ?)
+            WHERE id = ?
+        """, ("queued" if retry else "failed", str(error),
+              f"+{int(retry_delay(job['attempts']))} seconds", job["id"]))
+        if not retry:
+            connection.execute("UPDATE achievements SET ocr_status = 'failed' WHERE id = ?",
+                               (job["achievement_id"],))
+
+
+def process_job(connection, job):
+    """Run OCR for one claimed job and record the outcome."""
+    # The upload was hashed as it was stored; don't read the file again for it
+    stored = connection.execute("SELECT certificate_hash FROM achievements WHERE id = ?",
+                                (job["achievement_id"],)).fetchone()
+    try:
+        result = process_certificate(job["file_path"], file_hash=stored[0] if stored else None,
+                                     connection=connection)
+    except Exception as e:
+        logger.warning("OCR job %s failed (attempt %s): %s", job["id"], job["attempts"], e)
+        _fail(connection, job, e)
+        return False
+    _finish(connection, job, result)
+    return True
+
+
+def drain(db_path, limit=None):
+    """
+    Process queued jobs on the calling thread until none is ready to run
+    (the queue is empty or every job is waiting out a retry backoff).
+
+    Returns:
+        int: Number of jobs processed
+    """
+    connection = db.get_connection(db_path)
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_job(connection)
+        if job is None:
+            break
+        process_job(connection, job)
+        processed += 1
+    return processed
+
+
+def requeue_stale(connection, stale_after=STALE_AFTER_SECONDS):
+    """Return jobs orphaned in 'running' by a dead worker to the queue."""
+    with connection:
+        cursor = connection.execute("""
+            UPDATE ocr_jobs SET status = 'queued'
+            WHERE status = 'running' AND started_at < datetime('now', ?)
+        """, (f"-{int(stale_after)} seconds",))
+    return cursor.rowcount
+
+
+def _worker_loop(db_path, poll_interval, requeue_interval=REQUEUE_INTERVAL):
+    requeued_at = None
+    try:
+        while True:
+            try:
+                if requeued_at is None or time.monotonic() - requeued_at >= requeue_interval:
+                    requeue_stale(db.get_connection(db_path))
+                    requeued_at = time.monotonic()
+                _wake.clear()
+                if drain(db_path) == 0:
+                    _wake.wait(poll_interval)
+            except Exception as e:
+                logger.exception("OCR worker error: %s", e)
+                _wake.wait(poll_interval)
+    finally:
+        # Ctrl-C on a dedicated `flask ocr-worker`
+        db.close_thread_connections()
+
+
+def start_workers(db_path, count, poll_interval=POLL_INTERVAL):
+    """
+    Start `count` daemon worker threads in this process (idempotent).
+
+    A count of 0 leaves OCR to an external `flask ocr-worker` process.
+    """
+    global _workers_pid
+    with _workers_lock:
+        if _workers_pid != os.getpid():
+            _workers.clear()
+        if _workers or count <= 0:
+            return
+        _workers_pid = os.getpid()
+        for n in range(count):
+            thread = threading.Thread(
+                target=_worker_loop,
+                args=(db_path, poll_interval),
+                name=f"ocr-worker-{n}",
+                daemon=True
+            )
+            thread.start()
+            _workers.append(thread)
+
+
+def run_forever(db_path, poll_interval=POLL_INTERVAL):
+    """Blocking worker loop for a dedicated OCR process."""
+    _worker_loop(db_path, poll_interval)
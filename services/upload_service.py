@@ -0,0 +1,308 @@
+"""
+Certificate upload handling and content-addressed storage.
+
+Certificate parts of a multipart request are written by the form parser
+straight to a temporary file next to their final location and hashed on
+the way (SpooledUpload, installed via the app's request class), so each
+upload is written once and never held in memory whole. Callers check the
+hash, then either rename the temp file into place (atomic on the same
+filesystem) or discard it.
+
+Certificates are stored under their SHA-256, sharded two levels deep
+(ab/cd/<sha256>.<ext>) so identical files share one copy on disk and no
+directory grows past a few thousand entries. The blobs table records each
+stored file; its refcount is kept by triggers on achievements.certificate_path.
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections import namedtuple
+
+from utils.sql import select_existing
+
+
+# Large reads keep the copy loop cheap without holding much in memory
+CHUNK_SIZE = 1024 * 1024
+
+# certificate_path values are relative to the static folder
+URL_PREFIX = "uploads"
+
+# Files on disk younger than this may belong to an upload whose transaction
+# has not committed yet, so the orphan sweep leaves them alone
+ORPHAN_GRACE_SECONDS = 3600
+
+_SHARD = re.compile(r"[0-9a-f]{2}")
+_BLOB_NAME = re.compile(r"[0-9a-f]{64}\.\w+")
+
+PendingUpload = namedtuple("PendingUpload", ["temp_path", "sha256", "size"])
+
+
+def hash_file(file_path, chunk_size=CHUNK_SIZE):
+    """SHA-256 hex digest of a file on disk."""
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class SpooledUpload:
+    """
+    Writable target for one multipart file part (a werkzeug stream factory
+    result). Bytes go to a temp file in `directory` and into a SHA-256 as
+    the form parser writes them; receive_upload() then keeps the file as is
+    instead of copying it. Closing an unclaimed one deletes its temp file.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        fd, self.temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+        self._file = os.fdopen(fd, "w+b")
+        self._sha256 = hashlib.sha256()
+        self._size = 0
+        self._claimed = False
+
+    def write(self, data):
+        self._sha256.update(data)
+        self._size += len(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        # read/readline/seek/tell/flush etc. for werkzeug and FileStorage
+        return getattr(self._file, name)
+
+    def claim(self):
+        """Hand the temp file over as a PendingUpload; it is no longer deleted on close."""
+        self._file.close()
+        self._claimed = True
+        return PendingUpload(self.temp_path, self._sha256.hexdigest(), self._size)
+
+    def close(self):
+        self._file.close()
+        if not self._claimed:
+            try:
+                os.remove(self.temp_path)
+            except FileNotFoundError:
+                pass
+
+
+def receive_upload(file_storage, directory, chunk_size=CHUNK_SIZE):
+    """
+    Take an uploaded file as a temp file in `directory`, hashed.
+
+    A part the request class already spooled into `directory` is kept
+    without another read; anything else is copied and hashed in one pass.
+
+    Args:
+        file_storage: werkzeug FileStorage from request.files
+        directory (str): Where the file will eventually live
+
+    Returns:
+        PendingUpload: temp file path, SHA-256 hex digest and size in bytes
+    """
+    stream = file_storage.stream
+    if isinstance(stream, SpooledUpload) and os.path.samefile(stream.directory, directory):
+        return stream.claim()
+    return receive_stream(stream, directory, chunk_size)
+
+
+def receive_stream(stream, directory, chunk_size=CHUNK_SIZE):
+    """receive_upload() for any binary file object, e.g. a ZIP member."""
+    os.makedirs(directory, exist_ok=True)
+    sha256 = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := stream.read(chunk_size):
+                sha256.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return PendingUpload(temp_path, sha256.hexdigest(), size)
+
+
+def commit_upload(upload, destination):
+    """Atomically move a received upload to its final path."""
+    os.replace(upload.temp_path, destination)
+    return destination
+
+
+def discard_upload(upload):
+    """Delete a received upload that will not be kept."""
+    try:
+        os.remove(upload.temp_path)
+    except FileNotFoundError:
+        pass
+
+
+def blob_relative_path(sha256, ext):
+    """Sharded location of a blob below the upload root: ab/cd/<sha256>.<ext>"""
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}.{ext.lower()}"
+
+
+def _record_blob(cursor, sha256, path, size, ext):
+    mime_type = mimetypes.guess_type(f"blob.{ext}")[0] or "application/octet-stream"
+    cursor.execute("""
+        INSERT OR IGNORE INTO blobs (sha256, path, size, mime_type)
+        VALUES (?, ?, ?, ?)
+    """, (sha256, path, size, mime_type))
+
+
+def store_blob(cursor, upload, upload_root, ext):
+    """
+    Move a received upload into content-addressed storage.
+
+    If the same bytes are already stored the temp file is simply dropped, so
+    a repeat upload costs no extra disk space or write I/O. Runs inside the
+    caller's transaction; the refcount is bumped when an achievement row
+    starts pointing at the returned path.
+
+    The blobs row is written before the file is looked at, so the caller's
+    transaction holds the write lock from then on and collect_garbage cannot
+    remove an unreferenced blob this upload has just matched.
+
+    Returns:
+        tuple: (absolute file path, certificate_path relative to the static folder)
+    """
+    relative = blob_relative_path(upload.sha256, ext)
+    destination = os.path.join(upload_root, *relative.split("/"))
+    path = f"{URL_PREFIX}/{relative}"
+    _record_blob(cursor, upload.sha256, path, upload.size, ext)
+
+    if os.path.exists(destination):
+        discard_upload(upload)
+    else:
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        commit_upload(upload, destination)
+    return destination, path
+
+
+def import_legacy_uploads(connection, upload_root):
+    """
+    Move certificates saved as {timestamp}_{filename} into blob storage.
+
+    Every achievement pointing at a legacy file is repointed at the blob for
+    its content; byte-identical legacy files collapse into one blob and the
+    originals are deleted.
+
+    Returns:
+        dict: files moved, duplicates removed and bytes reclaimed
+    """
+    report = {"moved": 0, "duplicates": 0, "bytes_reclaimed": 0}
+    legacy_paths = [row[0] for row in connection.execute("""
+        SELECT DISTINCT certificate_path FROM achievements
+        WHERE certificate_path LIKE ? AND certificate_path NOT IN (SELECT path FROM blobs)
+    """, (f"{URL_PREFIX}/%",))]
+
+    for legacy in legacy_paths:
+        source = os.path.join(upload_root, *legacy[len(URL_PREFIX) + 1:].split("/"))
+        if not os.path.isfile(source):
+            continue
+        sha256 = hash_file(source)
+        size = os.path.getsize(source)
+        ext = source.rsplit(".", 1)[-1] if "." in os.path.basename(source) else "bin"
+        relative = blob_relative_path(sha256, ext)
+        destination = os.path.join(upload_root, *relative.split("/"))
+        path = f"{URL_PREFIX}/{relative}"
+
+        # Put the blob in place before repointing rows, and only drop the
+        # legacy file once they are committed
+        if not os.path.exists(destination):
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            _link_or_copy(source, destination)
+            report["moved"] += 1
+        else:
+            report["duplicates"] += 1
+            report["bytes_reclaimed"] += size
+
+        with connection:
+            _record_blob(connection, sha256, path, size, ext)
+            connection.execute("UPDATE achievements SET certificate_path = ? WHERE certificate_path = ?",
+                               (path, legacy))
+            # Legacy rows may predate certificate_hash; fill it where that stays unique
+            connection.execute("""
+                UPDATE achievements SET certificate_hash = ?
+                WHERE certificate_path = ? AND certificate_hash IS NULL
+                  AND NOT EXISTS (SELECT 1 FROM achievements WHERE certificate_hash = ?)
+                  AND id = (SELECT MIN(id) FROM achievements WHERE certificate_path = ?)
+            """, (sha256, path, sha256, path))
+
+        os.remove(source)
+
+    return report
+
+
+def _link_or_copy(source, destination):
+    try:
+        os.link(source, destination)
+    except OSError:
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(destination), suffix=".part")
+        with os.fdopen(fd, "wb") as out, open(source, "rb") as src:
+            shutil.copyfileobj(src, out, CHUNK_SIZE)
+        os.replace(temp_path, destination)
+
+
+def collect_garbage(connection, upload_root, orphan_grace=ORPHAN_GRACE_SECONDS):
+    """
+    Delete blobs no achievement references any more, then files in blob
+    storage with no blobs row at all (left by a rolled-back or crashed
+    upload) and abandoned upload temp files, once older than orphan_grace.
+
+    Unreferenced blobs are found, deleted and unlinked under one write lock
+    (BEGIN IMMEDIATE), so an upload that matches one of them by hash either
+    finishes first and bumps its refcount, or waits and stores the file anew.
+
+    Returns:
+        int: Number of files removed
+    """
+    removed = []
+    with connection:
+        connection.execute("BEGIN IMMEDIATE")
+        for (path,) in connection.execute("SELECT path FROM blobs WHERE refcount <= 0").fetchall():
+            connection.execute("DELETE FROM blobs WHERE path = ?", (path,))
+            try:
+                os.remove(os.path.join(upload_root, *path[len(URL_PREFIX) + 1:].split("/")))
+            except FileNotFoundError:
+                pass
+            removed.append(path)
+    return len(removed) + _sweep_orphans(connection, upload_root, orphan_grace)
+
+
+def _sweep_orphans(connection, upload_root, grace):
+    cutoff = time.time() - grace
+    candidates = {}
+    temp_files = []
+    if not os.path.isdir(upload_root):
+        return 0
+    for entry in os.scandir(upload_root):
+        if entry.is_file() and entry.name.startswith(".upload-") and entry.name.endswith(".part"):
+            temp_files.append(entry.path)
+        elif entry.is_dir() and _SHARD.fullmatch(entry.name):
+            for shard in os.scandir(entry.path):
+                if not (shard.is_dir() and _SHARD.fullmatch(shard.name)):
+                    continue
+                for blob in os.scandir(shard.path):
+                    if blob.is_file() and _BLOB_NAME.fullmatch(blob.name):
+                        candidates[f"{URL_PREFIX}/{entry.name}/{shard.name}/{blob.name}"] = blob.path
+
+    known = select_existing(connection, "SELECT path FROM blobs WHERE path IN ({placeholders})", candidates)
+    known |= select_existing(connection, "SELECT certificate_path FROM achievements "
+                                         "WHERE certificate_path IN ({placeholders})", candidates)
+    count = 0
+    for file_path in [candidates[path] for path in candidates if path not in known] + temp_files:
+        try:
+            if os.path.getmtime(file_path) < cutoff:
+                os.remove(file_path)
+                count += 1
+        except FileNotFoundError:
+            pass
+    return count
@@ -0,0 +1,154 @@
+"""
+Bulk student/teacher onboarding from CSV.
+
+Password hashing dominates: werkzeug's generate_password_hash is
+deliberately slow (tens of milliseconds per call), so a cohort of thousands
+takes minutes on one core. Rows are validated and checked for conflicts
+first, with chunked IN queries for ids and emails, so only accounts that
+will actually be created are hashed. The hashing is spread over a process
+pool, and rows are inserted with executemany in batched transactions.
+"""
+
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash
+
+from utils.sql import select_existing
+
+
+ROLES = {
+    "student": ("student_id", "student_name", "email", "phone_number", "student_gender", "student_dept"),
+    "teacher": ("teacher_id", "teacher_name", "email", "phone_number", "teacher_gender", "teacher_dept"),
+}
+
+DEFAULT_BATCH_SIZE = 500
+
+_executor = None
+_executor_workers = None
+
+
+def _get_executor(workers):
+    global _executor, _executor_workers
+    if _executor is None or _executor_workers != workers:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = ProcessPoolExecutor(max_workers=workers)
+        _executor_workers = workers
+    return _executor
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    generate_password_hash() for each password, in order.
+
+    Runs inline for one worker or one password; otherwise maps over a shared
+    process pool in chunks, so a long list costs one round trip per chunk
+    rather than per password.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(passwords) <= 1:
+        return [generate_password_hash(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(_get_executor(workers).map(generate_password_hash, passwords, chunksize=chunksize))
+
+
+def _clean(row):
+    return {key.strip(): (value or "").strip() or None for key, value in row.items() if key}
+
+
+def _insert_batch(connection, sql, batch):
+    """
+    Insert (result, values) pairs in one transaction. If the batch hits a
+    conflict the checks could not see (a concurrent registration), it is
+    redone row by row so only the conflicting rows fail.
+    """
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        try:
+            connection.executemany(sql, [values for _, values in batch])
+            for result, _ in batch:
+                result["status"] = "created"
+        except sqlite3.IntegrityError:
+            connection.rollback()
+            connection.execute("BEGIN IMMEDIATE")
+            for result, values in batch:
+                try:
+                    connection.execute(sql, values)
+                    result["status"] = "created"
+                except sqlite3.IntegrityError:
+                    result.update(status="error", error="Conflict: ID or email already registered")
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+
+
+def import_users(connection, role, rows, approve=False, workers=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Create student or teacher accounts from CSV rows.
+
+    Args:
+        role (str): "student" or "teacher"
+        rows (list): dicts keyed by the table's column names plus "password"
+        approve (bool): Activate the accounts now instead of leaving them
+            pending admin approval
+        workers (int): Hashing processes; None for one per CPU
+
+    Raises:
+        ValueError: For an unknown role
+
+    Returns:
+        list: One {"row", "id", "status"[, "error"]} per input row, in order
+    """
+    if role not in ROLES:
+        raise ValueError(f"Unknown user type: {role}")
+    columns = ROLES[role]
+    id_column, name_column = columns[0], columns[1]
+
+    results, candidates = [], []
+    for number, row in enumerate(rows, start=1):
+        row = _clean(row)
+        result = {"row": number, "id": row.get(id_column)}
+        results.append(result)
+        missing = [field for field in (id_column, name_column, "email", "password") if not row.get(field)]
+        if missing:
+            result.update(status="error", error=f"Missing {', '.join(missing)}")
+        elif "@" not in row["email"]:
+            result.update(status="error", error="Invalid email")
+        else:
+            candidates.append((result, row))
+
+    taken_ids = select_existing(connection, f"SELECT {id_column} FROM {role} WHERE {id_column} IN ({{placeholders}})",
+                                {row[id_column] for _, row in candidates})
+    taken_emails = select_existing(connection, f"SELECT email FROM {role} WHERE email IN ({{placeholders}})",
+                                   {row["email"] for _, row in candidates})
+
+    accepted, first_id, first_email = [], {}, {}
+    for result, row in candidates:
+        user_id, email = row[id_column], row["email"]
+        if user_id in taken_ids:
+            result.update(status="error", error=f"ID {user_id} already registered")
+        elif email in taken_emails:
+            result.update(status="error", error=f"Email {email} already registered")
+        elif user_id in first_id:
+            result.update(status="error", error=f"Duplicate ID: same as row {first_id[user_id]}")
+        elif email in first_email:
+            result.update(status="error", error=f"Duplicate email: same as row {first_email[email]}")
+        else:
+            first_id[user_id] = first_email[email] = result["row"]
+            accepted.append((result, row))
+
+    # Only accounts that will be created pay for a hash
+    hashes = hash_passwords([row["password"] for _, row in accepted], workers)
+
+    sql = (f"INSERT INTO {role} ({', '.join(columns)}, password, is_approved) "
+           f"VALUES ({', '.join('?' * (len(columns) + 2))})")
+    pending = [
+        (result, (*(row.get(column) for column in columns), password_hash, 1 if approve else 0))
+        for (result, row), password_hash in zip(accepted, hashes)
+    ]
+    for start in range(0, len(pending), batch_size):
+        _insert_batch(connection, sql, pending[start:start + batch_size])
+    return results
@@ -1,10 +1,10 @@
 /**
  * Achievement Card Export Module
- * Handles PNG and PDF export of achievement cards using html2canvas and jsPDF
+ * Downloads PNG and PDF achievement cards rendered by the server
+ * (/export-achievement/<id>/card.png|pdf)
  * 
  * Features:
- * - High-quality image capture (300 DPI equivalent)
- * - Responsive PDF generation
+ * - Identical output on every device, no in-browser rasterizing
  * - Dark/Light mode support
  * - Error handling and user feedback
  * - Optimized file sizes
@@ -19,10 +19,6 @@ class AchievementExporter {
         this.statusDiv = document.getElementById('export-status');
         this.statusText = this.statusDiv?.querySelector('.status-text');
 
-        this.cardWidth = 600;
-        this.cardHeight = 800;
-        this.dpi = 2; // 2x scale for high quality
-
         this.initEventListeners();
     }
 
@@ -61,129 +57,40 @@ class AchievementExporter {
 
     /**
      * Export card as PNG image
-     * Uses html2canvas with high DPI settings
+     * The server renders the card (and caches it), so the phone only downloads
      */
     async exportPNG() {
-        // Create a container to ensure white background
-        const container = document.createElement('div');
-        container.style.cssText = `
-            position: absolute;
-            left: -9999px;
-            top: -9999px;
-            background: white;
-            border-radius: 24px;
-            overflow: hidden;
-        `;
-
-        const clonedCard = this.cardElement.cloneNode(true);
-        container.appendChild(clonedCard);
-        document.body.appendChild(container);
-
-        try {
-            this.updateStatus('Capturing card image...');
-
-            // Capture canvas with high quality settings
-            const canvas = await html2canvas(clonedCard, {
-                scale: this.dpi,
-                backgroundColor: '#ffffff',
-                useCORS: true,
-                allowTaint: true,
-                logging: false,
-                windowHeight: this.cardHeight * this.dpi,
-                windowWidth: this.cardWidth * this.dpi,
-                onclone: (clonedDocument) => {
-                    const clonedCard = clonedDocument.getElementById('achievement-card-export');
-                    if (clonedCard) {
-                        clonedCard.style.margin = '0';
-                        clonedCard.style.padding = '0';
-                    }
-                }
-            });
-
-            this.updateStatus('Processing image...');
-
-            // Convert canvas to blob and download
-            const link = document.createElement('a');
-            const achievementId = this.getAchievementMetadata('achievement-id');
-            const studentName = this.getAchievementMetadata('student-name-data');
-            const eventName = this.getAchievementMetadata('event-name-data');
-            
-            const filename = `${studentName}_${eventName}_${achievementId}.png`.replace(/[^a-zA-Z0-9_-]/g, '_');
-            
-            link.href = canvas.toDataURL('image/png', 1.0);
-            link.download = filename;
-            link.click();
-
-            this.updateStatus('Download started...');
-            
-        } finally {
-            document.body.removeChild(container);
-        }
+        await this.download(this.cardElement.dataset.pngUrl);
     }
 
     /**
      * Export card as PDF
-     * Uses jsPDF for PDF generation with proper sizing
      */
     async exportPDF() {
-        const container = document.createElement('div');
-        container.style.cssText = `
-            position: absolute;
-            left: -9999px;
-            top: -9999px;
-            background: white;
-            border-radius: 24px;
-            overflow: hidden;
-        `;
-
-        const clonedCard = this.cardElement.cloneNode(true);
-        container.appendChild(clonedCard);
-        document.body.appendChild(container);
-
-        try {
-            this.updateStatus('Capturing card image...');
-
-            // Capture canvas
-            const canvas = await html2canvas(clonedCard, {
-                scale: this.dpi,
-                backgroundColor: '#ffffff',
-                useCORS: true,
-                allowTaint: true,
-                logging: false,
-                windowHeight: this.cardHeight * this.dpi,
-                windowWidth: this.cardWidth * this.dpi,
-            });
-
-            this.updateStatus('Generating PDF...');
-
-            // Calculate PDF dimensions (maintain aspect ratio)
-            const imgWidth = 600; // Points (Postscript points: 1/72 inch)
-            const imgHeight = (canvas.height * imgWidth) / canvas.width;
-
-            // Create PDF with custom dimensions
-            const { jsPDF } = window.jspdf;
-            const pdf = new jsPDF({
-                orientation: imgHeight > imgWidth ? 'portrait' : 'landscape',
-                unit: 'pt',
-                format: [imgWidth, imgHeight]
-            });
+        await this.download(this.cardElement.dataset.pdfUrl);
+    }
 
-            const imgData = canvas.toDataURL('image/png');
-            pdf.addImage(imgData, 'PNG', 0, 0, imgWidth, imgHeight);
+    /**
+     * Fetch a rendered card and save it under the server's file name
+     */
+    async download(url) {
+        this.updateStatus('Rendering card...');
 
-            this.updateStatus('Downloading PDF...');
+        const response = await fetch(url, { credentials: 'same-origin' });
+        if (!response.ok) {
+            throw new Error(`server responded ${response.status}`);
+        }
 
-            // Generate filename and download
-            const achievementId = this.getAchievementMetadata('achievement-id');
-            const studentName = this.getAchievementMetadata('student-name-data');
-            const eventName = this.getAchievementMetadata('event-name-data');
-            
-            const filename = `${studentName}_${eventName}_${achievementId}.pdf`.replace(/[^a-zA-Z0-9_-]/g, '_');
-            pdf.save(filename);
+        const disposition = response.headers.get('Content-Disposition') || '';
+        const match = disposition.match(/filename="?([^";]+)"?/);
+        const blobUrl = URL.createObjectURL(await response.blob());
 
-        } finally {
-            document.body.removeChild(container);
-        }
+        this.updateStatus('Download started...');
+        const link = document.createElement('a');
+        link.href = blobUrl;
+        link.download = match ? match[1] : url.split('/').pop();
+        link.click();
+        setTimeout(() => URL.revokeObjectURL(blobUrl), 1000);
     }
 
     /**
@@ -292,14 +199,3 @@ document.addEventListener('DOMContentLoaded', () => {
         console.error('Failed to initialize exporter:', error);
     }
 });
-
-/**
- * Fallback for older browsers or missing libraries
- */
-if (typeof html2canvas === 'undefined') {
-    console.warn('html2canvas library not loaded. Export functionality may be limited.');
-}
-
-if (typeof jspdf === 'undefined') {
-    console.warn('jsPDF library not loaded. PDF export will not be available.');
-}
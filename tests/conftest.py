@@ -2,6 +2,14 @@
 import os
 import tempfile
 import pytest
+
+# Create a temporary file to isolate the database for the test session.
+# app.py reads DB_PATH at import time, so this must happen before importing it.
+db_fd, db_path = tempfile.mkstemp(suffix='.db')
+os.environ['DB_PATH'] = db_path
+# Tests drain the OCR queue themselves; no background workers at import
+os.environ['OCR_WORKERS'] = '0'
+
 from app import app, init_db
 from werkzeug.security import generate_password_hash
 import sqlite3
@@ -9,9 +17,6 @@ import sqlite3
 @pytest.fixture(scope='session')
 def test_app():
     """Create and configure a new app instance for testing."""
-    # Create a temporary file to isolate the database for each test
-    db_fd, db_path = tempfile.mkstemp()
-    
     # Configure the app for testing
     app.config.update({
         'TESTING': True,
@@ -54,7 +59,7 @@ def test_app():
         
         # Add test data
         cursor.execute("""
-            INSERT OR REPLACE INTO student (
+            INSERT OR IGNORE INTO student (
                 student_name, student_id, email, phone_number, 
                 password, student_gender, student_dept
             ) VALUES (?, ?, ?, ?, ?, ?, ?)
@@ -64,7 +69,7 @@ def test_app():
         ))
         
         cursor.execute("""
-            INSERT OR REPLACE INTO teacher (
+            INSERT OR IGNORE INTO teacher (
                 teacher_name, teacher_id, email, phone_number,
                 password, teacher_gender, teacher_dept
             ) VALUES (?, ?, ?, ?, ?, ?, ?)
@@ -78,9 +83,11 @@ def test_app():
     
     yield app
 
-    # Clean up the test database
+    # Clean up the test database (and its WAL side files)
     os.close(db_fd)
-    os.unlink(db_path)
+    for path in (db_path, db_path + '-wal', db_path + '-shm'):
+        if os.path.exists(path):
+            os.unlink(path)
 
 @pytest.fixture
 def client(test_app):
@@ -107,6 +114,18 @@ def auth_teacher_client(client):
         sess['teacher_dept'] = 'CSE'
     return client
 
+@pytest.fixture
+def sql_trace(test_app):
+    """Record every SQL statement run on this thread's pooled connection."""
+    from utils.db import get_db
+
+    statements = []
+    with test_app.app_context():
+        conn = get_db()
+    conn.set_trace_callback(statements.append)
+    yield statements
+    conn.set_trace_callback(None)
+
 # Add this fixture for test_db to be used in test files
 @pytest.fixture
 def test_db(test_app):
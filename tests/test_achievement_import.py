@@ -0,0 +1,90 @@
+# tests/test_achievement_import.py
+import io
+
+import pytest
+
+HASH_A = "a" * 64
+HASH_B = "b" * 64
+
+
+def achievement(**overrides):
+    row = {
+        "student_id": "S001",
+        "achievement_type": "CODING",
+        "event_name": "Inter College Contest",
+        "achievement_date": "2025-03-12",
+        "organizer": "ACM Chapter",
+        "position": "Winner",
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.fixture
+def cleanup(test_db):
+    before = test_db.execute("SELECT COALESCE(MAX(id), 0) FROM achievements").fetchone()[0]
+    yield
+    test_db.execute("DELETE FROM achievements WHERE id > ?", (before,))
+    test_db.commit()
+
+
+def test_json_import_reports_each_row(auth_teacher_client, test_db, sql_trace, cleanup):
+    response = auth_teacher_client.post('/api/achievements/bulk', json={"achievements": [
+        achievement(certificate_hash=HASH_A),
+        achievement(student_id="S999"),
+        achievement(event_name=""),
+        achievement(certificate_hash=HASH_A.upper()),
+        achievement(team_size=4, position="2nd"),
+    ]})
+
+    assert response.status_code == 207
+    data = response.get_json()
+    assert (data["created"], data["failed"]) == (2, 3)
+    results = data["results"]
+    assert [result["status"] for result in results] == ["created", "error", "error", "error", "created"]
+    assert results[1]["error"] == "Student ID S999 not found"
+    assert results[2]["error"] == "Missing event_name"
+    assert results[3]["error"] == "Duplicate certificate: same as row 1"
+
+    # One lookup for all students, one for all hashes, one insert for all rows
+    assert sum("FROM student WHERE student_id IN" in sql for sql in sql_trace) == 1
+    assert sum("WHERE certificate_hash IN" in sql for sql in sql_trace) == 1
+
+    rows = test_db.execute("SELECT id, teacher_id, team_size, position, certificate_hash FROM achievements "
+                           "WHERE id IN (?, ?) ORDER BY id", (results[0]["id"], results[4]["id"])).fetchall()
+    assert rows == [(results[0]["id"], "T001", None, "Winner", HASH_A),
+                    (results[4]["id"], "T001", 4, "2nd", None)]
+
+
+def test_already_registered_hash_is_rejected(auth_teacher_client, cleanup):
+    first = auth_teacher_client.post('/api/achievements/bulk', json=[achievement(certificate_hash=HASH_B)])
+    assert first.status_code == 201
+
+    again = auth_teacher_client.post('/api/achievements/bulk', json=[achievement(certificate_hash=HASH_B)])
+    assert again.status_code == 422
+    assert again.get_json()["results"][0]["error"] == "Duplicate certificate: already registered"
+
+
+def test_csv_upload(auth_teacher_client, cleanup):
+    csv_text = ("student_id,achievement_type,event_name,achievement_date,organizer,position\n"
+                "S001,CODING,Hit the Bug,2025-04-13,CSE Dept,First\n"
+                "S001,CODING,Web Wonder,2025-04-13,CSE Dept,Second\n")
+    response = auth_teacher_client.post('/api/achievements/bulk', data={
+        'file': (io.BytesIO(csv_text.encode()), 'results.csv'),
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 201
+    assert response.get_json()["created"] == 2
+
+
+def test_rejects_bad_payloads(auth_teacher_client, client, test_app, monkeypatch):
+    assert auth_teacher_client.post('/api/achievements/bulk', json={"rows": 1}).status_code == 400
+
+    monkeypatch.setitem(test_app.config, "BULK_IMPORT_MAX_ROWS", 1)
+    response = auth_teacher_client.post('/api/achievements/bulk', json=[achievement(), achievement()])
+    assert response.status_code == 413
+
+
+def test_requires_teacher(auth_student_client):
+    response = auth_student_client.post('/api/achievements/bulk', json=[achievement()])
+    assert response.status_code == 302
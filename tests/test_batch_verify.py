@@ -0,0 +1,96 @@
+# tests/test_batch_verify.py
+import pytest
+
+from app import app, verification_token_url, verify_batch_cache
+from services import batch_verify
+from utils.db import get_db
+
+
+@pytest.fixture
+def achievement_ids(test_db):
+    ids = []
+    for event in ("Batch One", "Batch Two", "Batch Three"):
+        cursor = test_db.execute("""
+            INSERT INTO achievements (teacher_id, student_id, achievement_type, event_name,
+                                      achievement_date, organizer, position)
+            VALUES ('T001', 'S001', 'CODING', ?, '2025-01-01', 'Club', '1')
+        """, (event,))
+        ids.append(cursor.lastrowid)
+    test_db.commit()
+    yield ids
+    test_db.executemany("DELETE FROM achievements WHERE id = ?", [(i,) for i in ids])
+    test_db.commit()
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    monkeypatch.setitem(app.config, "VERIFY_REVOCATION_TTL", 0)
+    verify_batch_cache.clear()
+    yield
+    verify_batch_cache.clear()
+
+
+def token_for(achievement_id):
+    with app.test_request_context():
+        return verification_token_url(get_db(), achievement_id).rsplit("/", 1)[1]
+
+
+def test_mixed_batch_in_one_query(client, achievement_ids, sql_trace):
+    token = token_for(achievement_ids[2])
+    sql_trace.clear()
+
+    response = client.post('/api/verify', json={"achievements": [
+        achievement_ids[0], str(achievement_ids[1]), 999999, token, "not-a-token", {"id": 1},
+    ]})
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert (data["verified"], data["failed"]) == (3, 3)
+    results = data["results"]
+    assert [r["status"] for r in results] == ["verified", "verified", "not_found", "verified", "invalid", "invalid"]
+    assert [r.get("source") for r in results[:4]] == ["database", "database", None, "token"]
+    assert results[1]["achievement"]["event_name"] == "Batch Two"
+    assert results[3]["achievement"]["event_name"] == "Batch Three"
+    assert results[0]["verification_url"].endswith(f"/verify-achievement/{achievement_ids[0]}")
+    assert sum("WHERE a.id IN" in sql for sql in sql_trace) == 1
+
+
+def test_token_and_database_records_match(client, achievement_ids):
+    token = token_for(achievement_ids[0])
+    results = client.post('/api/verify', json=[achievement_ids[0], token]).get_json()["results"]
+    assert results[0]["achievement"] == results[1]["achievement"]
+
+
+def test_repeat_ids_are_served_from_cache(client, achievement_ids, sql_trace):
+    client.post('/api/verify', json=achievement_ids[:2])
+    sql_trace.clear()
+
+    results = client.post('/api/verify', json=achievement_ids).get_json()["results"]
+
+    assert all(r["status"] == "verified" for r in results)
+    lookups = [sql for sql in sql_trace if "WHERE a.id IN" in sql]
+    assert len(lookups) == 1 and str(achievement_ids[0]) not in lookups[0]
+
+
+def test_stale_token_falls_back_to_database(client, achievement_ids, test_db):
+    token = token_for(achievement_ids[0])
+    test_db.execute("UPDATE achievements SET position = '2' WHERE id = ?", (achievement_ids[0],))
+    test_db.commit()
+
+    result = client.post('/api/verify', json=[token]).get_json()["results"][0]
+    assert (result["status"], result["source"]) == ("verified", "database")
+    assert result["achievement"]["position"] == "2"
+
+
+def test_lookups_are_chunked(achievement_ids, sql_trace, monkeypatch):
+    monkeypatch.setattr(batch_verify, "chunks", lambda items: (items[i:i + 2] for i in range(0, len(items), 2)))
+    with app.app_context():
+        records = batch_verify.lookup(get_db(), achievement_ids, batch_verify.ResultCache(10, 0))
+    assert sum("WHERE a.id IN" in sql for sql in sql_trace) == 2
+    assert [records[i]["event_name"] for i in achievement_ids] == ["Batch One", "Batch Two", "Batch Three"]
+
+
+def test_rejects_bad_requests(client, monkeypatch):
+    assert client.post('/api/verify', json={"ids": [1]}).status_code == 400
+    monkeypatch.setitem(app.config, "VERIFY_BATCH_MAX_ITEMS", 1)
+    assert client.post('/api/verify', json=[1, 2]).status_code == 413
@@ -0,0 +1,176 @@
+# tests/test_bulk_ingest.py
+import hashlib
+import io
+import random
+import zipfile
+
+import pytest
+from PIL import Image
+
+import app as app_module
+from app import app
+from services import bulk_ingest
+from utils import db
+
+OCR_TEXT = "Awarded to Test Student for participating in Hackathon 2025 held on 12 March 2025"
+
+
+def png_bytes(color):
+    image = io.BytesIO()
+    Image.new("RGB", (40, 20), color).save(image, "PNG")
+    return image.getvalue()
+
+
+@pytest.fixture
+def connection(test_app, test_db):
+    connection = db.connect(app.config["DB_PATH"])
+    before = connection.execute("SELECT COALESCE(MAX(id), 0) FROM achievements").fetchone()[0]
+    yield connection
+    connection.execute("DELETE FROM ocr_jobs WHERE achievement_id > ?", (before,))
+    connection.execute("DELETE FROM achievements WHERE id > ?", (before,))
+    connection.execute("DELETE FROM ocr_results WHERE engine_version = 'test 1'")
+    connection.commit()
+    connection.close()
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    calls = []
+    monkeypatch.setattr(bulk_ingest, "ocr_engine_version", lambda: "test 1")
+    monkeypatch.setattr(bulk_ingest, "extract_text_from_certificate", lambda path: calls.append(path) or OCR_TEXT)
+    return calls
+
+
+def test_directory_ingest(connection, fake_ocr, tmp_path):
+    source = tmp_path / "certs"
+    source.mkdir()
+    (source / "a.png").write_bytes(png_bytes("red"))
+    (source / "b.png").write_bytes(png_bytes("blue"))
+    (source / "a-copy.png").write_bytes(png_bytes("red"))
+    (source / "notes.txt").write_text("not a certificate")
+    (source / "manifest.csv").write_text(
+        "file,student_id,achievement_type,event_name,position\n"
+        "a.png,S001,CODING,,\n"
+        "b.png,S001,HACKATHON,Web Wonder,Winner\n"
+        "a-copy.png,S001,CODING,,\n"
+        "missing.png,S001,CODING,,\n"
+        "b.png,S999,CODING,,\n"
+        "notes.txt,S001,CODING,,\n"
+    )
+
+    report = bulk_ingest.ingest(connection, str(source), str(tmp_path / "uploads"), "T001",
+                                workers=0, batch_size=1)
+
+    assert (report["rows"], report["inserted"], report["duplicates"]) == (6, 2, 1)
+    assert report["ocr_run"] == 2
+    assert [(line, message) for line, _, message in report["errors"]] == [
+        (4, "Duplicate of line 2"),
+        (5, "File not found"),
+        (6, "Student ID S999 not found"),
+        (7, "Invalid file type"),
+    ]
+
+    rows = connection.execute("""
+        SELECT achievement_type, event_name, achievement_date, position, ocr_status, certificate_path
+        FROM achievements WHERE teacher_id = 'T001' ORDER BY id DESC LIMIT 2
+    """).fetchall()
+    # Manifest values win over OCR; blanks are filled from the parsed text
+    assert [tuple(row)[:5] for row in rows] == [
+        ("HACKATHON", "Web Wonder", "12 March 2025", "Winner", "done"),
+        ("CODING", "Hackathon 2025", "12 March 2025", "", "done"),
+    ]
+    assert all(row["certificate_path"].startswith("uploads/") for row in rows)
+    assert (tmp_path / "uploads").exists()
+    assert connection.execute("SELECT COUNT(*) FROM ocr_results WHERE engine_version = 'test 1'").fetchone()[0] == 2
+
+    # Running the same manifest again registers nothing and runs no OCR
+    again = bulk_ingest.ingest(connection, str(source), str(tmp_path / "uploads"), "T001", workers=0)
+    assert again["inserted"] == 0
+    assert again["duplicates"] == 3
+    assert len(fake_ocr) == 2
+
+
+def test_zip_ingest_without_tesseract_queues_ocr(connection, monkeypatch, tmp_path):
+    monkeypatch.setattr(app_module, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    monkeypatch.setattr(bulk_ingest, "ocr_engine_version", lambda: None)
+    archive = tmp_path / "event.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("manifest.csv", "file,student_id,achievement_type\n"
+                                    "scans/1.png,S001,CODING\n"
+                                    "scans/2.png,S001,CODING\n"
+                                    "scans/3.png,S001,CODING\n")
+        for name, color in (("1", "green"), ("2", "yellow"), ("3", "purple")):
+            zf.writestr(f"scans/{name}.png", png_bytes(color))
+
+    result = app.test_cli_runner().invoke(args=[
+        "ingest-certificates", str(archive), "--teacher", "T001", "--workers", "2", "--batch-size", "2"])
+
+    assert result.exit_code == 0, result.output
+    assert "3 of 3 rows inserted" in result.output
+    assert "3 queued for ocr-worker" in result.output
+    jobs = connection.execute("""
+        SELECT a.ocr_status, j.status FROM ocr_jobs j JOIN achievements a ON a.id = j.achievement_id
+        WHERE a.teacher_id = 'T001' ORDER BY j.id DESC LIMIT 3
+    """).fetchall()
+    assert [tuple(job) for job in jobs] == [("pending", "queued")] * 3
+
+
+def test_unknown_teacher_and_bad_manifest(connection, tmp_path):
+    (tmp_path / "manifest.csv").write_text("file,student\na.png,S001\n")
+    with pytest.raises(ValueError, match="Teacher"):
+        bulk_ingest.ingest(connection, str(tmp_path), str(tmp_path), "T999")
+    with pytest.raises(ValueError, match="student_id, achievement_type"):
+        bulk_ingest.ingest(connection, str(tmp_path), str(tmp_path), "T001")
+
+
+def test_near_duplicates_within_one_batch(connection, fake_ocr, tmp_path):
+    noise = Image.frombytes("L", (64, 48), bytes(random.Random(13).randrange(256) for _ in range(64 * 48)))
+    source = tmp_path / "certs"
+    source.mkdir()
+    noise.save(source / "original.png")
+    noise.resize((60, 45)).save(source / "rescan.jpg", quality=60)
+    (source / "manifest.csv").write_text(
+        "file,student_id,achievement_type\n"
+        "original.png,S001,CODING\n"
+        "rescan.jpg,S001,CODING\n"
+    )
+
+    bulk_ingest.ingest(connection, str(source), str(tmp_path / "uploads"), "T001", workers=0, batch_size=10)
+
+    rows = connection.execute("""
+        SELECT id, near_duplicate_of FROM achievements WHERE certificate_path LIKE '%.png'
+           OR certificate_path LIKE '%.jpg' ORDER BY id DESC LIMIT 2
+    """).fetchall()
+    rescan, original = rows
+    assert rescan[1] == original[0]
+
+
+def test_constraint_violation_skips_only_the_offending_row(connection, fake_ocr, monkeypatch, tmp_path):
+    source = tmp_path / "certs"
+    source.mkdir()
+    for name, color in (("1", "orange"), ("2", "cyan"), ("3", "magenta")):
+        (source / f"{name}.png").write_bytes(png_bytes(color))
+    (source / "manifest.csv").write_text("file,student_id,achievement_type\n"
+                                         "1.png,S001,CODING\n2.png,S001,CODING\n3.png,S001,CODING\n")
+    taken = hashlib.sha256(png_bytes("cyan")).hexdigest()
+
+    # Another teacher registers 2.png after the duplicate check, before the insert
+    cached_text = bulk_ingest._cached_text
+    def register_meanwhile(*args):
+        connection.execute("""
+            INSERT INTO achievements (teacher_id, student_id, achievement_type, event_name,
+                                      achievement_date, organizer, position, certificate_hash)
+            VALUES ('T001', 'S001', 'CODING', 'Elsewhere', '2025-01-01', 'Club', '1', ?)
+        """, (taken,))
+        connection.commit()
+        return cached_text(*args)
+    monkeypatch.setattr(bulk_ingest, "_cached_text", register_meanwhile)
+
+    report = bulk_ingest.ingest(connection, str(source), str(tmp_path / "uploads"), "T001",
+                                workers=0, batch_size=10)
+
+    assert report["inserted"] == 2
+    assert [(line, name) for line, name, _ in report["errors"]] == [(3, "2.png")]
+    assert "UNIQUE" in report["errors"][0][2]
+    assert connection.execute("SELECT COUNT(*) FROM achievements WHERE certificate_hash = ?",
+                              (taken,)).fetchone()[0] == 1
@@ -0,0 +1,113 @@
+# tests/test_card_renderer.py
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from app import app
+from utils import card_renderer
+
+
+@pytest.fixture
+def achievement_id(test_db):
+    cursor = test_db.execute("""
+        INSERT INTO achievements (teacher_id, student_id, achievement_type, event_name,
+                                  achievement_date, organizer, position, achievement_description)
+        VALUES ('T001', 'S001', 'HACKATHON', 'Web Wonder', '2025-04-13', 'CSE Dept', 'First', 'Built a web app')
+    """)
+    test_db.commit()
+    yield cursor.lastrowid
+    test_db.execute("DELETE FROM achievements WHERE id = ?", (cursor.lastrowid,))
+    test_db.commit()
+
+
+@pytest.fixture
+def card_cache(tmp_path, monkeypatch):
+    """Empty card cache; counts real renders."""
+    renders = []
+    render = card_renderer.render_card
+    monkeypatch.setattr(card_renderer, "render_card", lambda values, qr: renders.append(values) or render(values, qr))
+    monkeypatch.setitem(app.config, "CARD_CACHE_FOLDER", str(tmp_path / "cards"))
+    monkeypatch.setitem(app.config, "QR_CACHE_FOLDER", str(tmp_path / "qr"))
+    return renders
+
+
+def test_png_card_is_rendered_once_and_revalidated(auth_student_client, achievement_id, card_cache, test_db):
+    url = f'/export-achievement/{achievement_id}/card.png'
+    response = auth_student_client.get(url)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'image/png'
+    assert 'Test_Student_Web_Wonder_' in response.headers['Content-Disposition']
+    image = Image.open(io.BytesIO(response.data))
+    assert image.size == (card_renderer.WIDTH, card_renderer.HEIGHT)
+    etag, weak = response.get_etag()
+    assert etag and not weak
+    assert response.cache_control.private and response.cache_control.no_cache
+
+    assert auth_student_client.get(url, headers={'If-None-Match': f'"{etag}"'}).status_code == 304
+    assert auth_student_client.get(url).data == response.data
+    assert len(card_cache) == 1
+
+    # Editing the achievement changes the content version: re-rendered, old file dropped
+    test_db.execute("UPDATE achievements SET position = 'Second' WHERE id = ?", (achievement_id,))
+    test_db.commit()
+    edited = auth_student_client.get(url, headers={'If-None-Match': f'"{etag}"'})
+    assert edited.status_code == 200
+    assert edited.get_etag()[0] != etag
+    assert len(card_cache) == 2
+    assert len(os.listdir(os.path.join(app.config["CARD_CACHE_FOLDER"], str(achievement_id)))) == 1
+
+
+def test_pdf_card(auth_student_client, achievement_id, card_cache):
+    response = auth_student_client.get(f'/export-achievement/{achievement_id}/card.pdf')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/pdf'
+    assert response.data.startswith(b'%PDF')
+
+
+def test_card_access(auth_student_client, achievement_id, card_cache, test_db):
+    assert auth_student_client.get(f'/export-achievement/{achievement_id}/card.gif').status_code == 404
+
+    test_db.execute("UPDATE achievements SET student_id = 'S999' WHERE id = ?", (achievement_id,))
+    test_db.commit()
+    assert auth_student_client.get(f'/export-achievement/{achievement_id}/card.png').status_code == 404
+    assert card_cache == []
+
+
+def test_export_page_links_server_rendered_cards(auth_student_client, achievement_id):
+    page = auth_student_client.get(f'/export-achievement/{achievement_id}').get_data(as_text=True)
+    assert f'data-png-url="/export-achievement/{achievement_id}/card.png"' in page
+    assert 'html2canvas' not in page
+
+
+def test_content_version_tracks_every_value():
+    values = card_renderer.card_values({"id": 1, "student_name": "A", "event_name": "E"},
+                                       "http://localhost/verify-achievement/1", "April 13, 2025")
+    changed = dict(values, event_name="F")
+    assert card_renderer.content_version(values) == card_renderer.content_version(dict(values))
+    assert card_renderer.content_version(values) != card_renderer.content_version(changed)
+
+
+def test_new_version_does_not_cut_off_a_download_of_the_old_one(tmp_path):
+    values = card_renderer.card_values({"id": 1, "student_name": "A", "event_name": "E"},
+                                       "http://localhost/verify/x", "April 13, 2025")
+    qr = lambda: card_renderer.encode_card(Image.new("RGB", (10, 10), "white"), "png")
+
+    old, _ = card_renderer.open_cached_card(str(tmp_path), values, "png", qr)
+    with open(old.name, "rb") as f:
+        expected = f.read()
+    new, _ = card_renderer.open_cached_card(str(tmp_path), dict(values, event_name="F"), "png", qr)
+
+    with old, new:
+        assert old.read() == expected
+    assert os.listdir(tmp_path / "1") == [os.path.basename(new.name)]
+
+
+def test_issued_date_comes_from_the_record_only():
+    from app import card_issued_date
+
+    assert card_issued_date({"created_at": "2025-04-13 09:30:00"}) == "April 13, 2025"
+    assert card_issued_date({"created_at": None, "achievement_date": "2025-03-01"}) == "March 01, 2025"
+    assert card_issued_date({"created_at": None, "achievement_date": "01/03/2025"}) == ""
@@ -0,0 +1,68 @@
+# tests/test_certificate_parser.py
+import json
+import os
+
+import pytest
+
+from utils.certificate_parser import (
+    FieldExtractor,
+    load_rules,
+    normalize_text,
+    parse_certificate_text,
+    required_fields_found,
+)
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      "benchmarks", "certificate_corpus.json")
+
+with open(CORPUS, encoding="utf-8") as f:
+    CASES = json.load(f)
+
+
+@pytest.mark.parametrize("case", CASES, ids=[str(i) for i in range(len(CASES))])
+def test_corpus(case):
+    assert parse_certificate_text(case["text"]) == case["expected"]
+
+
+def test_fields_on_the_original_sample():
+    parsed = parse_certificate_text("Awarded to Test Student for participating in Hackathon 2025")
+    assert parsed["student_name"] == "Test Student"
+    assert parsed["event_name"] == "Hackathon 2025"
+    assert not required_fields_found(parsed)
+
+
+def test_empty_text_returns_every_field():
+    parsed = parse_certificate_text("")
+    assert set(parsed) == {"student_name", "event_name", "achievement_date",
+                           "organizer", "position", "institution"}
+    assert not any(parsed.values())
+
+
+def test_normalize_text():
+    raw = "  Presented to  “Asha” \n\n\theld on 1st–May  "
+    assert normalize_text(raw) == 'Presented to "Asha"\nheld on 1st-May'
+
+
+def test_earlier_rule_wins_over_earlier_match():
+    rules = {"fields": {"venue": [r"\bvenue:\s*(?P<value>\w+)", r"\bat\s+(?P<value>\w+)"]}}
+    extractor = FieldExtractor(rules)
+    assert extractor.extract("held at Hall, venue: Auditorium") == {"venue": "Auditorium"}
+    assert extractor.extract("held at Hall") == {"venue": "Hall"}
+
+
+def test_custom_rules_file(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({
+        "macros": {"CODE": r"[A-Z]{3}-\d+"},
+        "required": ["serial"],
+        "fields": {"serial": [r"\bserial\s+(?P<value>{CODE})"]},
+    }))
+    extractor = load_rules(str(path))
+    parsed = parse_certificate_text("Serial ABC-42 issued", extractor)
+    assert parsed == {"serial": "ABC-42"}
+    assert required_fields_found(parsed, extractor)
+
+
+def test_rule_without_value_group_is_rejected():
+    with pytest.raises(ValueError):
+        FieldExtractor({"fields": {"event_name": [r"\bfor\s+\w+"]}})
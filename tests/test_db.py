@@ -1,3 +1,4 @@
+import pytest
 import sqlite3
 from app import app
 
@@ -15,3 +16,58 @@ def test_tables_exist():
             (table,)
         )
         assert cur.fetchone() is not None
+
+
+def test_request_connection_is_pooled_per_thread(test_app):
+    from utils.db import get_db
+
+    with test_app.app_context():
+        first = get_db()
+        assert get_db() is first
+
+    # A later request on the same thread reuses the pooled connection
+    with test_app.app_context():
+        assert get_db() is first
+
+
+def test_connection_pragmas_applied(test_app):
+    from utils.db import get_db
+
+    with test_app.app_context():
+        conn = get_db()
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == test_app.config["SQLITE_BUSY_TIMEOUT_MS"]
+        assert isinstance(conn.execute("SELECT 1 AS one").fetchone(), sqlite3.Row)
+
+
+def test_teardown_rolls_back_uncommitted_writes(test_app):
+    from utils.db import get_db
+
+    with test_app.app_context():
+        conn = get_db()
+        conn.execute(
+            "INSERT INTO departments (dept_code, dept_name) VALUES (?, ?)",
+            ("TMP", "Left uncommitted"),
+        )
+        assert conn.in_transaction
+
+    with test_app.app_context():
+        conn = get_db()
+        assert not conn.in_transaction
+        row = conn.execute("SELECT 1 FROM departments WHERE dept_code = 'TMP'").fetchone()
+        assert row is None
+
+
+def test_close_thread_connections_reopens_on_next_use(test_app):
+    from utils.db import close_thread_connections, get_db
+
+    with test_app.app_context():
+        first = get_db()
+
+    close_thread_connections()
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        first.execute("SELECT 1")
+    with test_app.app_context():
+        assert get_db() is not first
+        assert get_db().execute("SELECT 1").fetchone()[0] == 1
@@ -0,0 +1,56 @@
+# tests/test_export.py
+import csv
+import gzip
+import io
+
+from services.export_service import iter_csv
+
+
+def _login_admin(client):
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+        sess['admin_id'] = 'superadmin'
+
+
+def test_student_export_csv(client):
+    _login_admin(client)
+
+    response = client.get('/admin/export?type=students')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert 'students_export.csv' in response.headers['Content-Disposition']
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0][:2] == ['Student ID', 'Name']
+    assert ['S001', 'Test Student'] in [row[:2] for row in rows[1:]]
+
+
+def test_export_is_streamed(client):
+    _login_admin(client)
+
+    response = client.get('/admin/export?type=teachers')
+
+    assert response.is_streamed
+    assert 'Content-Length' not in response.headers
+
+
+def test_export_gzip_when_accepted(client):
+    _login_admin(client)
+
+    plain = client.get('/admin/export?type=students').get_data()
+    response = client.get('/admin/export?type=students', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == plain
+
+
+def test_iter_csv_yields_one_chunk_per_batch(test_db):
+    import sqlite3
+
+    test_db.row_factory = sqlite3.Row
+    total = test_db.execute("SELECT COUNT(*) FROM student").fetchone()[0]
+
+    chunks = list(iter_csv(test_db, 'students', batch_size=1))
+
+    assert chunks[0].startswith('Student ID,')
+    assert len(chunks) == total + 1
@@ -0,0 +1,120 @@
+# tests/test_export_jobs.py
+import csv
+import gzip
+import io
+import time
+
+import pytest
+
+from app import app
+from services import export_jobs
+
+
+@pytest.fixture
+def admin_client(client, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'EXPORT_FOLDER', str(tmp_path))
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+        sess['admin_id'] = 'superadmin'
+    return client
+
+
+def _wait_for(client, status_url, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(status_url).get_json()['job']
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"export job did not finish: {job}")
+
+
+def test_export_job_runs_in_background(admin_client):
+    response = admin_client.post('/admin/export/jobs', json={'type': 'students'})
+
+    assert response.status_code == 202
+    job = _wait_for(admin_client, response.get_json()['status_url'])
+    assert job['status'] == 'done'
+    assert job['rows_written'] == job['rows_total']
+    assert job['rows_total'] >= 1
+
+    download = admin_client.get(f"/admin/export/jobs/{job['id']}/download")
+    assert download.status_code == 200
+    assert 'students_export.csv' in download.headers['Content-Disposition']
+    rows = list(csv.reader(io.StringIO(download.get_data(as_text=True))))
+    assert rows[0][:2] == ['Student ID', 'Name']
+    assert len(rows) - 1 == job['rows_total']
+
+
+def test_export_job_filters_and_gzip(admin_client):
+    response = admin_client.post('/admin/export/jobs', json={
+        'type': 'students', 'format': 'csv.gz', 'filters': {'dept': 'NO-SUCH-DEPT'},
+    })
+
+    job = _wait_for(admin_client, response.get_json()['status_url'])
+    assert job['rows_total'] == 0
+
+    download = admin_client.get(f"/admin/export/jobs/{job['id']}/download")
+    text = gzip.decompress(download.data).decode('utf-8')
+    assert text.splitlines() == ['Student ID,Name,Email,Phone,Gender,Department,Approved,Created At']
+
+
+def test_export_download_supports_range(admin_client):
+    response = admin_client.post('/admin/export/jobs', json={'type': 'teachers'})
+    job = _wait_for(admin_client, response.get_json()['status_url'])
+
+    partial = admin_client.get(f"/admin/export/jobs/{job['id']}/download", headers={'Range': 'bytes=0-9'})
+
+    assert partial.status_code == 206
+    assert partial.data == b'Teacher ID'
+
+
+def test_export_job_rejects_unknown_filter(admin_client):
+    response = admin_client.post('/admin/export/jobs', json={'type': 'students', 'filters': {'password': 'x'}})
+
+    assert response.status_code == 400
+    assert admin_client.get('/admin/export/jobs/999999').status_code == 404
+
+
+def _insert_job(test_db, status, owner, heartbeat_age):
+    return test_db.execute("""
+        INSERT INTO export_jobs (export_type, filters, format, status, owner, created_at, started_at, heartbeat_at)
+        VALUES ('students', '{}', 'csv', ?, ?, datetime('now', ?), datetime('now', ?), datetime('now', ?))
+    """, (status, owner, *[f"-{heartbeat_age} seconds"] * 3)).lastrowid
+
+
+def test_orphaned_jobs_are_failed(test_db):
+    jobs = {
+        # This process's previous incarnation, cut off minutes after starting
+        "restarted": _insert_job(test_db, 'running', export_jobs.PROCESS_ID[:-1] + "x", 30),
+        "ownerless": _insert_job(test_db, 'queued', None, 0),
+        # Another host's worker that stopped sending heartbeats
+        "silent": _insert_job(test_db, 'running', "elsewhere:1:abc", 2 * export_jobs.HEARTBEAT_TIMEOUT_SECONDS),
+        # Still making progress, in this process and on another host
+        "live": _insert_job(test_db, 'running', export_jobs.PROCESS_ID, 2 * export_jobs.STALE_AFTER_SECONDS),
+        "remote": _insert_job(test_db, 'running', "elsewhere:1:abc", 10),
+        "waiting": _insert_job(test_db, 'queued', "elsewhere:1:abc", export_jobs.HEARTBEAT_TIMEOUT_SECONDS + 60),
+    }
+    test_db.execute("UPDATE export_jobs SET heartbeat_at = CURRENT_TIMESTAMP WHERE id = ?", (jobs["live"],))
+    test_db.commit()
+
+    assert export_jobs.fail_stale(test_db) >= 3
+
+    statuses = {name: test_db.execute("SELECT status FROM export_jobs WHERE id = ?", (job,)).fetchone()[0]
+                for name, job in jobs.items()}
+    assert statuses == {"restarted": "failed", "ownerless": "failed", "silent": "failed",
+                        "live": "running", "remote": "running", "waiting": "queued"}
+    test_db.executemany("DELETE FROM export_jobs WHERE id = ?", [(job,) for job in jobs.values()])
+    test_db.commit()
+
+
+def test_status_read_fails_an_orphaned_job(admin_client, test_db):
+    job = _insert_job(test_db, 'running', export_jobs.PROCESS_ID[:-1] + "x", 5)
+    test_db.commit()
+
+    data = admin_client.get(f'/admin/export/jobs/{job}').get_json()['job']
+
+    assert data['status'] == 'failed'
+    assert 'restart' in data['error']
+    test_db.execute("DELETE FROM export_jobs WHERE id = ?", (job,))
+    test_db.commit()
@@ -0,0 +1,131 @@
+# tests/test_image_hash.py
+import io
+import random
+
+import pytest
+from PIL import Image, ImageDraw
+
+import app as app_module
+from services import duplicate_index
+from utils.image_hash import BKTree, dhash, hamming_distance, hash_to_hex
+
+
+def _certificate(title='Hit the Bug', size=(600, 420)):
+    image = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([20, 20, size[0] - 20, size[1] - 20], outline='navy', width=12)
+    draw.rectangle([60, 80, 540, 140], fill='darkred')
+    draw.ellipse([250, 260, 350, 360], fill='goldenrod')
+    draw.text((80, 180), title, fill='black')
+    return image
+
+
+def _encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    buffer.seek(0)
+    return buffer
+
+
+def test_dhash_survives_recompression_and_resizing():
+    original = _certificate()
+    rescanned = Image.open(_encode(original.resize((450, 315)), 'JPEG', quality=40))
+
+    assert hamming_distance(dhash(original), dhash(rescanned)) <= 6
+
+
+def test_dhash_separates_different_certificates():
+    other = Image.new('RGB', (600, 420), 'white')
+    ImageDraw.Draw(other).rectangle([300, 0, 600, 210], fill='black')
+
+    assert hamming_distance(dhash(_certificate()), dhash(other)) > 20
+
+
+def test_dhash_closes_files_it_opens(tmp_path, monkeypatch):
+    # A truncated file fails mid-decode, before Pillow would close it itself
+    path = tmp_path / 'cert.png'
+    data = _encode(_certificate(), 'PNG').getvalue()
+    path.write_bytes(data[:len(data) // 2])
+    opened = []
+    real_open = Image.open
+    monkeypatch.setattr(Image, 'open', lambda *args, **kwargs: opened.append(real_open(*args, **kwargs)) or opened[-1])
+
+    with pytest.raises(OSError):
+        dhash(str(path))
+
+    assert len(opened) == 1 and opened[0].fp is None
+
+
+def test_bktree_matches_linear_scan():
+    rng = random.Random(7)
+    values = [rng.getrandbits(64) for _ in range(500)]
+    tree = BKTree()
+    for n, value in enumerate(values):
+        tree.add(value, n)
+
+    target = values[42] ^ 0b1011  # three bits away from a stored hash
+    expected = sorted((hamming_distance(target, v), n) for n, v in enumerate(values)
+                      if hamming_distance(target, v) <= 12)
+
+    assert len(tree) == 500
+    assert sorted(tree.search(target, 12)) == expected
+    assert tree.search(target, 12)[0] == (3, 42)
+
+
+def test_submission_flags_rescanned_certificate(auth_teacher_client, test_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "UPLOAD_FOLDER", str(tmp_path))
+    monkeypatch.setitem(app_module.app.config, "OCR_WORKERS", 0)
+    duplicate_index.reset()
+    form = {'student_id': 'S001', 'achievement_type': 'CODING', 'organizer': 'Club', 'position': '1'}
+    original = _certificate()
+
+    first = auth_teacher_client.post('/submit_achievements', content_type='multipart/form-data', data={
+        **form, 'event_name': 'Near Dup Original', 'certificate': (_encode(original, 'PNG'), 'cert.png')})
+    second = auth_teacher_client.post('/submit_achievements', content_type='multipart/form-data', data={
+        **form, 'event_name': 'Near Dup Copy',
+        'certificate': (_encode(original.resize((500, 350)), 'JPEG', quality=50), 'scan.jpg')})
+
+    assert b'looks very similar' not in first.data
+    assert b'looks very similar' in second.data
+    rows = test_db.execute("""
+        SELECT id, certificate_phash, near_duplicate_of FROM achievements
+        WHERE event_name LIKE 'Near Dup%' ORDER BY id
+    """).fetchall()
+    assert rows[0][1] and rows[0][2] is None
+    assert rows[1][2] == rows[0][0]
+
+    ids = [row[0] for row in rows]
+    test_db.execute(f"DELETE FROM ocr_jobs WHERE achievement_id IN ({','.join('?' * len(ids))})", ids)
+    test_db.execute(f"DELETE FROM achievements WHERE id IN ({','.join('?' * len(ids))})", ids)
+    test_db.commit()
+
+
+def test_running_index_sees_backfilled_hashes(test_db):
+    image = _certificate('Backfilled Later')
+    image_hash = dhash(image)
+    cursor = test_db.execute("""
+        INSERT INTO achievements (teacher_id, student_id, achievement_type, event_name,
+                                  achievement_date, organizer, position)
+        VALUES ('T001', 'S001', 'CODING', 'Backfill', '2025-01-01', 'Club', '1')
+    """)
+    achievement_id = cursor.lastrowid
+    # A later row that is already hashed, so the index's id watermark passes ours
+    later = test_db.execute("""
+        INSERT INTO achievements (teacher_id, student_id, achievement_type, event_name,
+                                  achievement_date, organizer, position, certificate_phash)
+        VALUES ('T001', 'S001', 'CODING', 'Backfill', '2025-01-01', 'Club', '1', ?)
+    """, (hash_to_hex(dhash(_certificate('Unrelated', size=(300, 600)))),)).lastrowid
+    test_db.commit()
+    try:
+        with app_module.app.app_context():
+            connection = app_module.get_db()
+            duplicate_index.find_near_duplicates(connection, hash_to_hex(image_hash))  # index built
+
+            test_db.execute("UPDATE achievements SET certificate_phash = ? WHERE id = ?",
+                            (hash_to_hex(image_hash), achievement_id))
+            test_db.commit()
+            matches = duplicate_index.find_near_duplicates(connection, hash_to_hex(image_hash))
+        assert achievement_id in [row["id"] for row in matches]
+    finally:
+        test_db.execute("DELETE FROM achievements WHERE id IN (?, ?)", (achievement_id, later))
+        test_db.commit()
@@ -0,0 +1,75 @@
+# tests/test_image_preprocess.py
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from utils import certificate_ocr
+from utils.image_preprocess import (
+    adaptive_binarize, box_mean, downscale, estimate_skew, grayscale, preprocess_for_ocr
+)
+
+
+def _lined_page(size=(1200, 800)):
+    page = Image.new('L', size, 255)
+    draw = ImageDraw.Draw(page)
+    for y in range(100, size[1] - 100, 40):
+        draw.rectangle([100, y, size[0] - 100, y + 12], fill=0)
+    return page
+
+
+@pytest.mark.parametrize('size', [1, 3, 7, 31])
+def test_box_mean_matches_brute_force(size):
+    rng = np.random.default_rng(3)
+    array = rng.uniform(0, 255, (23, 41)).astype(np.float32)
+    r = size // 2
+    expected = np.array([[array[max(0, y - r):y + r + 1, max(0, x - r):x + r + 1].mean()
+                          for x in range(41)] for y in range(23)])
+
+    assert np.allclose(box_mean(array, size), expected, atol=1e-3)
+
+
+def test_adaptive_binarize_ignores_lighting_gradient():
+    # Dark text strip on a background fading from white to mid-gray
+    gray = np.tile(np.linspace(255, 110, 400, dtype=np.float32), (100, 1))
+    gray[45:55, 20:380] -= 60
+
+    binary = adaptive_binarize(gray)
+
+    assert (binary[45:55, 40:360] == 0).mean() > 0.9
+    assert (binary[:30] == 255).all()
+
+
+@pytest.mark.parametrize('angle', [-3.5, -1.0, 0.0, 2.25, 4.0])
+def test_estimate_skew_recovers_rotation(angle):
+    rotated = _lined_page().rotate(angle, expand=True, fillcolor=255)
+
+    assert estimate_skew(adaptive_binarize(grayscale(rotated))) == pytest.approx(angle, abs=0.25)
+
+
+def test_downscale_to_target_dpi():
+    scan = Image.new('RGB', (2480 * 2, 3508 * 2), 'white')
+    scan.info['dpi'] = (600, 600)
+
+    assert downscale(scan).size == (2480, 3508)
+    assert downscale(Image.new('RGB', (800, 600))).size == (800, 600)
+
+
+def test_preprocess_levels_and_binarizes():
+    skewed = _lined_page().convert('RGB').rotate(3, expand=True, fillcolor='white')
+
+    result = preprocess_for_ocr(skewed)
+
+    assert result.mode == 'L'
+    assert set(np.unique(np.asarray(result))) <= {0, 255}
+    assert estimate_skew(np.asarray(result)) == pytest.approx(0, abs=0.25)
+
+
+def test_ocr_receives_preprocessed_image(tmp_path, monkeypatch):
+    seen = []
+    monkeypatch.setattr(certificate_ocr.pytesseract, 'image_to_string', lambda image: seen.append(image) or ' text ')
+    path = tmp_path / 'cert.png'
+    _lined_page().convert('RGB').save(path)
+
+    assert certificate_ocr.extract_text_from_certificate(str(path)) == 'text'
+    assert certificate_ocr.extract_text_from_certificate(str(path), preprocess=False) == 'text'
+    assert seen[0].mode == 'L' and seen[1].mode == 'RGB'
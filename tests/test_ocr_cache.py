@@ -0,0 +1,79 @@
+# tests/test_ocr_cache.py
+import pytest
+
+from services import certificate_service
+from services.certificate_service import process_certificate
+
+FILE_HASH = 'f' * 64
+
+
+@pytest.fixture
+def fake_ocr(test_db, tmp_path, monkeypatch):
+    """Counts Tesseract runs; yields (certificate path, list of OCR'd paths)."""
+    calls = []
+    monkeypatch.setattr(certificate_service, "extract_text_from_certificate",
+                        lambda path: calls.append(path) or "Awarded to Test Student for participating in Hackathon")
+    monkeypatch.setattr(certificate_service, "ocr_engine_version", lambda: "tesseract 5.3.0")
+    path = tmp_path / 'cert.png'
+    path.write_bytes(b'not really an image')
+    yield str(path), calls
+    test_db.execute("DELETE FROM ocr_results WHERE sha256 = ?", (FILE_HASH,))
+    test_db.commit()
+
+
+def test_second_run_uses_cached_text(test_db, fake_ocr):
+    path, calls = fake_ocr
+
+    first = process_certificate(path, file_hash=FILE_HASH, connection=test_db)
+    second = process_certificate(path, file_hash=FILE_HASH, connection=test_db)
+
+    assert len(calls) == 1
+    assert (first["cached"], second["cached"]) == (False, True)
+    assert second["raw_text"] == first["raw_text"]
+    assert second["parsed_data"]["event_name"] == "Hackathon"
+    engine, = test_db.execute("SELECT engine_version FROM ocr_results WHERE sha256 = ?", (FILE_HASH,)).fetchone()
+    assert engine == "tesseract 5.3.0"
+
+
+def test_cached_text_is_reparsed(test_db, fake_ocr, monkeypatch):
+    path, calls = fake_ocr
+    process_certificate(path, file_hash=FILE_HASH, connection=test_db)
+
+    monkeypatch.setattr(certificate_service, "parse_certificate_text", lambda text: {"event_name": text.upper()})
+    result = process_certificate(path, file_hash=FILE_HASH, connection=test_db)
+
+    assert len(calls) == 1
+    assert result["parsed_data"]["event_name"].startswith("AWARDED TO")
+
+
+def test_engine_upgrade_invalidates_cache(test_db, fake_ocr, monkeypatch):
+    path, calls = fake_ocr
+    process_certificate(path, file_hash=FILE_HASH, connection=test_db)
+
+    monkeypatch.setattr(certificate_service, "ocr_engine_version", lambda: "tesseract 5.4.0")
+    process_certificate(path, file_hash=FILE_HASH, connection=test_db)
+
+    assert len(calls) == 2
+
+
+def test_nothing_cached_without_an_engine(test_db, fake_ocr, monkeypatch):
+    path, calls = fake_ocr
+    monkeypatch.setattr(certificate_service, "ocr_engine_version", lambda: None)
+
+    process_certificate(path, file_hash=FILE_HASH, connection=test_db)
+    process_certificate(path, file_hash=FILE_HASH, connection=test_db)
+
+    assert len(calls) == 2
+    assert test_db.execute("SELECT COUNT(*) FROM ocr_results WHERE sha256 = ?", (FILE_HASH,)).fetchone()[0] == 0
+
+
+def test_failed_ocr_is_not_cached(test_db, fake_ocr, monkeypatch):
+    path, calls = fake_ocr
+
+    def broken(path):
+        raise RuntimeError("tesseract timed out")
+    monkeypatch.setattr(certificate_service, "extract_text_from_certificate", broken)
+
+    with pytest.raises(RuntimeError):
+        process_certificate(path, file_hash=FILE_HASH, connection=test_db)
+    assert test_db.execute("SELECT COUNT(*) FROM ocr_results WHERE sha256 = ?", (FILE_HASH,)).fetchone()[0] == 0
@@ -0,0 +1,143 @@
+# tests/test_ocr_queue.py
+import io
+
+import pytest
+from PIL import Image
+
+import app as app_module
+from app import app
+from services import certificate_service, ocr_queue
+
+
+@pytest.fixture
+def queued_upload(auth_teacher_client, test_db, tmp_path, monkeypatch):
+    """Submit one certificate with OCR workers disabled; yields the achievement id."""
+    monkeypatch.setattr(app_module, "UPLOAD_FOLDER", str(tmp_path))
+    monkeypatch.setitem(app.config, "OCR_WORKERS", 0)
+
+    image = io.BytesIO()
+    Image.new("RGB", (40, 20), "white").save(image, "PNG")
+    image.seek(0)
+    auth_teacher_client.post('/submit_achievements', data={
+        'student_id': 'S001',
+        'achievement_type': 'CODING',
+        'organizer': 'Club',
+        'position': '1',
+        'certificate': (image, 'cert.png'),
+    }, content_type='multipart/form-data')
+
+    row = test_db.execute("SELECT id FROM achievements WHERE teacher_id = 'T001' ORDER BY id DESC").fetchone()
+    yield row[0]
+    test_db.execute("DELETE FROM ocr_jobs WHERE achievement_id = ?", (row[0],))
+    test_db.execute("DELETE FROM achievements WHERE id = ?", (row[0],))
+    test_db.commit()
+
+
+def test_submission_queues_ocr_instead_of_running_it(queued_upload, test_db, monkeypatch):
+    calls = []
+    monkeypatch.setattr(ocr_queue, "process_certificate", lambda path, **kwargs: calls.append(path) or {
+        "raw_text": "Awarded to Test Student for participating in Hackathon 2025",
+        "parsed_data": {"event_name": "Hackathon 2025", "achievement_date": "01/02/2025"},
+    })
+
+    status, event_name = test_db.execute(
+        "SELECT ocr_status, event_name FROM achievements WHERE id = ?", (queued_upload,)).fetchone()
+    assert (status, event_name) == ('pending', '')
+    assert calls == []
+
+    assert ocr_queue.drain(app.config["DB_PATH"]) == 1
+
+    assert len(calls) == 1
+    status, event_name, date = test_db.execute(
+        "SELECT ocr_status, event_name, achievement_date FROM achievements WHERE id = ?",
+        (queued_upload,)).fetchone()
+    assert (status, event_name, date) == ('done', 'Hackathon 2025', '01/02/2025')
+
+
+def test_ocr_status_endpoint(queued_upload, auth_teacher_client, monkeypatch):
+    monkeypatch.setattr(ocr_queue, "process_certificate", lambda path, **kwargs: {"raw_text": "", "parsed_data": {}})
+
+    before = auth_teacher_client.get(f'/achievement/{queued_upload}/ocr-status').get_json()
+    assert before['ocr_status'] == 'pending'
+    assert before['job_status'] == 'queued'
+
+    ocr_queue.drain(app.config["DB_PATH"])
+
+    after = auth_teacher_client.get(f'/achievement/{queued_upload}/ocr-status').get_json()
+    assert after['ocr_status'] == 'done'
+    assert after['job_status'] == 'done'
+    assert after['parsed'] == {}
+
+
+def test_failed_ocr_is_retried_then_marked_failed(queued_upload, test_db, monkeypatch):
+    def broken(path, **kwargs):
+        raise RuntimeError("tesseract exploded")
+    monkeypatch.setattr(ocr_queue, "process_certificate", broken)
+    monkeypatch.setattr(ocr_queue, "RETRY_BASE_SECONDS", 0)
+
+    assert ocr_queue.drain(app.config["DB_PATH"]) == ocr_queue.MAX_ATTEMPTS
+
+    job = test_db.execute(
+        "SELECT status, attempts, error FROM ocr_jobs WHERE achievement_id = ?", (queued_upload,)).fetchone()
+    assert tuple(job) == ('failed', ocr_queue.MAX_ATTEMPTS, 'tesseract exploded')
+    status = test_db.execute("SELECT ocr_status FROM achievements WHERE id = ?", (queued_upload,)).fetchone()[0]
+    assert status == 'failed'
+
+
+def test_extraction_errors_reach_the_retry_logic(queued_upload, test_db, monkeypatch):
+    def broken(path):
+        raise RuntimeError("tesseract timed out")
+    monkeypatch.setattr(certificate_service, "extract_text_from_certificate", broken)
+    monkeypatch.setattr(certificate_service, "ocr_engine_version", lambda: "tesseract 5.3.0")
+    monkeypatch.setattr(ocr_queue, "RETRY_BASE_SECONDS", 0)
+
+    assert ocr_queue.drain(app.config["DB_PATH"]) == ocr_queue.MAX_ATTEMPTS
+
+    job = test_db.execute("SELECT status, error FROM ocr_jobs WHERE achievement_id = ?", (queued_upload,)).fetchone()
+    assert tuple(job) == ('failed', 'tesseract timed out')
+    assert test_db.execute("SELECT COUNT(*) FROM ocr_results WHERE engine_version = 'tesseract 5.3.0'"
+                           ).fetchone()[0] == 0
+
+
+def test_failed_job_waits_out_its_backoff(queued_upload, test_db, monkeypatch):
+    outcomes = [RuntimeError("database is locked"), {"raw_text": "", "parsed_data": {}}]
+
+    def flaky(path, **kwargs):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    monkeypatch.setattr(ocr_queue, "process_certificate", flaky)
+
+    assert ocr_queue.drain(app.config["DB_PATH"]) == 1
+    status, wait = test_db.execute("""
+        SELECT status, CAST(strftime('%s', not_before) - strftime('%s', 'now') AS INTEGER)
+        FROM ocr_jobs WHERE achievement_id = ?
+    """, (queued_upload,)).fetchone()
+    assert status == 'queued'
+    assert wait >= ocr_queue.retry_delay(1) - 1
+
+    # Still backing off: nothing to claim yet
+    assert ocr_queue.drain(app.config["DB_PATH"]) == 0
+
+    test_db.execute("UPDATE ocr_jobs SET not_before = datetime('now', '-1 seconds') WHERE achievement_id = ?",
+                    (queued_upload,))
+    test_db.commit()
+    assert ocr_queue.drain(app.config["DB_PATH"]) == 1
+    assert test_db.execute("SELECT status FROM ocr_jobs WHERE achievement_id = ?",
+                           (queued_upload,)).fetchone()[0] == 'done'
+
+
+def test_orphaned_running_job_is_requeued(queued_upload, test_db):
+    test_db.execute("""
+        UPDATE ocr_jobs SET status = 'running', started_at = datetime('now', '-1 hours')
+        WHERE achievement_id = ?
+    """, (queued_upload,))
+    test_db.commit()
+
+    with app.app_context():
+        from utils.db import get_db
+        assert ocr_queue.requeue_stale(get_db()) >= 1
+
+    assert test_db.execute("SELECT status FROM ocr_jobs WHERE achievement_id = ?",
+                           (queued_upload,)).fetchone()[0] == 'queued'
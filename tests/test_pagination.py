@@ -0,0 +1,95 @@
+# tests/test_pagination.py
+import pytest
+
+from utils.pagination import decode_cursor, encode_cursor
+
+TEACHER_ID = 'T910'
+
+
+@pytest.fixture
+def seven_achievements(test_db):
+    """Seven achievements for S001 by T910; two share a date to exercise the id tie-break."""
+    dates = ['2025-01-01', '2025-01-02', '2025-01-03', '2025-01-03', '2025-01-04', '2025-01-05', '2025-01-06']
+    for n, date in enumerate(dates):
+        test_db.execute("""
+            INSERT INTO achievements (teacher_id, student_id, achievement_type, event_name,
+                                      achievement_date, organizer, position)
+            VALUES (?, 'S001', 'CODING', ?, ?, 'Club', '1')
+        """, (TEACHER_ID, f"Event {n}", date))
+    test_db.commit()
+    yield
+    test_db.execute("DELETE FROM achievements WHERE teacher_id = ?", (TEACHER_ID,))
+    test_db.commit()
+
+
+def _login_teacher(client):
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+        sess['teacher_id'] = TEACHER_ID
+
+
+def test_cursor_round_trip():
+    token = encode_cursor(["2025-01-03", 42])
+    assert decode_cursor(token, 2) == ["2025-01-03", 42]
+    assert decode_cursor(token, 3) is None
+    assert decode_cursor("not-a-cursor!", 2) is None
+
+
+def test_all_achievements_pages_forward_and_back(client, seven_achievements):
+    _login_teacher(client)
+
+    first = client.get('/all-achievements?format=json&limit=3').get_json()
+    assert [a['event_name'] for a in first['achievements']] == ['Event 6', 'Event 5', 'Event 4']
+    assert first['prev_cursor'] is None
+
+    second = client.get(f"/all-achievements?format=json&limit=3&after={first['next_cursor']}").get_json()
+    assert [a['event_name'] for a in second['achievements']] == ['Event 3', 'Event 2', 'Event 1']
+
+    third = client.get(f"/all-achievements?format=json&limit=3&after={second['next_cursor']}").get_json()
+    assert [a['event_name'] for a in third['achievements']] == ['Event 0']
+    assert third['next_cursor'] is None
+
+    back = client.get(f"/all-achievements?format=json&limit=3&before={second['prev_cursor']}").get_json()
+    assert back['achievements'] == first['achievements']
+    assert back['prev_cursor'] is None
+
+
+def test_all_achievements_page_links(client, seven_achievements):
+    _login_teacher(client)
+
+    response = client.get('/all-achievements?limit=3')
+
+    assert response.status_code == 200
+    assert b'Older' in response.data
+    assert b'Newer' not in response.data
+
+
+def test_page_size_is_capped(client, seven_achievements):
+    _login_teacher(client)
+
+    data = client.get('/all-achievements?format=json&limit=100000').get_json()
+
+    assert len(data['achievements']) == 7
+
+
+def test_student_achievements_lists_own_rows(auth_student_client, seven_achievements):
+    data = auth_student_client.get('/student-achievements?format=json&limit=5').get_json()
+
+    assert len(data['achievements']) == 5
+    assert data['next_cursor']
+
+    page = auth_student_client.get('/student-achievements')
+    assert page.status_code == 200
+    assert b'Event 6' in page.data
+
+
+def test_admin_users_json_hides_password_hashes(client):
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+        sess['admin_id'] = 'superadmin'
+
+    data = client.get('/admin/users?type=students&format=json&limit=1').get_json()
+
+    assert len(data['users']) == 1
+    assert 'password' not in data['users'][0]
+    assert 'row_id' not in data['users'][0]
@@ -0,0 +1,78 @@
+# tests/test_pdf_certificates.py
+import pytest
+from PIL import Image
+
+from utils import certificate_ocr
+
+pytest.importorskip("pypdf")
+
+
+def _text_pdf(path, pages):
+    """Write a minimal PDF whose pages carry the given lines as a real text layer."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        ops = " ".join(f"BT /F1 14 Tf 72 {720 - 20 * n} Td ({line}) Tj ET" for n, line in enumerate(lines))
+        objects.append(f"<< /Length {len(ops)} >>\nstream\n{ops}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(out)
+    return str(path)
+
+
+@pytest.fixture
+def no_ocr(monkeypatch):
+    calls = []
+    monkeypatch.setattr(certificate_ocr.pytesseract, 'image_to_string', lambda image: calls.append(image) or 'scanned')
+    return calls
+
+
+def test_text_layer_is_used_without_ocr(tmp_path, no_ocr):
+    path = _text_pdf(tmp_path / 'cert.pdf', [[
+        "Certificate of Achievement",
+        "This certifies that Test Student",
+        "for participating in Hit the Bug",
+        "12 March 2025",
+    ]])
+
+    text = certificate_ocr.extract_text_from_certificate(path)
+
+    assert "for participating in Hit the Bug" in text
+    assert no_ocr == []
+
+
+def test_stops_reading_once_fields_are_found(tmp_path, no_ocr, monkeypatch):
+    path = _text_pdf(tmp_path / 'cert.pdf', [
+        ["Awarded to Test Student", "for participating in Web Wonder", "01/02/2025"],
+        ["Terms and conditions page"],
+    ])
+
+    text = certificate_ocr.extract_text_from_certificate(path)
+
+    assert "Web Wonder" in text
+    assert "Terms and conditions" not in text
+
+
+def test_scanned_pages_are_rasterized_and_ocrd(tmp_path, no_ocr):
+    pytest.importorskip("pypdfium2")
+    path = tmp_path / 'scan.pdf'
+    Image.new('RGB', (850, 1100), 'white').save(path, 'PDF', resolution=100)
+
+    text = certificate_ocr.extract_text_from_certificate(str(path))
+
+    assert text == 'scanned'
+    assert len(no_ocr) == 1
+    assert no_ocr[0].mode == 'L'
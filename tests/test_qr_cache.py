@@ -0,0 +1,139 @@
+# tests/test_qr_cache.py
+import os
+import re
+
+import pytest
+
+from app import app
+from utils import qr_handler
+
+
+@pytest.fixture
+def achievement_id(test_db):
+    cursor = test_db.execute("""
+        INSERT INTO achievements (teacher_id, student_id, achievement_type, event_name,
+                                  achievement_date, organizer, position)
+        VALUES ('T001', 'S001', 'CODING', 'QR Test', '2025-01-01', 'Club', '1')
+    """)
+    test_db.commit()
+    yield cursor.lastrowid
+    test_db.execute("DELETE FROM achievements WHERE id = ?", (cursor.lastrowid,))
+    test_db.commit()
+
+
+@pytest.fixture
+def qr_cache(tmp_path, monkeypatch):
+    """Empty memory and disk caches; counts real renders."""
+    renders = []
+    render = qr_handler.render_qr_png
+    monkeypatch.setattr(qr_handler, "render_qr_png", lambda url: renders.append(url) or render(url))
+    monkeypatch.setitem(app.config, "QR_CACHE_FOLDER", str(tmp_path))
+    qr_handler.get_qr_png.cache_clear()
+    yield renders
+    qr_handler.get_qr_png.cache_clear()
+
+
+def _qr_url(client, achievement_id):
+    return client.get(f'/api/achievement/{achievement_id}').get_json()['qr_code_url']
+
+
+def test_qr_endpoint_renders_once_and_caches(auth_student_client, achievement_id, qr_cache, tmp_path):
+    client = auth_student_client
+    url = _qr_url(client, achievement_id)
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'image/png'
+    assert response.data.startswith(b'\x89PNG')
+    etag, weak = response.get_etag()
+    assert etag and not weak
+    assert response.cache_control.private and not response.cache_control.public
+    assert response.cache_control.max_age >= 86400
+    assert os.path.exists(tmp_path / etag[:2] / f"{etag}.png")
+
+    # Revalidation costs nothing
+    again = client.get(url, headers={'If-None-Match': f'"{etag}"'})
+    assert again.status_code == 304
+    assert again.data == b''
+
+    # A fresh process (empty LRU) reads the disk copy instead of rendering
+    qr_handler.get_qr_png.cache_clear()
+    assert client.get(url).data == response.data
+    assert len(qr_cache) == 1 and qr_cache[0].startswith('http://localhost/verify/')
+
+
+@pytest.mark.parametrize("column,value", [
+    ("position", "2"),
+    # OCR filling a blank field changes the token without a revision bump
+    ("event_name", ""),
+])
+def test_token_change_moves_qr_to_new_url(auth_student_client, achievement_id, test_db, qr_cache,
+                                          column, value):
+    client = auth_student_client
+    if value == "":
+        test_db.execute("UPDATE achievements SET event_name = '' WHERE id = ?", (achievement_id,))
+        test_db.commit()
+        value = "Filled In By OCR"
+    old_url = _qr_url(client, achievement_id)
+    old = client.get(old_url)
+
+    test_db.execute(f"UPDATE achievements SET {column} = ? WHERE id = ?", (value, achievement_id))
+    test_db.commit()
+
+    new_url = _qr_url(client, achievement_id)
+    assert new_url != old_url
+    response = client.get(old_url)
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith(new_url)
+    new = client.get(new_url)
+    assert new.data != old.data
+    assert new.get_etag() != old.get_etag()
+
+
+def test_qr_only_for_owner_teacher_and_admin(client, achievement_id, qr_cache):
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+        sess['student_id'] = 'S001'
+    url = _qr_url(client, achievement_id)
+    with client.session_transaction() as sess:
+        sess.clear()
+    assert client.get(url).status_code == 302
+
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+        sess['student_id'] = 'S999'
+    assert client.get(url).status_code == 404
+
+    with client.session_transaction() as sess:
+        sess.clear()
+        sess['logged_in'] = True
+        sess['teacher_id'] = 'T001'
+    assert client.get(url).status_code == 200
+
+    with client.session_transaction() as sess:
+        sess.clear()
+        sess['logged_in'] = True
+        sess['admin_id'] = 'superadmin'
+    assert client.get(url).status_code == 200
+
+
+def test_qr_for_unknown_achievement(auth_student_client, qr_cache):
+    assert auth_student_client.get('/qr/999999-0123456789abcdef.png').status_code == 404
+    assert qr_cache == []
+
+
+def test_pages_link_the_image_instead_of_inlining_it(auth_student_client, achievement_id, qr_cache):
+    data = auth_student_client.get(f'/api/achievement/{achievement_id}').get_json()
+    assert re.fullmatch(rf'/qr/{achievement_id}-[0-9a-f]{{16}}\.png', data['qr_code_url'])
+    assert 'qr_code' not in data
+
+    page = auth_student_client.get(f'/export-achievement/{achievement_id}').get_data(as_text=True)
+    assert f'src="{data["qr_code_url"]}"' in page
+    assert 'data:image/png;base64' not in page
+    assert qr_cache == []
+
+
+def test_generate_qr_code_still_returns_data_uri():
+    assert qr_handler.generate_qr_code('http://localhost/verify-achievement/1').startswith('data:image/png;base64,')
+    with pytest.raises(ValueError):
+        qr_handler.generate_qr_code('')
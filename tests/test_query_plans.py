@@ -0,0 +1,186 @@
+# tests/test_query_plans.py
+"""
+Query-plan regression tests.
+
+Each hot route is requested through the test client while every statement
+it runs is recorded; the SELECTs are then replayed through EXPLAIN QUERY PLAN
+and must not fall back to a full table scan; exports, which do read every
+row, must not sort them in a temp B-tree before the first one is sent. The
+tables are seeded and
+ANALYZEd first so the planner costs them as it would in production.
+"""
+import re
+
+import pytest
+
+from services.export_service import build_query
+from utils.db import get_db
+
+# Any table scan, including "SCAN a USING COVERING INDEX x": walking a whole
+# index is still a full scan. Subquery/co-routine scans are fine.
+TABLE_SCAN = re.compile(r"^SCAN (?!\(|CONSTANT ROW)\w+")
+
+# Top-N scans that walk an index in ORDER BY order and stop after LIMIT rows
+# (the admin dashboard's "recent registrations" list).
+ORDERED_LIMIT_SCANS = {
+    "SCAN student USING INDEX idx_student_created",
+    "SCAN teacher USING INDEX idx_teacher_created",
+}
+
+# Exports read every row by design; they must walk an index in output order
+# so rows stream out without a sort first
+EXPORT_SCANS = {
+    "SCAN student USING INDEX idx_student_name",
+    "SCAN teacher USING INDEX idx_teacher_name",
+    "SCAN a USING INDEX idx_achievements_date",
+}
+
+# Keyed lookups and the index each one must SEARCH
+KEYED_LOOKUPS = [
+    ("teacher", "/teacher-dashboard", "a", "idx_achievements_teacher_created"),
+    ("teacher", "/teacher-dashboard", "achievements", "idx_achievements_teacher_date"),
+    ("teacher", "/all-achievements", "a", "idx_achievements_teacher_date"),
+    ("student", "/student-achievements?before=WyIyMDI1LTAxLTAxIiw5OV0", "a", "idx_achievements_student"),
+    ("admin", "/admin/users?type=students&status=pending", "student", "idx_student_approved_created"),
+    ("admin", "/admin/users?type=teachers&status=pending", "teacher", "idx_teacher_approved_created"),
+    ("admin", "/admin/users?type=students&after=WyIyMDI1LTAxLTAxIDAwOjAwOjAwIiw5OV0", "student", "idx_student_created"),
+]
+
+SEED_STUDENTS = 200
+SEED_TEACHERS = 20
+SEED_ACHIEVEMENTS = 2000
+
+HOT_ROUTES = [
+    ("teacher", "GET", "/teacher-dashboard", None),
+    ("teacher", "GET", "/all-achievements", None),
+    ("teacher", "GET", "/all-achievements?after=WyIyMDI1LTAxLTAxIiw5OV0", None),
+    ("student", "GET", "/student-achievements?before=WyIyMDI1LTAxLTAxIiw5OV0", None),
+    ("student", "GET", "/student/profile", None),
+    ("student", "GET", "/api/achievement/1", None),
+    ("student", "GET", "/export-achievement/1", None),
+    (None, "GET", "/verify-achievement/1", None),
+    (None, "POST", "/student", {"sname": "S001", "password": "password"}),
+    (None, "POST", "/teacher", {"tname": "T001", "password": "password"}),
+    (None, "POST", "/admin", {"admin_id": "superadmin", "password": "wrong"}),
+    ("admin", "GET", "/admin/dashboard", None),
+    ("admin", "GET", "/admin/users?type=students&status=pending", None),
+    ("admin", "GET", "/admin/users?type=teachers&status=pending", None),
+    ("admin", "GET", "/admin/users?type=students&after=WyIyMDI1LTAxLTAxIDAwOjAwOjAwIiw5OV0", None),
+    ("admin", "GET", "/admin/export?type=students", None),
+    ("admin", "GET", "/admin/export?type=teachers", None),
+    ("admin", "GET", "/admin/export?type=achievements", None),
+]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def seeded_stats(test_app):
+    """Representative row counts plus ANALYZE statistics, removed afterwards."""
+    with test_app.app_context():
+        conn = get_db()
+        conn.executemany(
+            "INSERT INTO student (student_name, student_id, email, password, student_dept, is_approved) "
+            "VALUES (?, ?, ?, 'x', 'CSE', ?)",
+            [(f"Plan Student {n}", f"QPS{n:04d}", f"qps{n}@test.com", int(n % 10 != 0))
+             for n in range(SEED_STUDENTS)])
+        conn.executemany(
+            "INSERT INTO teacher (teacher_name, teacher_id, email, password, teacher_dept, is_approved) "
+            "VALUES (?, ?, ?, 'x', 'CSE', ?)",
+            [(f"Plan Teacher {n}", f"QPT{n:03d}", f"qpt{n}@test.com", int(n % 5 != 0))
+             for n in range(SEED_TEACHERS)])
+        conn.executemany("""
+            INSERT INTO achievements (teacher_id, student_id, achievement_type, event_name,
+                                      achievement_date, organizer, position)
+            VALUES (?, ?, 'CODING', ?, ?, 'Club', '1')
+        """, [(f"QPT{n % SEED_TEACHERS:03d}", f"QPS{n % SEED_STUDENTS:04d}", f"Plan Event {n}",
+               f"2024-{n % 12 + 1:02d}-{n % 28 + 1:02d}")
+              for n in range(SEED_ACHIEVEMENTS)])
+        conn.commit()
+        conn.execute("ANALYZE")
+        conn.commit()
+
+    yield
+
+    with test_app.app_context():
+        conn = get_db()
+        ids = [row[0] for row in conn.execute("SELECT id FROM achievements WHERE student_id LIKE 'QPS%'")]
+        conn.execute("DELETE FROM achievements WHERE student_id LIKE 'QPS%'")
+        conn.executemany("DELETE FROM token_revocations WHERE achievement_id = ?", [(i,) for i in ids])
+        conn.execute("DELETE FROM student WHERE student_id LIKE 'QPS%'")
+        conn.execute("DELETE FROM teacher WHERE teacher_id LIKE 'QPT%'")
+        conn.execute("DELETE FROM sqlite_stat1")
+        conn.commit()
+
+
+def _login(client, role):
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+        if role == "student":
+            sess['student_id'] = 'S001'
+        elif role == "teacher":
+            sess['teacher_id'] = 'T001'
+        elif role == "admin":
+            sess['admin_id'] = 'superadmin'
+
+
+def _query_plan(test_app, sql):
+    with test_app.app_context():
+        rows = get_db().execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+    return [row["detail"] for row in rows]
+
+
+@pytest.mark.parametrize("role,method,url,data", HOT_ROUTES)
+def test_hot_route_queries_use_indexes(test_app, client, sql_trace, role, method, url, data):
+    _login(client, role)
+    # Reading the body runs the queries of streamed responses (exports)
+    client.open(url, method=method, data=data).get_data()
+
+    selects = [sql for sql in sql_trace if sql.lstrip().upper().startswith(("SELECT", "WITH"))]
+    assert selects, f"{url} ran no queries"
+
+    for sql in selects:
+        plan = _query_plan(test_app, sql)
+        export = url.startswith("/admin/export")
+        allowed = (ORDERED_LIMIT_SCANS if "LIMIT" in sql.upper() else set()) | (EXPORT_SCANS if export else set())
+        scans = [step for step in plan if TABLE_SCAN.match(step) and step not in allowed]
+        assert not scans, f"{url} full-scans: {scans}\n{sql}"
+        sorts = [step for step in plan if "TEMP B-TREE" in step]
+        assert not (export and sorts), f"{url} sorts the whole table first: {sorts}\n{sql}"
+
+
+@pytest.mark.parametrize("role,url,table,index", KEYED_LOOKUPS)
+def test_keyed_lookups_search_expected_index(test_app, client, sql_trace, role, url, table, index):
+    _login(client, role)
+    client.get(url)
+
+    search = re.compile(rf"^SEARCH {table} USING (COVERING )?INDEX {index} \(")
+    plans = [_query_plan(test_app, sql) for sql in sql_trace
+             if sql.lstrip().upper().startswith(("SELECT", "WITH"))]
+    assert any(search.match(step) for plan in plans for step in plan), \
+        f"{url} does not search {table} by {index}: {plans}"
+
+
+@pytest.mark.parametrize("export_type,filters", [
+    ("students", {}),
+    ("students", {"dept": "CSE"}),
+    ("teachers", {}),
+    ("teachers", {"dept": "CSE"}),
+    ("achievements", {}),
+    ("achievements", {"teacher_id": "QPT001"}),
+])
+def test_exports_stream_in_index_order(test_app, export_type, filters):
+    # A temp B-tree sorts the whole result before the first row is sent
+    sql, params = build_query(export_type, filters)
+    with test_app.app_context():
+        plan = [row["detail"] for row in get_db().execute("EXPLAIN QUERY PLAN " + sql, params)]
+    assert not [step for step in plan if "TEMP B-TREE" in step], f"{export_type} {filters} sorts: {plan}"
+
+
+def test_expected_indexes_exist(test_db):
+    names = {row[0] for row in test_db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {
+        "idx_achievements_teacher_created",
+        "idx_achievements_teacher_date",
+        "idx_achievements_student",
+        "idx_student_approved_created",
+        "idx_teacher_approved_created",
+    } <= names
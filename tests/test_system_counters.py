@@ -0,0 +1,90 @@
+# tests/test_system_counters.py
+from utils.stats import check_system_counters
+
+
+def _counters(test_db):
+    row = test_db.execute("""
+        SELECT total_students, total_teachers, total_achievements,
+               pending_student_approvals, pending_teacher_approvals
+        FROM system_counters WHERE id = 1
+    """).fetchone()
+    return dict(zip(("students", "teachers", "achievements", "pending_students", "pending_teachers"), row))
+
+
+def _login_admin(client):
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+        sess['admin_id'] = 'superadmin'
+        sess['admin_name'] = 'Super Administrator'
+
+
+def test_counters_follow_registration_approval_and_rejection(client, test_db):
+    before = _counters(test_db)
+
+    client.post('/student-new', data={
+        'student_name': 'Pending One', 'student_id': 'S950', 'email': 's950@test.com',
+        'password': 'secret1', 'student_dept': 'CSE',
+    })
+    client.post('/teacher-new', data={
+        'teacher_name': 'Pending Two', 'teacher_id': 'T950', 'email': 't950@test.com',
+        'password': 'secret1', 'teacher_dept': 'CSE',
+    })
+    after_signup = _counters(test_db)
+    assert after_signup["students"] == before["students"] + 1
+    assert after_signup["teachers"] == before["teachers"] + 1
+    assert after_signup["pending_students"] == before["pending_students"] + 1
+    assert after_signup["pending_teachers"] == before["pending_teachers"] + 1
+
+    _login_admin(client)
+    client.post('/admin/user/approve', data={'user_id': 'S950', 'user_type': 'student', 'action': 'approve'})
+    client.post('/admin/user/approve', data={'user_id': 'T950', 'user_type': 'teacher', 'action': 'reject'})
+
+    after_review = _counters(test_db)
+    assert after_review["students"] == before["students"] + 1
+    assert after_review["teachers"] == before["teachers"]
+    assert after_review["pending_students"] == before["pending_students"]
+    assert after_review["pending_teachers"] == before["pending_teachers"]
+    assert check_system_counters(test_db) == {}
+
+    test_db.execute("DELETE FROM student WHERE student_id = 'S950'")
+    test_db.commit()
+
+
+def test_admin_dashboard_reads_single_counter_row(client, sql_trace):
+    _login_admin(client)
+    response = client.get('/admin/dashboard')
+
+    assert response.status_code == 200
+    assert any("FROM system_counters" in sql for sql in sql_trace)
+    assert not any("SELECT COUNT(*) FROM" in sql.upper() for sql in sql_trace)
+
+
+def test_check_counters_repairs_drift(test_db):
+    test_db.execute("UPDATE system_counters SET total_achievements = total_achievements + 7")
+
+    drift = check_system_counters(test_db, repair=True)
+
+    assert list(drift) == ["total_achievements"]
+    assert check_system_counters(test_db) == {}
+    test_db.commit()
+
+
+def test_counters_do_not_depend_on_connection_pragmas(test_app, test_db):
+    """Upserts on counted tables stay exact on pooled and bare connections alike."""
+    from utils.db import get_db
+
+    upsert = """
+        INSERT INTO student (student_name, student_id, email, password, is_approved)
+        VALUES ('Upsert Student', 'S960', 's960@test.com', 'x', ?)
+        ON CONFLICT(student_id) DO UPDATE SET is_approved = excluded.is_approved
+    """
+    with test_app.app_context():
+        pooled = get_db()
+        assert pooled.execute("PRAGMA recursive_triggers").fetchone()[0] == 0
+        for conn in (pooled, test_db):
+            for approved in (0, 0, 1):
+                conn.execute(upsert, (approved,))
+            conn.commit()
+            assert check_system_counters(conn) == {}
+            conn.execute("DELETE FROM student WHERE student_id = 'S960'")
+            conn.commit()
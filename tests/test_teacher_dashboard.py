@@ -0,0 +1,109 @@
+# tests/test_teacher_dashboard.py
+import datetime
+
+import pytest
+
+TEACHER_ID = 'T900'
+
+
+@pytest.fixture
+def dashboard_data(test_db):
+    """Teacher T900 with achievements for three students (6, 3 and 1 each)."""
+    today = datetime.date.today().isoformat()
+    students = [('S901', 'Asha', 6), ('S902', 'Bala', 3), ('S903', 'Chitra', 1)]
+    for student_id, name, count in students:
+        test_db.execute(
+            "INSERT INTO student (student_name, student_id, email, password) VALUES (?, ?, ?, ?)",
+            (name, student_id, f"{student_id}@test.com", 'x'),
+        )
+        for n in range(count):
+            test_db.execute("""
+                INSERT INTO achievements (teacher_id, student_id, achievement_type, event_name,
+                                          achievement_date, organizer, position)
+                VALUES (?, ?, 'CODING', ?, ?, 'Club', '1')
+            """, (TEACHER_ID, student_id, f"Event {n}", today if n == 0 else '2020-01-01'))
+    test_db.commit()
+    yield
+    test_db.execute("DELETE FROM achievements WHERE teacher_id = ?", (TEACHER_ID,))
+    test_db.execute("DELETE FROM student WHERE student_id IN ('S901', 'S902', 'S903')")
+    test_db.commit()
+
+
+def _get_dashboard(client):
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+        sess['teacher_id'] = TEACHER_ID
+        sess['teacher_name'] = 'Dashboard Teacher'
+    return client.get('/teacher-dashboard')
+
+
+def _context(test_app, client):
+    from flask import template_rendered
+
+    captured = {}
+
+    def record(sender, template, context, **extra):
+        captured.update(context)
+
+    with template_rendered.connected_to(record, test_app):
+        response = _get_dashboard(client)
+    assert response.status_code == 200
+    return captured
+
+
+def test_dashboard_stats_and_tiers(test_app, client, dashboard_data):
+    context = _context(test_app, client)
+
+    assert context['stats'] == {"total_achievements": 10, "students_managed": 3, "this_week": 3}
+    assert context['top_students'] == [('Asha', 6)]
+    assert context['avg_students'] == [('Bala', 3)]
+    assert context['low_students'] == [('Chitra', 1)]
+    assert len(context['recent_entries']) == 5
+
+
+def test_dashboard_tier_thresholds_are_configurable(test_app, client, dashboard_data, monkeypatch):
+    monkeypatch.setitem(test_app.config, 'TOP_PERFORMER_MIN_ACHIEVEMENTS', 3)
+    monkeypatch.setitem(test_app.config, 'AVERAGE_PERFORMER_MIN_ACHIEVEMENTS', 1)
+
+    context = _context(test_app, client)
+
+    assert context['top_students'] == [('Asha', 6), ('Bala', 3)]
+    assert context['avg_students'] == [('Chitra', 1)]
+    assert context['low_students'] == []
+
+
+def test_dashboard_query_count_is_constant(client, dashboard_data, sql_trace):
+    _get_dashboard(client)
+
+    # stats row, this-week count, recent entries, tier list: never per student
+    selects = [sql for sql in sql_trace if sql.lstrip().upper().startswith("SELECT")]
+    assert len(selects) == 4
+    assert not any("FROM student WHERE" in sql for sql in selects)
+
+
+def test_stats_tables_track_inserts_updates_and_deletes(test_db, dashboard_data):
+    from utils.stats import rebuild_teacher_stats
+
+    def snapshot():
+        totals = test_db.execute(
+            "SELECT total_achievements, students_managed FROM teacher_stats WHERE teacher_id = ?",
+            (TEACHER_ID,)).fetchone()
+        pairs = test_db.execute(
+            "SELECT student_id, total FROM teacher_student_counts WHERE teacher_id = ? ORDER BY student_id",
+            (TEACHER_ID,)).fetchall()
+        return totals, pairs
+
+    assert snapshot() == ((10, 3), [('S901', 6), ('S902', 3), ('S903', 1)])
+
+    # Moving Chitra's only achievement to Bala drops a managed student
+    test_db.execute("UPDATE achievements SET student_id = 'S902' WHERE student_id = 'S903'")
+    assert snapshot() == ((10, 2), [('S901', 6), ('S902', 4)])
+
+    test_db.execute("DELETE FROM achievements WHERE student_id = 'S901'")
+    assert snapshot() == ((4, 1), [('S902', 4)])
+    test_db.commit()
+
+    triggered = snapshot()
+    rebuild_teacher_stats(test_db)
+    test_db.commit()
+    assert snapshot() == triggered
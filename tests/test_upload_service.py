@@ -0,0 +1,223 @@
+# tests/test_upload_service.py
+import hashlib
+import io
+import os
+import sqlite3
+
+from werkzeug.datastructures import FileStorage
+
+import app as app_module
+from services import upload_service
+from services.upload_service import (
+    collect_garbage, commit_upload, discard_upload, import_legacy_uploads, receive_upload, store_blob
+)
+
+
+def _upload(data, name='cert.png'):
+    return FileStorage(stream=io.BytesIO(data), filename=name)
+
+
+def test_receive_hashes_while_copying(tmp_path):
+    data = os.urandom(3 * 1024 * 1024 + 17)
+
+    upload = receive_upload(_upload(data), str(tmp_path), chunk_size=64 * 1024)
+
+    assert upload.sha256 == hashlib.sha256(data).hexdigest()
+    assert upload.size == len(data)
+    assert os.path.dirname(upload.temp_path) == str(tmp_path)
+
+    final = commit_upload(upload, str(tmp_path / 'final.png'))
+    assert open(final, 'rb').read() == data
+    assert not os.path.exists(upload.temp_path)
+
+
+def test_discard_removes_temp_file(tmp_path):
+    upload = receive_upload(_upload(b'certificate'), str(tmp_path))
+
+    discard_upload(upload)
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_duplicate_submission_leaves_no_file_behind(auth_teacher_client, test_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "UPLOAD_FOLDER", str(tmp_path))
+    monkeypatch.setitem(app_module.app.config, "OCR_WORKERS", 0)
+    data = b'same certificate bytes'
+    form = {'student_id': 'S001', 'achievement_type': 'CODING', 'organizer': 'Club', 'position': '1'}
+
+    auth_teacher_client.post('/submit_achievements', data={**form, 'certificate': (io.BytesIO(data), 'a.png')},
+                             content_type='multipart/form-data')
+    response = auth_teacher_client.post('/submit_achievements', data={**form, 'certificate': (io.BytesIO(data), 'b.png')},
+                                        content_type='multipart/form-data')
+
+    digest = hashlib.sha256(data).hexdigest()
+    assert b'Duplicate detected' in response.data
+    assert os.listdir(tmp_path / digest[:2] / digest[2:4]) == [f'{digest}.png']
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.part')] == []
+    test_db.execute("DELETE FROM ocr_jobs WHERE achievement_id IN (SELECT id FROM achievements WHERE certificate_hash = ?)", (digest,))
+    test_db.execute("DELETE FROM achievements WHERE certificate_hash = ?", (digest,))
+    test_db.commit()
+
+
+def test_submission_keeps_the_parsed_upload_without_copying(auth_teacher_client, test_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "UPLOAD_FOLDER", str(tmp_path))
+    monkeypatch.setitem(app_module.app.config, "OCR_WORKERS", 0)
+
+    def no_copy(*args, **kwargs):
+        raise AssertionError("upload was copied a second time")
+    monkeypatch.setattr(upload_service, "receive_stream", no_copy)
+    data = os.urandom(700 * 1024)  # above werkzeug's in-memory threshold
+
+    response = auth_teacher_client.post('/submit_achievements', data={
+        'student_id': 'S001', 'achievement_type': 'CODING', 'organizer': 'Club', 'position': '1',
+        'certificate': (io.BytesIO(data), 'big.png'),
+    }, content_type='multipart/form-data')
+
+    digest = hashlib.sha256(data).hexdigest()
+    assert b'Success' in response.data
+    assert open(tmp_path / digest[:2] / digest[2:4] / f'{digest}.png', 'rb').read() == data
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.part')] == []
+    test_db.execute("DELETE FROM ocr_jobs WHERE achievement_id IN (SELECT id FROM achievements WHERE certificate_hash = ?)", (digest,))
+    test_db.execute("DELETE FROM achievements WHERE certificate_hash = ?", (digest,))
+    test_db.commit()
+
+
+def test_unknown_student_stores_nothing(auth_teacher_client, test_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "UPLOAD_FOLDER", str(tmp_path))
+    data = b'certificate for nobody'
+    response = auth_teacher_client.post('/submit_achievements', data={
+        'student_id': 'S999', 'achievement_type': 'CODING', 'organizer': 'Club', 'position': '1',
+        'certificate': (io.BytesIO(data), 'a.png'),
+    }, content_type='multipart/form-data')
+
+    assert b'Student ID not found' in response.data
+    assert os.listdir(tmp_path) == []
+    assert test_db.execute("SELECT COUNT(*) FROM blobs WHERE sha256 = ?",
+                           (hashlib.sha256(data).hexdigest(),)).fetchone()[0] == 0
+
+
+def test_gc_sweeps_files_without_blob_rows(test_db, tmp_path):
+    upload = receive_upload(_upload(b'rolled back certificate'), str(tmp_path))
+    file_path, path = store_blob(test_db, upload, str(tmp_path), 'png')
+    test_db.rollback()
+    stray = receive_upload(_upload(b'abandoned upload'), str(tmp_path))
+
+    # Too recent: its transaction might still be about to commit
+    collect_garbage(test_db, str(tmp_path))
+    assert os.path.exists(file_path) and os.path.exists(stray.temp_path)
+
+    for old in (file_path, stray.temp_path):
+        os.utime(old, (0, 0))
+    assert collect_garbage(test_db, str(tmp_path)) >= 2
+    assert not os.path.exists(file_path) and not os.path.exists(stray.temp_path)
+
+
+def _blob(test_db, path):
+    return test_db.execute("SELECT sha256, size, mime_type, refcount FROM blobs WHERE path = ?", (path,)).fetchone()
+
+
+def test_identical_bytes_share_one_blob(test_db, tmp_path):
+    first = receive_upload(_upload(b'identical'), str(tmp_path))
+    second = receive_upload(_upload(b'identical'), str(tmp_path))
+
+    file_path, path = store_blob(test_db, first, str(tmp_path), 'PNG')
+    again, same_path = store_blob(test_db, second, str(tmp_path), 'png')
+    test_db.commit()
+
+    digest = hashlib.sha256(b'identical').hexdigest()
+    assert path == same_path == f'uploads/{digest[:2]}/{digest[2:4]}/{digest}.png'
+    assert file_path == again
+    assert not os.path.exists(second.temp_path)
+    assert tuple(_blob(test_db, path)) == (digest, 9, 'image/png', 0)
+    test_db.execute("DELETE FROM blobs WHERE path = ?", (path,))
+    test_db.commit()
+
+
+def test_refcount_follows_achievements_and_gc_removes_orphans(test_db, tmp_path):
+    upload = receive_upload(_upload(b'refcounted certificate'), str(tmp_path))
+    file_path, path = store_blob(test_db, upload, str(tmp_path), 'jpg')
+    test_db.execute("""
+        INSERT INTO achievements (teacher_id, student_id, achievement_type, event_name,
+                                  achievement_date, organizer, position, certificate_path)
+        VALUES ('T001', 'S001', 'CODING', 'GC', '2025-01-01', 'Club', '1', ?)
+    """, (path,))
+    test_db.commit()
+    assert _blob(test_db, path)[3] == 1
+
+    collect_garbage(test_db, str(tmp_path))
+    assert os.path.exists(file_path)
+    test_db.execute("DELETE FROM achievements WHERE certificate_path = ?", (path,))
+    test_db.commit()
+    assert _blob(test_db, path)[3] == 0
+
+    assert collect_garbage(test_db, str(tmp_path)) >= 1
+    assert _blob(test_db, path) is None
+    assert not os.path.exists(file_path)
+
+
+def test_gc_cannot_remove_a_blob_an_upload_just_matched(test_app, test_db, tmp_path, monkeypatch):
+    data = b'certificate uploaded twice'
+    file_path, path = store_blob(test_db, receive_upload(_upload(data), str(tmp_path)), str(tmp_path), 'png')
+    test_db.commit()
+    assert _blob(test_db, path)[3] == 0
+
+    # Run gc-uploads right after the second upload finds the stored file
+    gc_errors = []
+    discard = upload_service.discard_upload
+
+    def discard_then_collect(upload):
+        discard(upload)
+        gc = sqlite3.connect(test_app.config['DATABASE'], timeout=0)
+        try:
+            collect_garbage(gc, str(tmp_path))
+        except sqlite3.OperationalError as e:
+            gc_errors.append(str(e))
+        finally:
+            gc.close()
+    monkeypatch.setattr(upload_service, 'discard_upload', discard_then_collect)
+
+    uploader = sqlite3.connect(test_app.config['DATABASE'])
+    try:
+        _, same_path = store_blob(uploader, receive_upload(_upload(data), str(tmp_path)), str(tmp_path), 'png')
+        uploader.execute("""
+            INSERT INTO achievements (teacher_id, student_id, achievement_type, event_name,
+                                      achievement_date, organizer, position, certificate_path)
+            VALUES ('T001', 'S001', 'CODING', 'GC race', '2025-01-01', 'Club', '1', ?)
+        """, (same_path,))
+        uploader.commit()
+    finally:
+        uploader.close()
+
+    assert gc_errors == ['database is locked']
+    assert os.path.exists(file_path)
+    assert _blob(test_db, path)[3] == 1
+    test_db.execute("DELETE FROM achievements WHERE certificate_path = ?", (path,))
+    test_db.execute("DELETE FROM blobs WHERE path = ?", (path,))
+    test_db.commit()
+
+
+def test_import_legacy_uploads_collapses_duplicates(test_db, tmp_path):
+    data = b'Hit the Bug certificate'
+    for name in ('20250412211251_Hit_the_Bug.jpeg', '20250413092129_Hit_the_Bug.jpeg'):
+        (tmp_path / name).write_bytes(data)
+        test_db.execute("""
+            INSERT INTO achievements (teacher_id, student_id, achievement_type, event_name,
+                                      achievement_date, organizer, position, certificate_path)
+            VALUES ('T001', 'S001', 'CODING', 'Legacy', '2025-04-12', 'Club', '1', ?)
+        """, (f'uploads/{name}',))
+    test_db.commit()
+
+    report = import_legacy_uploads(test_db, str(tmp_path))
+
+    digest = hashlib.sha256(data).hexdigest()
+    path = f'uploads/{digest[:2]}/{digest[2:4]}/{digest}.jpeg'
+    assert report == {'moved': 1, 'duplicates': 1, 'bytes_reclaimed': len(data)}
+    assert sorted(os.listdir(tmp_path)) == [digest[:2]]
+    assert _blob(test_db, path)[3] == 2
+    rows = test_db.execute(
+        "SELECT certificate_path, certificate_hash FROM achievements WHERE event_name = 'Legacy' ORDER BY id").fetchall()
+    assert [tuple(row) for row in rows] == [(path, digest), (path, None)]
+
+    test_db.execute("DELETE FROM achievements WHERE event_name = 'Legacy'")
+    test_db.execute("DELETE FROM blobs WHERE path = ?", (path,))
+    test_db.commit()
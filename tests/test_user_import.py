@@ -0,0 +1,98 @@
+# tests/test_user_import.py
+import io
+
+import pytest
+from werkzeug.security import check_password_hash
+
+from app import app
+from services import user_import
+from utils import db
+
+
+@pytest.fixture
+def admin_client(client):
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+        sess['admin_id'] = 'superadmin'
+    return client
+
+
+@pytest.fixture
+def cleanup(test_db):
+    yield
+    test_db.execute("DELETE FROM student WHERE student_id LIKE 'BULK%'")
+    test_db.execute("DELETE FROM teacher WHERE teacher_id LIKE 'BULK%'")
+    test_db.commit()
+
+
+def upload(client, csv_text, **form):
+    return client.post('/admin/users/import', data={
+        'file': (io.BytesIO(csv_text.encode()), 'cohort.csv'), **form,
+    }, content_type='multipart/form-data')
+
+
+def test_student_import_reports_conflicts(admin_client, test_db, cleanup):
+    response = upload(admin_client,
+                      "student_id,student_name,email,password,student_dept\n"
+                      "BULK1,Asha,asha@example.com,pw1,CSE\n"
+                      "S001,Taken Id,new@example.com,pw2,CSE\n"
+                      "BULK2,Taken Email,student@test.com,pw3,CSE\n"
+                      "BULK1,Repeat Id,other@example.com,pw4,CSE\n"
+                      "BULK3,No Password,bulk3@example.com,,CSE\n"
+                      "BULK4,Ravi,ravi@example.com,pw5,ECE\n")
+
+    assert response.status_code == 207
+    results = response.get_json()["results"]
+    assert [(r["id"], r["status"], r.get("error")) for r in results] == [
+        ("BULK1", "created", None),
+        ("S001", "error", "ID S001 already registered"),
+        ("BULK2", "error", "Email student@test.com already registered"),
+        ("BULK1", "error", "Duplicate ID: same as row 1"),
+        ("BULK3", "error", "Missing password"),
+        ("BULK4", "created", None),
+    ]
+
+    rows = test_db.execute("SELECT student_id, student_dept, password, is_approved FROM student "
+                           "WHERE student_id LIKE 'BULK%' ORDER BY student_id").fetchall()
+    assert [(r[0], r[1], r[3]) for r in rows] == [("BULK1", "CSE", 0), ("BULK4", "ECE", 0)]
+    assert check_password_hash(rows[0][2], "pw1")
+    assert check_password_hash(rows[1][2], "pw5")
+
+
+def test_teacher_import_preapproved(admin_client, test_db, cleanup):
+    response = upload(admin_client,
+                      "teacher_id,teacher_name,email,password\n"
+                      "BULKT1,Prof One,one@example.com,secret\n",
+                      user_type="teacher", approve="1")
+
+    assert response.status_code == 201
+    assert test_db.execute("SELECT is_approved FROM teacher WHERE teacher_id = 'BULKT1'").fetchone() == (1,)
+
+
+def test_hash_passwords_in_process_pool():
+    hashes = user_import.hash_passwords(["a", "b", "c"], workers=2)
+    assert [check_password_hash(h, p) for h, p in zip(hashes, "abc")] == [True, True, True]
+
+
+def test_conflicting_batch_falls_back_to_rows(test_db, cleanup):
+    connection = db.connect(app.config["DB_PATH"])
+    try:
+        sql = "INSERT INTO teacher (teacher_id, teacher_name, email, password) VALUES (?, ?, ?, ?)"
+        batch = [({}, ("BULKT2", "A", "a2@example.com", "x")),
+                 ({}, ("BULKT2", "B", "b2@example.com", "x")),
+                 ({}, ("BULKT3", "C", "c2@example.com", "x"))]
+        user_import._insert_batch(connection, sql, batch)
+    finally:
+        connection.close()
+
+    assert [result["status"] for result, _ in batch] == ["created", "error", "created"]
+    assert test_db.execute("SELECT COUNT(*) FROM teacher WHERE teacher_id IN ('BULKT2', 'BULKT3')").fetchone() == (2,)
+
+
+def test_rejects_bad_requests(admin_client):
+    assert admin_client.post('/admin/users/import', data={}).status_code == 400
+    assert upload(admin_client, "id\n1\n", user_type="admin").status_code == 400
+
+
+def test_requires_admin(auth_teacher_client):
+    assert upload(auth_teacher_client, "id\n1\n").status_code == 302
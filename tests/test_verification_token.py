@@ -0,0 +1,122 @@
+# tests/test_verification_token.py
+import pytest
+
+from app import app, verification_token_url
+from utils import verification_token
+from utils.db import get_db
+
+
+@pytest.fixture
+def achievement_id(test_db):
+    cursor = test_db.execute("""
+        INSERT INTO achievements (teacher_id, student_id, achievement_type, event_name,
+                                  achievement_date, organizer, position, certificate_hash)
+        VALUES ('T001', 'S001', 'CODING', 'Token Test', '2025-01-01', 'Club', '1', ?)
+    """, ("c" * 64,))
+    test_db.commit()
+    yield cursor.lastrowid
+    test_db.execute("DELETE FROM achievements WHERE id = ?", (cursor.lastrowid,))
+    test_db.commit()
+
+
+@pytest.fixture(autouse=True)
+def fresh_revocations(monkeypatch):
+    monkeypatch.setitem(app.config, "VERIFY_REVOCATION_TTL", 0)
+
+
+def token_path(achievement_id):
+    with app.test_request_context():
+        url = verification_token_url(get_db(), achievement_id)
+    return url[len('http://localhost'):]
+
+
+def test_token_round_trip_and_tampering():
+    token = verification_token.make_token("secret", {"id": 7, "student_name": "Asha", "certificate_hash": "ab" * 32})
+    claims = verification_token.read_token("secret", token)
+    assert (claims["id"], claims["revision"], claims["student_name"]) == (7, 1, "Asha")
+    assert claims["certificate_hash"] == "ab" * 8
+    assert verification_token.make_token("secret", {"id": 7, "student_name": "Asha",
+                                                    "certificate_hash": "ab" * 32}) == token
+
+    with pytest.raises(ValueError):
+        verification_token.read_token("other secret", token)
+    with pytest.raises(ValueError):
+        verification_token.read_token("secret", "x" + token)
+
+
+def test_page_renders_from_token_without_record_lookup(client, achievement_id, sql_trace):
+    path = token_path(achievement_id)
+    sql_trace.clear()
+
+    response = client.get(path)
+
+    assert response.status_code == 200
+    assert b'Token Test' in response.data
+    assert response.cache_control.public
+    assert not any("FROM achievements" in sql for sql in sql_trace)
+    assert client.get(path, headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+
+def test_edits_make_old_tokens_stale(client, achievement_id, test_db):
+    old = token_path(achievement_id)
+
+    # Columns that are not signed leave the token alone
+    test_db.execute("UPDATE achievements SET achievement_description = 'x' WHERE id = ?", (achievement_id,))
+    test_db.commit()
+    assert token_path(achievement_id) == old
+
+    test_db.execute("UPDATE achievements SET position = '2' WHERE id = ?", (achievement_id,))
+    test_db.commit()
+    response = client.get(old)
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith(f'/verify-achievement/{achievement_id}')
+
+    new = token_path(achievement_id)
+    assert new != old
+    assert client.get(new).status_code == 200
+
+
+def test_deleted_achievement_revokes_tokens(client, achievement_id, test_db):
+    path = token_path(achievement_id)
+    test_db.execute("DELETE FROM achievements WHERE id = ?", (achievement_id,))
+    test_db.commit()
+
+    assert client.get(path).status_code == 404
+    assert test_db.execute("SELECT revision FROM token_revocations WHERE achievement_id = ?",
+                           (achievement_id,)).fetchone() == (None,)
+
+
+def test_garbage_token(client):
+    assert client.get('/verify/not-a-token').status_code == 404
+
+
+def test_filling_blank_fields_keeps_tokens(client, achievement_id, test_db):
+    test_db.execute("UPDATE achievements SET organizer = '' WHERE id = ?", (achievement_id,))
+    test_db.execute("DELETE FROM token_revocations WHERE achievement_id = ?", (achievement_id,))
+    test_db.commit()
+    path = token_path(achievement_id)
+
+    # What the OCR worker and certificate_hash backfills do
+    test_db.execute("UPDATE achievements SET organizer = 'Club' WHERE id = ?", (achievement_id,))
+    test_db.commit()
+
+    assert test_db.execute("SELECT COUNT(*) FROM token_revocations WHERE achievement_id = ?",
+                           (achievement_id,)).fetchone() == (0,)
+    assert client.get(path).status_code == 200
+
+
+def test_revocation_set_fetches_only_new_rows(test_db, achievement_id, sql_trace):
+    revocations = verification_token.RevocationSet()
+    claims = {"id": achievement_id, "revision": 1}
+    with app.app_context():
+        assert revocations.status(get_db(), claims, 0) == verification_token.VALID
+        high_water = revocations._seq
+
+        test_db.execute("UPDATE achievements SET position = '2' WHERE id = ?", (achievement_id,))
+        test_db.commit()
+        sql_trace.clear()
+        assert revocations.status(get_db(), claims, 0) == verification_token.STALE
+
+    assert revocations._seq > high_water
+    assert sql_trace == [f"SELECT achievement_id, revision, seq FROM token_revocations WHERE seq > {high_water} "
+                         "ORDER BY seq"]
@@ -0,0 +1,66 @@
+# tests/test_verify_cache.py
+import pytest
+
+
+@pytest.fixture
+def achievement_id(test_db):
+    cursor = test_db.execute("""
+        INSERT INTO achievements (teacher_id, student_id, achievement_type, event_name,
+                                  achievement_date, organizer, position)
+        VALUES ('T001', 'S001', 'CODING', 'Verify Cache Test', '2025-01-01', 'Club', '1')
+    """)
+    test_db.commit()
+    yield cursor.lastrowid
+    test_db.execute("DELETE FROM achievements WHERE id = ?", (cursor.lastrowid,))
+    test_db.commit()
+
+
+def test_page_is_cacheable_and_deterministic(client, achievement_id):
+    first = client.get(f'/verify-achievement/{achievement_id}')
+    second = client.get(f'/verify-achievement/{achievement_id}')
+
+    assert first.status_code == 200
+    assert first.headers['ETag'] and first.headers['ETag'] == second.headers['ETag']
+    assert first.data == second.data
+    assert first.last_modified is not None
+    assert first.cache_control.public
+    assert first.cache_control.s_maxage is not None
+
+
+def test_revalidation_skips_query_and_render(client, achievement_id, sql_trace):
+    etag = client.get(f'/verify-achievement/{achievement_id}').headers['ETag']
+    sql_trace.clear()
+
+    response = client.get(f'/verify-achievement/{achievement_id}', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+    assert not any("SELECT a.*" in sql for sql in sql_trace)
+
+
+def test_etag_changes_with_achievement_or_student(client, achievement_id, test_db):
+    etag = client.get(f'/verify-achievement/{achievement_id}').headers['ETag']
+
+    test_db.execute("UPDATE achievements SET position = '2' WHERE id = ?", (achievement_id,))
+    test_db.commit()
+    assert test_db.execute("SELECT row_version FROM achievements WHERE id = ?",
+                           (achievement_id,)).fetchone() == (2,)
+    response = client.get(f'/verify-achievement/{achievement_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    name = test_db.execute("SELECT student_name FROM student WHERE student_id = 'S001'").fetchone()[0]
+    test_db.execute("UPDATE student SET student_name = 'Renamed' WHERE student_id = 'S001'")
+    test_db.commit()
+    try:
+        response = client.get(f'/verify-achievement/{achievement_id}', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert b'Renamed' in response.data
+    finally:
+        test_db.execute("UPDATE student SET student_name = ? WHERE student_id = 'S001'", (name,))
+        test_db.commit()
+
+
+def test_unknown_achievement(client):
+    assert client.get('/verify-achievement/999999').status_code == 404
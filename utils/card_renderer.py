@@ -0,0 +1,253 @@
+"""
+Server-side rendering of the achievement export card.
+
+Draws the same card as templates/achievement_export.html with Pillow, so a
+download no longer depends on html2canvas/jsPDF running on the student's
+phone and every device gets an identical file. The card is 600x800 points
+drawn at 2x (1200x1600 px); the PDF embeds that image at 144 DPI, which
+gives the 600pt-wide page the browser export produced.
+
+Rendered files are cached on disk under <cache_dir>/<achievement id>/,
+named by a content version: a hash of every value drawn on the card plus
+CARD_VERSION. Editing the achievement (or the layout) changes the version,
+so a stale card is never served, and older files for the id are removed
+when a new one is written. Cards are handed out as open files, so removing
+an old version never cuts off a download that is still being sent.
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+
+# Bump when the layout changes so cached cards are re-rendered
+CARD_VERSION = 1
+
+SCALE = 2
+WIDTH, HEIGHT = 600 * SCALE, 800 * SCALE
+PDF_RESOLUTION = 72 * SCALE
+
+FORMATS = {
+    "png": "image/png",
+    "pdf": "application/pdf",
+}
+
+# Light palette of static/css/achievement-card.css, which prints well
+COLORS = {
+    "background": "#ffffff",
+    "text": "#1a1a1a",
+    "accent": "#d40000",
+    "accent_light": "#fbe5e5",
+    "label": "#666666",
+    "footer": "#999999",
+    "border": "#e6e6e6",
+}
+
+FONT_FILES = {
+    "regular": ("DejaVuSans.ttf", "LiberationSans-Regular.ttf", "Arial.ttf"),
+    "bold": ("DejaVuSans-Bold.ttf", "LiberationSans-Bold.ttf", "Arial Bold.ttf"),
+    "serif": ("DejaVuSerif-Bold.ttf", "LiberationSerif-Bold.ttf", "Georgia Bold.ttf"),
+}
+
+CARD_FIELDS = ("id", "student_name", "student_id", "achievement_type", "event_name",
+               "position", "achievement_date", "organizer", "achievement_description")
+
+
+@lru_cache(maxsize=None)
+def _font(style, size):
+    for name in FONT_FILES[style]:
+        try:
+            return ImageFont.truetype(name, size * SCALE)
+        except OSError:
+            continue
+    return ImageFont.load_default(size * SCALE)
+
+
+def card_values(achievement, verification_url, issued_date):
+    """Everything drawn on the card, as strings."""
+    values = {field: "" if achievement.get(field) is None else str(achievement[field]) for field in CARD_FIELDS}
+    values["verification_url"] = verification_url
+    values["issued_date"] = issued_date
+    return values
+
+
+def content_version(values):
+    """Short hash of the card's contents and layout version."""
+    payload = json.dumps([CARD_VERSION, values], sort_keys=True).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:20]
+
+
+def download_name(values, fmt):
+    """<student>_<event>_<id>.<fmt>, with the characters the browser export replaced"""
+    stem = re.sub(r"[^a-zA-Z0-9_-]", "_", f"{values['student_name']}_{values['event_name']}_{values['id']}")
+    return f"{stem}.{fmt}"
+
+
+def _wrap(draw, text, font, width):
+    lines, line = [], ""
+    for word in text.split():
+        candidate = f"{line} {word}".strip()
+        if line and draw.textlength(candidate, font=font) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+    return lines
+
+
+def _centered(draw, y, text, font, fill):
+    draw.text((WIDTH / 2, y), text, font=font, fill=fill, anchor="mt")
+    return y + font.size * 1.35
+
+
+def render_card(values, qr_png):
+    """
+    Lay out the card.
+
+    Args:
+        values (dict): From card_values()
+        qr_png (bytes): QR code PNG linking to the verification page
+
+    Returns:
+        PIL.Image.Image: RGB image of WIDTH x HEIGHT
+    """
+    s = SCALE
+    image = Image.new("RGB", (WIDTH, HEIGHT), COLORS["background"])
+    draw = ImageDraw.Draw(image)
+    margin = 40 * s
+    inner = WIDTH - 2 * margin
+
+    # Header band
+    draw.rectangle((0, 0, WIDTH, 70 * s), fill=COLORS["accent"])
+    draw.text((WIDTH / 2, 35 * s), "Achievement Management System", font=_font("bold", 20),
+              fill="#ffffff", anchor="mm")
+
+    y = 100 * s
+    y = _centered(draw, y, "Achievement of Excellence", _font("serif", 30), COLORS["accent"])
+    y += 10 * s
+    y = _centered(draw, y, "This certifies that", _font("regular", 14), COLORS["label"])
+    y += 6 * s
+    for line in _wrap(draw, values["student_name"], _font("bold", 28), inner)[:2]:
+        y = _centered(draw, y, line, _font("bold", 28), COLORS["text"])
+    y = _centered(draw, y, f"Student ID: {values['student_id']}", _font("regular", 13), COLORS["label"])
+    y += 8 * s
+    y = _centered(draw, y, "has successfully achieved:", _font("regular", 14), COLORS["label"])
+    y += 10 * s
+
+    # Achievement type badge
+    badge_font = _font("bold", 15)
+    badge_width = draw.textlength(values["achievement_type"], font=badge_font) + 40 * s
+    draw.rounded_rectangle(((WIDTH - badge_width) / 2, y, (WIDTH + badge_width) / 2, y + 34 * s),
+                           radius=17 * s, fill=COLORS["accent_light"])
+    draw.text((WIDTH / 2, y + 17 * s), values["achievement_type"], font=badge_font,
+              fill=COLORS["accent"], anchor="mm")
+    y += 54 * s
+
+    # Detail rows: label left, value wrapped on the right
+    label_font, value_font = _font("bold", 14), _font("regular", 14)
+    label_width = 130 * s
+    for label, field in (("Event:", "event_name"), ("Position:", "position"),
+                         ("Date:", "achievement_date"), ("Organization:", "organizer")):
+        lines = _wrap(draw, values[field], value_font, inner - label_width) or [""]
+        draw.text((margin, y), label, font=label_font, fill=COLORS["label"])
+        for line in lines[:2]:
+            draw.text((margin + label_width, y), line, font=value_font, fill=COLORS["text"])
+            y += 22 * s
+        y += 6 * s
+        draw.line((margin, y - 3 * s, WIDTH - margin, y - 3 * s), fill=COLORS["border"], width=s)
+
+    if values["achievement_description"]:
+        y += 6 * s
+        for line in _wrap(draw, values["achievement_description"], _font("regular", 12), inner)[:4]:
+            draw.text((margin, y), line, font=_font("regular", 12), fill=COLORS["label"])
+            y += 18 * s
+
+    # Verification section, pinned above the footer
+    qr_size = 130 * s
+    qr_top = HEIGHT - 110 * s - qr_size
+    qr = Image.open(io.BytesIO(qr_png)).convert("RGB").resize((qr_size, qr_size), Image.Resampling.NEAREST)
+    image.paste(qr, (margin, qr_top))
+    draw.text((margin + qr_size / 2, qr_top + qr_size + 4 * s), "Scan to verify", font=_font("regular", 11),
+              fill=COLORS["label"], anchor="mt")
+
+    text_left = margin + qr_size + 24 * s
+    draw.text((text_left, qr_top + 20 * s), "Verify Achievement", font=_font("bold", 16), fill=COLORS["text"])
+    url_y = qr_top + 50 * s
+    for line in _wrap(draw, values["verification_url"].replace("/", "/ "), _font("regular", 11),
+                      WIDTH - margin - text_left)[:3]:
+        draw.text((text_left, url_y), line.replace("/ ", "/"), font=_font("regular", 11), fill=COLORS["accent"])
+        url_y += 16 * s
+    draw.text((text_left, url_y + 6 * s), f"Record ID: #{values['id']}", font=_font("regular", 12),
+              fill=COLORS["label"])
+
+    # Footer
+    footer_y = HEIGHT - 60 * s
+    draw.line((margin, footer_y, WIDTH - margin, footer_y), fill=COLORS["border"], width=s)
+    _centered(draw, footer_y + 12 * s, "Issued by Achievement Management System", _font("regular", 11),
+              COLORS["footer"])
+    _centered(draw, footer_y + 30 * s, f"Issued on {values['issued_date']}", _font("regular", 11),
+              COLORS["footer"])
+    return image
+
+
+def encode_card(image, fmt):
+    """PNG or single-page PDF bytes of a rendered card."""
+    buffer = io.BytesIO()
+    if fmt == "png":
+        image.save(buffer, format="PNG", optimize=True)
+    elif fmt == "pdf":
+        image.save(buffer, format="PDF", resolution=PDF_RESOLUTION)
+    else:
+        raise ValueError(f"Unsupported card format: {fmt}")
+    return buffer.getvalue()
+
+
+def open_cached_card(cache_dir, values, fmt, load_qr):
+    """
+    Open the rendered card file, rendering and caching it on a miss.
+
+    The caller gets an open handle rather than a path: another request may
+    replace the file with a newer version at any moment.
+
+    Args:
+        load_qr (callable): Returns the QR code PNG; only called on a miss
+
+    Returns:
+        tuple: (binary file object, content version usable as a strong ETag)
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported card format: {fmt}")
+    version = content_version(values)
+    directory = os.path.join(cache_dir, values["id"])
+    path = os.path.join(directory, f"{version}.{fmt}")
+    try:
+        return open(path, "rb"), version
+    except FileNotFoundError:
+        pass
+
+    data = encode_card(render_card(values, load_qr()), fmt)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+    card = open(path, "rb")
+
+    # Cards for earlier contents of this achievement will never be served
+    # again. A download still reading one keeps its open handle; where the
+    # OS refuses to delete an open file, the next new version retries.
+    for name in os.listdir(directory):
+        if name.endswith(f".{fmt}") and name != os.path.basename(path):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+    return card, version
@@ -1,21 +1,109 @@
+import logging
 import pytesseract
 from PIL import Image
 import os
+from functools import lru_cache
+from utils.certificate_parser import parse_certificate_text, required_fields_found
+from utils.image_preprocess import PREPROCESS_VERSION, TARGET_DPI, preprocess_for_ocr
 
-def extract_text_from_certificate(file_path):
+# Optional PDF support: pypdf reads the embedded text layer, pypdfium2
+# rasterizes scanned pages for OCR. Either may be missing.
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+# Certificates are one or two pages; don't wander through long documents
+MAX_PDF_PAGES = 5
+# A page with fewer characters than this is treated as having no text layer
+MIN_TEXT_LAYER_CHARS = 20
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def ocr_engine_version():
     """
-    Extract raw text from a certificate file.
-    Supports: PNG, JPG, JPEG.
+    Identify the OCR engine and preprocessing pipeline so cached results
+    are invalidated when either changes.
+    Returns None when Tesseract isn't available.
     """
     try:
-        ext = os.path.splitext(file_path)[1].lower()
+        return f"tesseract {pytesseract.get_tesseract_version()}+pre{PREPROCESS_VERSION}"
+    except Exception:
+        return None
+
+def _ocr_image(image, preprocess=True):
+    if preprocess:
+        image = preprocess_for_ocr(image)
+    return pytesseract.image_to_string(image)
+
+
+def _ocr_pdf_page(document, index, preprocess=True):
+    """Rasterize one PDF page at the OCR target DPI and OCR it."""
+    image = document[index].render(scale=TARGET_DPI / 72).to_pil()
+    return _ocr_image(image, preprocess)
+
+
+def _fields_complete(text):
+    return required_fields_found(parse_certificate_text(text))
+
+
+def extract_text_from_pdf(file_path, preprocess=True, max_pages=MAX_PDF_PAGES):
+    """
+    Extract text from a PDF certificate page by page.
+
+    Each page's embedded text layer is used when it has one; only pages
+    without one are rasterized and OCR'd. Stops as soon as the text so far
+    yields every field the parser looks for, so a typical generated
+    certificate costs one page of text extraction and no OCR at all.
+    """
+    if PdfReader is None:
+        raise RuntimeError("PDF support needs pypdf: pip install pypdf")
+
+    reader = PdfReader(file_path)
+    document = None  # opened for rasterizing only if some page needs OCR
+    pages = []
+    try:
+        for index, page in enumerate(reader.pages):
+            if index >= max_pages:
+                break
+            text = (page.extract_text() or "").strip()
+            if len(text) < MIN_TEXT_LAYER_CHARS and pdfium is not None:
+                if document is None:
+                    document = pdfium.PdfDocument(file_path)
+                text = _ocr_pdf_page(document, index, preprocess).strip() or text
+            pages.append(text)
+            if _fields_complete("\n".join(pages)):
+                break
+    finally:
+        if document is not None:
+            document.close()
+    return "\n".join(pages)
+
+
+def extract_text_from_certificate(file_path, preprocess=True):
+    """
+    Extract raw text from a certificate file.
+    Supports: PNG, JPG, JPEG and PDF.
+    Images are downscaled, deskewed and binarized first unless preprocess=False.
+
+    OCR and file errors propagate: an empty string means the certificate
+    has no text, never that reading it failed, so callers can cache it.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+
+    if ext in [".png", ".jpg", ".jpeg"]:
+        with Image.open(file_path) as image:
+            return _ocr_image(image, preprocess).strip()
 
-        if ext in [".png", ".jpg", ".jpeg"]:
-            image = Image.open(file_path)
-            text = pytesseract.image_to_string(image)
-            return text.strip()
+    if ext == ".pdf":
+        return extract_text_from_pdf(file_path, preprocess).strip()
 
-        return ""
-    except Exception as e:
-        print(f"OCR Error: {e}")
-        return ""
+    logger.warning("No OCR for file type %s: %s", ext, file_path)
+    return ""
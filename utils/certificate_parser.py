@@ -1,63 +1,118 @@
+"""
+Rule-based extraction of structured fields from certificate text.
+
+Field rules live in certificate_rules.json: for each field, an ordered list
+of patterns with one (?P<value>...) group, plus shared macros such as
+{DATE} or {NAME}. All rules are compiled into a single expression of
+zero-width lookaheads, one named group per rule, so one finditer() pass
+over the normalized text reports every rule that matches at every
+position. Per field, the rule listed first wins; among its matches, the
+earliest in the text.
+
+Rules of different fields should not start on the same word: at any one
+position only the first matching rule (in file order) is reported.
+"""
+
+import json
+import os
 import re
-from datetime import datetime
+import unicodedata
+from functools import lru_cache
+
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "certificate_rules.json")
+
+_MACRO = re.compile(r"\{([A-Z_]+)\}")
+_QUOTES = str.maketrans({"‘": "'", "’": "'", "“": '"', "”": '"',
+                         "–": "-", "—": "-", " ": " "})
+_SPACES = re.compile(r"[ \t\f\v]+")
+
+
+def normalize_text(text):
+    """NFKC, plain quotes and dashes, single spaces, trimmed non-empty lines."""
+    text = unicodedata.normalize("NFKC", text).translate(_QUOTES)
+    lines = (_SPACES.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _expand(pattern, macros):
+    for _ in range(10):
+        expanded = _MACRO.sub(lambda m: macros.get(m.group(1), m.group(0)), pattern)
+        if expanded == pattern:
+            return expanded
+        pattern = expanded
+    raise ValueError(f"Macro expansion does not terminate: {pattern}")
+
+
+class FieldExtractor:
+    """Compiled form of a rules file."""
 
-def parse_certificate_text(text):
+    def __init__(self, rules):
+        macros = rules.get("macros", {})
+        self.version = rules.get("version")
+        self.fields = list(rules["fields"])
+        self.required = list(rules.get("required", self.fields))
+
+        # group name -> (field, priority within field)
+        self._rules = {}
+        alternatives = []
+        for field, patterns in rules["fields"].items():
+            for priority, pattern in enumerate(patterns):
+                expanded = _expand(pattern, macros)
+                if expanded.count("(?P<value>") != 1:
+                    raise ValueError(f"Rule for {field} needs exactly one (?P<value>...) group: {pattern}")
+                name = f"r{len(self._rules)}"
+                self._rules[name] = (field, priority)
+                re.compile(expanded, re.IGNORECASE | re.MULTILINE)  # report a bad rule on its own
+                # Outer group closes last, so match.lastgroup names the rule
+                alternatives.append(f"(?=(?P<{name}>{expanded.replace('(?P<value>', f'(?P<{name}_v>')}))")
+
+        # Every rule starts at a word boundary or line start; testing that
+        # first lets the scan skip mid-word positions without trying any rule
+        self._pattern = re.compile(r"(?:\b|^)(?:" + "|".join(alternatives) + ")", re.IGNORECASE | re.MULTILINE)
+
+    def extract(self, text):
+        """
+        Returns:
+            dict: Every configured field, None where nothing matched
+        """
+        best = {}
+        for match in self._pattern.finditer(normalize_text(text)):
+            name = match.lastgroup
+            field, priority = self._rules[name]
+            if field in best and best[field][0] <= priority:
+                continue
+            value = match.group(f"{name}_v").strip(" .-")
+            if value:
+                best[field] = (priority, value)
+
+        result = dict.fromkeys(self.fields)
+        result.update({field: value for field, (_, value) in best.items()})
+        return result
+
+
+def load_rules(path=DEFAULT_RULES_PATH):
+    with open(path, encoding="utf-8") as f:
+        return FieldExtractor(json.load(f))
+
+
+@lru_cache(maxsize=None)
+def default_extractor():
+    return load_rules()
+
+
+def parse_certificate_text(text, extractor=None):
     """
-    Extract structured data (name, event, date)
-    from raw OCR text using rule-based regex.
+    Extract structured data (student_name, event_name, achievement_date,
+    organizer, position, institution) from raw OCR text.
     """
+    extractor = extractor or default_extractor()
+    if not text:
+        return dict.fromkeys(extractor.fields)
+    return extractor.extract(text)
 
-    parsed_data = {
-        "student_name": None,
-        "event_name": None,
-        "achievement_date": None
-    }
 
-    if not text:
-        return parsed_data
-
-    # -------------------------
-    # Try extracting name
-    # -------------------------
-    name_patterns = [
-        r"Presented to\s+(.*)",
-        r"Awarded to\s+(.*)",
-        r"This certifies that\s+(.*)"
-    ]
-
-    for pattern in name_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            parsed_data["student_name"] = match.group(1).strip()
-            break
-
-    # -------------------------
-    # Try extracting date
-    # -------------------------
-    date_patterns = [
-        r"\b(\d{1,2}\s+\w+\s+\d{4})\b",
-        r"\b(\d{2}/\d{2}/\d{4})\b"
-    ]
-
-    for pattern in date_patterns:
-        match = re.search(pattern, text)
-        if match:
-            parsed_data["achievement_date"] = match.group(1)
-            break
-
-    # -------------------------
-    # Try extracting event name
-    # -------------------------
-    event_patterns = [
-        r"for participating in\s+(.*)",
-        r"in recognition of\s+(.*)",
-        r"for\s+(.*)\s+held at"
-    ]
-
-    for pattern in event_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            parsed_data["event_name"] = match.group(1).strip()
-            break
-
-    return parsed_data
+def required_fields_found(parsed, extractor=None):
+    """True once every field the rules mark as required has a value."""
+    extractor = extractor or default_extractor()
+    return all(parsed.get(field) for field in extractor.required)
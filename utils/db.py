@@ -0,0 +1,127 @@
+"""
+SQLite connection management for the Flask app.
+
+Connections are opened once per worker thread and reused across requests.
+A request borrows its thread's connection through flask.g and hands it back
+on teardown, so routes never pay the connect/PRAGMA cost themselves.
+"""
+
+import sqlite3
+import threading
+
+from flask import current_app, g
+
+
+# Defaults used when the app config does not override them
+DEFAULT_SETTINGS = {
+    "SQLITE_BUSY_TIMEOUT_MS": 5000,
+    "SQLITE_CACHE_SIZE_KB": 16384,
+    "SQLITE_MMAP_SIZE": 128 * 1024 * 1024,
+    "SQLITE_CACHED_STATEMENTS": 256,
+}
+
+_pool = threading.local()
+
+
+def connect(db_path, busy_timeout_ms=None, cache_size_kb=None,
+            mmap_size=None, cached_statements=None):
+    """
+    Open a new tuned connection to db_path.
+
+    Used by the per-thread pool, and directly by startup code, CLI commands
+    and background workers that run outside a request.
+
+    Returns:
+        sqlite3.Connection: Connection with sqlite3.Row as row factory
+    """
+    busy_timeout_ms = busy_timeout_ms or DEFAULT_SETTINGS["SQLITE_BUSY_TIMEOUT_MS"]
+    cache_size_kb = cache_size_kb or DEFAULT_SETTINGS["SQLITE_CACHE_SIZE_KB"]
+    if mmap_size is None:
+        mmap_size = DEFAULT_SETTINGS["SQLITE_MMAP_SIZE"]
+    cached_statements = cached_statements or DEFAULT_SETTINGS["SQLITE_CACHED_STATEMENTS"]
+
+    connection = sqlite3.connect(
+        db_path,
+        timeout=busy_timeout_ms / 1000,
+        cached_statements=cached_statements,
+    )
+    connection.row_factory = sqlite3.Row
+
+    # WAL lets readers proceed while a writer holds the lock; the journal
+    # mode is persistent, the rest are per-connection settings.
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL")
+    connection.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+    connection.execute(f"PRAGMA cache_size = -{int(cache_size_kb)}")
+    connection.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+
+    return connection
+
+
+def get_connection(db_path, **settings):
+    """
+    Return this thread's pooled connection to db_path, opening it on first use.
+    """
+    connections = getattr(_pool, "connections", None)
+    if connections is None:
+        connections = _pool.connections = {}
+
+    connection = connections.get(db_path)
+    if connection is None:
+        connection = connections[db_path] = connect(db_path, **settings)
+    return connection
+
+
+def close_thread_connections():
+    """
+    Close every pooled connection owned by the calling thread.
+
+    Called by worker loops and CLI commands when they are done with the
+    database; the next get_connection() on the thread opens a fresh one.
+    """
+    connections = getattr(_pool, "connections", None) or {}
+    while connections:
+        _, connection = connections.popitem()
+        connection.close()
+
+
+def _settings_from_config(config):
+    return {
+        "busy_timeout_ms": config["SQLITE_BUSY_TIMEOUT_MS"],
+        "cache_size_kb": config["SQLITE_CACHE_SIZE_KB"],
+        "mmap_size": config["SQLITE_MMAP_SIZE"],
+        "cached_statements": config["SQLITE_CACHED_STATEMENTS"],
+    }
+
+
+def get_db():
+    """
+    Return the connection bound to the current request.
+
+    The first call in a request borrows the thread's pooled connection for
+    app.config["DB_PATH"]; later calls in the same request reuse it.
+    """
+    if "db" not in g:
+        config = current_app.config
+        g.db = get_connection(config["DB_PATH"], **_settings_from_config(config))
+    return g.db
+
+
+def release_db(exception=None):
+    """
+    Teardown handler: return the request's connection to the pool.
+
+    Anything the route left uncommitted (early return, exception) is rolled
+    back so the next request on this thread starts from a clean state and no
+    write lock outlives the request.
+    """
+    connection = g.pop("db", None)
+    if connection is not None and connection.in_transaction:
+        connection.rollback()
+
+
+def init_app(app):
+    """Register config defaults and the teardown handler on app."""
+    for key, value in DEFAULT_SETTINGS.items():
+        app.config.setdefault(key, value)
+    app.teardown_appcontext(release_db)
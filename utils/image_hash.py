@@ -0,0 +1,117 @@
+"""
+Perceptual hashing for near-duplicate certificate detection.
+
+dHash shrinks an image to a tiny grayscale grid and records whether each
+pixel is brighter than its right-hand neighbour. Re-scans, re-compression
+and small crops change only a few of those bits, so two copies of the same
+certificate land within a small Hamming distance of each other even though
+their SHA-256 differs completely.
+
+BKTree indexes hashes by Hamming distance so a lookup only visits the
+branches that can contain a match instead of every stored hash.
+"""
+
+from PIL import Image
+
+
+HASH_SIZE = 8
+
+
+def dhash(source, hash_size=HASH_SIZE):
+    """
+    Difference hash of an image.
+
+    Args:
+        source: File path, file object or PIL.Image
+
+    Returns:
+        int: hash_size * hash_size bit perceptual hash
+    """
+    if not isinstance(source, Image.Image):
+        # Close the file straight away; backfills hash thousands of blobs
+        with Image.open(source) as image:
+            return dhash(image, hash_size)
+
+    image = source
+    # draft() lets JPEG decode straight at a reduced scale, which is most of the cost
+    image.draft("L", (hash_size * 8, hash_size * 8))
+    pixels = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS).tobytes()
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hash_to_hex(value, hash_size=HASH_SIZE):
+    return format(value, f"0{hash_size * hash_size // 4}x")
+
+
+def hex_to_hash(text):
+    return int(text, 16)
+
+
+def hamming_distance(a, b):
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over integer hashes with Hamming distance.
+
+    Each node keeps its children keyed by their distance to it. By the
+    triangle inequality, a query within `radius` of the target only needs
+    the children whose key lies in [d - radius, d + radius].
+    """
+
+    def __init__(self):
+        self._root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, value, item):
+        """Index `item` (e.g. an achievement id) under hash `value`."""
+        self._size += 1
+        if self._root is None:
+            self._root = [value, [item], {}]
+            return
+
+        node = self._root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value, radius):
+        """
+        Items whose hash is within `radius` bits of `value`.
+
+        Returns:
+            list: (distance, item) pairs, closest first
+        """
+        if self._root is None:
+            return []
+
+        matches = []
+        stack = [self._root]
+        while stack:
+            node_value, items, children = stack.pop()
+            distance = hamming_distance(value, node_value)
+            if distance <= radius:
+                matches.extend((distance, item) for item in items)
+            for edge in range(max(distance - radius, 1), distance + radius + 1):
+                child = children.get(edge)
+                if child is not None:
+                    stack.append(child)
+        matches.sort(key=lambda match: match[0])
+        return matches
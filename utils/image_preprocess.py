@@ -0,0 +1,164 @@
+"""
+Certificate image preprocessing ahead of Tesseract.
+
+Scans and phone photos arrive at arbitrary resolution, slightly rotated and
+with uneven lighting. Every step here is a whole-array NumPy operation:
+
+- grayscale: one weighted sum over the RGB channels
+- box_mean: mean over a square window from an integral image, so the cost
+  per pixel is four lookups whatever the window size (unlike the per-pixel
+  loop in Expt_1.ipynb)
+- adaptive_binarize: threshold each pixel against its local mean, which
+  copes with shadows and gradients a single global threshold can't
+- estimate_skew / deskew: projection-profile search over small angles
+- downscale: resample to a target DPI, since Tesseract gains nothing past
+  ~300 DPI and its runtime grows with pixel count
+"""
+
+import numpy as np
+from PIL import Image
+
+
+# Bump when the pipeline changes so cached OCR text is recomputed
+PREPROCESS_VERSION = 1
+
+TARGET_DPI = 300
+# Long side of an A4 page at 300 DPI; used when the file carries no DPI
+MAX_LONG_SIDE = 3508
+
+
+def grayscale(image):
+    """
+    Luma (ITU-R BT.601) of a PIL image.
+
+    Returns:
+        numpy.ndarray: float32 array of shape (height, width), 0..255
+    """
+    if image.mode == "L":
+        return np.asarray(image, dtype=np.float32)
+    rgb = np.asarray(image.convert("RGB"), dtype=np.float32)
+    return rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def integral_image(array):
+    """Summed-area table with a leading row and column of zeros."""
+    table = np.zeros((array.shape[0] + 1, array.shape[1] + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(array, axis=0, dtype=np.float64), axis=1, out=table[1:, 1:])
+    return table
+
+
+def box_mean(array, size):
+    """
+    Mean over a size x size window centred on each pixel.
+
+    Windows are clipped at the borders and averaged over the pixels they
+    actually cover, so edges are not darkened by padding.
+    """
+    radius = size // 2
+    span = 2 * radius + 1
+    height, width = array.shape
+
+    # Edge-padding the summed-area table clamps every window to the image,
+    # so all four corners become plain slices rather than gathers
+    table = np.pad(integral_image(array), radius, mode="edge")
+    rows = table[span:span + height] - table[:height]
+    sums = rows[:, span:span + width] - rows[:, :width]
+
+    top = np.clip(np.arange(height) - radius, 0, height)
+    bottom = np.clip(np.arange(height) + radius + 1, 0, height)
+    left = np.clip(np.arange(width) - radius, 0, width)
+    right = np.clip(np.arange(width) + radius + 1, 0, width)
+    counts = np.outer(bottom - top, right - left)
+    return (sums / counts).astype(np.float32)
+
+
+def adaptive_binarize(gray, window=31, offset=10.0):
+    """
+    Black text on white: a pixel is ink if it is `offset` darker than the
+    mean of its surrounding window.
+
+    Returns:
+        numpy.ndarray: uint8 array of 0 (ink) and 255 (paper)
+    """
+    local_mean = box_mean(gray, window)
+    return np.where(gray < local_mean - offset, 0, 255).astype(np.uint8)
+
+
+def _best_projection(ys, xs, angles):
+    radians = np.deg2rad(angles)
+    # rows[i, k]: projected row of ink pixel k at candidate angle i
+    rows = np.rint(ys[None, :] * np.cos(radians)[:, None] - xs[None, :] * np.sin(radians)[:, None]).astype(np.int64)
+    rows -= rows.min(axis=1, keepdims=True)
+    length = int(rows.max()) + 1
+
+    offsets = np.arange(len(angles))[:, None] * length
+    profiles = np.bincount((rows + offsets).ravel(), minlength=len(angles) * length).reshape(len(angles), length)
+    return float(angles[np.argmax(profiles.var(axis=1))])
+
+
+def estimate_skew(binary, max_angle=5.0, step=0.25, sample_side=800, max_points=20000):
+    """
+    Rotation of the text lines in degrees, counter-clockwise positive.
+
+    For each candidate angle, ink pixels are projected onto rows rotated by
+    that angle; the angle matching the text gives the sharpest
+    (highest-variance) row histogram. Searched coarse (1 degree) then fine
+    (`step`) around the coarse best, on at most `max_points` ink pixels.
+    """
+    scale = min(1.0, sample_side / max(binary.shape))
+    if scale < 1.0:
+        sampled = Image.fromarray(binary).resize(
+            (max(1, int(binary.shape[1] * scale)), max(1, int(binary.shape[0] * scale))),
+            Image.Resampling.NEAREST
+        )
+        binary = np.asarray(sampled)
+
+    ys, xs = np.nonzero(binary == 0)
+    if len(ys) < 50:
+        return 0.0
+    stride = max(1, len(ys) // max_points)
+    ys, xs = ys[::stride], xs[::stride]
+
+    coarse = _best_projection(ys, xs, np.arange(-max_angle, max_angle + 0.5, 1.0))
+    fine = _best_projection(ys, xs, np.arange(coarse - 1.0, coarse + 1.0 + step / 2, step))
+    # Row projection at angle a levels text that was rotated by -a
+    return -fine
+
+
+def deskew(image, angle):
+    """Rotate a grayscale PIL image by -angle, filling the corners with white."""
+    if abs(angle) < 1e-6:
+        return image
+    return image.rotate(-angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=255)
+
+
+def downscale(image, target_dpi=TARGET_DPI, max_long_side=MAX_LONG_SIDE):
+    """Resample to target_dpi if the image declares a higher DPI, else cap its long side."""
+    dpi = image.info.get("dpi")
+    scale = 1.0
+    if dpi and dpi[0] and float(dpi[0]) > target_dpi:
+        scale = target_dpi / float(dpi[0])
+    elif max(image.size) > max_long_side:
+        scale = max_long_side / max(image.size)
+    if scale >= 1.0:
+        return image
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.Resampling.LANCZOS)
+
+
+def preprocess_for_ocr(image, window=31, offset=10.0):
+    """
+    Full pipeline: downscale, grayscale, deskew, adaptive binarization.
+
+    Returns:
+        PIL.Image.Image: Mode "L" black-on-white image for Tesseract
+    """
+    image = downscale(image)
+    gray = grayscale(image)
+
+    angle = estimate_skew(adaptive_binarize(gray, window, offset))
+    if angle:
+        rotated = deskew(Image.fromarray(np.clip(gray, 0, 255).astype(np.uint8)), angle)
+        gray = np.asarray(rotated, dtype=np.float32)
+
+    return Image.fromarray(adaptive_binarize(gray, window, offset))
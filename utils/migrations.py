@@ -0,0 +1,530 @@
+"""
+Versioned schema migrations.
+
+Each migration is registered with a version number and applied at most once,
+in order, inside its own write transaction. Applied versions are recorded in
+the schema_version table so startup only has to read a single integer when
+the database is already current.
+"""
+
+import sqlite3
+
+from utils.stats import check_system_counters, rebuild_teacher_stats
+
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register the decorated function as schema migration `version`."""
+    def decorator(func):
+        if any(existing[0] == version for existing in MIGRATIONS):
+            raise ValueError(f"Duplicate migration version: {version}")
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return func
+    return decorator
+
+
+def _column_names(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {row[1] for row in cursor.fetchall()}
+
+
+def _ensure_version_table(connection):
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    connection.commit()
+
+
+def current_version(connection):
+    """Return the highest applied migration version (0 for a fresh database)."""
+    _ensure_version_table(connection)
+    row = connection.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def pending_migrations(connection):
+    version = current_version(connection)
+    return [m for m in MIGRATIONS if m[0] > version]
+
+
+def run_migrations(connection):
+    """
+    Apply every pending migration in version order.
+
+    BEGIN IMMEDIATE serialises concurrent workers starting at the same time;
+    the version is re-checked under the lock so each migration runs once.
+
+    Returns:
+        list: (version, description) of the migrations applied by this call
+    """
+    applied = []
+    for version, description, func in pending_migrations(connection):
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            done = connection.execute(
+                "SELECT 1 FROM schema_version WHERE version = ?", (version,)
+            ).fetchone()
+            if not done:
+                func(connection.cursor())
+                connection.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                    (version, description),
+                )
+                applied.append((version, description))
+            connection.commit()
+        except sqlite3.Error:
+            connection.rollback()
+            raise
+    return applied
+
+
+# ==================== MIGRATIONS ====================
+
+@migration(1, "achievements: teacher_id, created_at, certificate_hash columns")
+def _achievements_legacy_columns(cursor):
+    column_names = _column_names(cursor, "achievements")
+
+    if "teacher_id" not in column_names:
+        cursor.execute("ALTER TABLE achievements ADD COLUMN teacher_id TEXT DEFAULT 'unknown'")
+
+    if "created_at" not in column_names:
+        cursor.execute("ALTER TABLE achievements ADD COLUMN created_at TEXT")
+        cursor.execute("UPDATE achievements SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+
+    if "certificate_hash" not in column_names:
+        cursor.execute("ALTER TABLE achievements ADD COLUMN certificate_hash TEXT")
+
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_cert_hash ON achievements (certificate_hash)")
+
+
+@migration(2, "student: profile_picture column")
+def _student_profile_picture(cursor):
+    if "profile_picture" not in _column_names(cursor, "student"):
+        cursor.execute("ALTER TABLE student ADD COLUMN profile_picture TEXT")
+
+
+@migration(3, "indexes for dashboard, listing and approval queries")
+def _hot_query_indexes(cursor):
+    # Per-teacher dashboard: counts, "recent entries" and this-week range
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_achievements_teacher_created ON achievements (teacher_id, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_achievements_teacher_date ON achievements (teacher_id, achievement_date)")
+    # Student-facing achievement views
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_achievements_student ON achievements (student_id, achievement_date)")
+    # Admin export ordered by date without a temp sort
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_achievements_date ON achievements (achievement_date)")
+    # Pending approvals and newest-first user listings
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_student_approved_created ON student (is_approved, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_teacher_approved_created ON teacher (is_approved, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_student_created ON student (created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_teacher_created ON teacher (created_at)")
+    # Department statistics and "department in use" checks
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_student_dept ON student (student_dept)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_teacher_dept ON teacher (teacher_dept)")
+
+
+@migration(4, "teacher_stats and teacher_student_counts maintained by triggers")
+def _teacher_stats(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS teacher_stats (
+            teacher_id TEXT PRIMARY KEY,
+            total_achievements INTEGER NOT NULL DEFAULT 0,
+            students_managed INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS teacher_student_counts (
+            teacher_id TEXT NOT NULL,
+            student_id TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (teacher_id, student_id)
+        )
+    """)
+
+    # Adding an achievement: bump the pair count first, then the teacher
+    # totals; the pair count reaching 1 means a newly managed student.
+    add_new = """
+        INSERT INTO teacher_student_counts (teacher_id, student_id, total)
+        VALUES (NEW.teacher_id, NEW.student_id, 1)
+        ON CONFLICT (teacher_id, student_id) DO UPDATE SET total = total + 1;
+        INSERT INTO teacher_stats (teacher_id, total_achievements, students_managed)
+        VALUES (NEW.teacher_id, 1, 1)
+        ON CONFLICT (teacher_id) DO UPDATE SET
+            total_achievements = total_achievements + 1,
+            students_managed = students_managed + (
+                SELECT total = 1 FROM teacher_student_counts
+                WHERE teacher_id = NEW.teacher_id AND student_id = NEW.student_id
+            );
+    """
+    # Removing one: the mirror image, dropping pairs that reach zero
+    remove_old = """
+        UPDATE teacher_student_counts SET total = total - 1
+        WHERE teacher_id = OLD.teacher_id AND student_id = OLD.student_id;
+        UPDATE teacher_stats SET
+            total_achievements = total_achievements - 1,
+            students_managed = students_managed - (
+                SELECT total <= 0 FROM teacher_student_counts
+                WHERE teacher_id = OLD.teacher_id AND student_id = OLD.student_id
+            )
+        WHERE teacher_id = OLD.teacher_id;
+        DELETE FROM teacher_student_counts
+        WHERE teacher_id = OLD.teacher_id AND student_id = OLD.student_id AND total <= 0;
+    """
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_teacher_stats_insert
+        AFTER INSERT ON achievements
+        BEGIN {add_new} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_teacher_stats_delete
+        AFTER DELETE ON achievements
+        BEGIN {remove_old} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_teacher_stats_update
+        AFTER UPDATE OF teacher_id, student_id ON achievements
+        WHEN OLD.teacher_id IS NOT NEW.teacher_id OR OLD.student_id IS NOT NEW.student_id
+        BEGIN {remove_old} {add_new} END
+    """)
+
+    rebuild_teacher_stats(cursor)
+
+
+@migration(5, "system_counters maintained by triggers")
+def _system_counters(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS system_counters (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_students INTEGER NOT NULL DEFAULT 0,
+            total_teachers INTEGER NOT NULL DEFAULT 0,
+            total_achievements INTEGER NOT NULL DEFAULT 0,
+            pending_student_approvals INTEGER NOT NULL DEFAULT 0,
+            pending_teacher_approvals INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+
+    # "x IS 0" rather than "x = 0" so a NULL is_approved counts as 0, not NULL.
+    # INSERT OR REPLACE only fires the delete triggers under recursive_triggers,
+    # which not every connection sets: write these tables with plain INSERT or
+    # ON CONFLICT DO UPDATE, never REPLACE.
+    for role in ("student", "teacher"):
+        total = f"total_{role}s"
+        pending = f"pending_{role}_approvals"
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_counters_{role}_insert
+            AFTER INSERT ON {role}
+            BEGIN
+                UPDATE system_counters SET
+                    {total} = {total} + 1,
+                    {pending} = {pending} + (NEW.is_approved IS 0)
+                WHERE id = 1;
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_counters_{role}_delete
+            AFTER DELETE ON {role}
+            BEGIN
+                UPDATE system_counters SET
+                    {total} = {total} - 1,
+                    {pending} = {pending} - (OLD.is_approved IS 0)
+                WHERE id = 1;
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_counters_{role}_approval
+            AFTER UPDATE OF is_approved ON {role}
+            BEGIN
+                UPDATE system_counters SET
+                    {pending} = {pending} + (NEW.is_approved IS 0) - (OLD.is_approved IS 0)
+                WHERE id = 1;
+            END
+        """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_counters_achievement_insert
+        AFTER INSERT ON achievements
+        BEGIN
+            UPDATE system_counters SET total_achievements = total_achievements + 1 WHERE id = 1;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_counters_achievement_delete
+        AFTER DELETE ON achievements
+        BEGIN
+            UPDATE system_counters SET total_achievements = total_achievements - 1 WHERE id = 1;
+        END
+    """)
+
+    check_system_counters(cursor, repair=True)
+
+
+@migration(6, "student/teacher created_at always set (keyset pagination key)")
+def _user_created_at(cursor):
+    # Older databases added created_at without a default, leaving NULLs that
+    # would fall outside every (created_at, rowid) keyset range.
+    for role in ("student", "teacher"):
+        cursor.execute(f"UPDATE {role} SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{role}_created_at
+            AFTER INSERT ON {role}
+            WHEN NEW.created_at IS NULL
+            BEGIN
+                UPDATE {role} SET created_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid;
+            END
+        """)
+
+
+@migration(7, "export_jobs table for background admin exports")
+def _export_jobs(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS export_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            export_type TEXT NOT NULL,
+            filters TEXT NOT NULL DEFAULT '{}',
+            format TEXT NOT NULL DEFAULT 'csv',
+            status TEXT NOT NULL DEFAULT 'queued'
+                CHECK (status IN ('queued', 'running', 'done', 'failed')),
+            rows_written INTEGER NOT NULL DEFAULT 0,
+            rows_total INTEGER,
+            file_path TEXT,
+            error TEXT,
+            requested_by TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    """)
+
+
+@migration(8, "ocr_jobs queue and OCR result columns on achievements")
+def _ocr_jobs(cursor):
+    columns = _column_names(cursor, "achievements")
+    for column in ("ocr_status", "ocr_text", "ocr_data"):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE achievements ADD COLUMN {column} TEXT")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ocr_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            achievement_id INTEGER NOT NULL REFERENCES achievements(id),
+            file_path TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued'
+                CHECK (status IN ('queued', 'running', 'done', 'failed')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    """)
+    # Workers claim the oldest queued job; the status endpoint looks up by achievement
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ocr_jobs_status ON ocr_jobs(status, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ocr_jobs_achievement ON ocr_jobs(achievement_id)")
+
+
+@migration(9, "blobs table for content-addressed certificate storage")
+def _blobs(cursor):
+    # One row per stored file. path is the certificate_path achievements use,
+    # so the refcount triggers can match on it directly.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS blobs (
+            path TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mime_type TEXT NOT NULL,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_blobs_sha256 ON blobs(sha256)")
+    # Garbage collection looks for unreferenced blobs
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_blobs_refcount ON blobs(refcount)")
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_blobs_achievement_insert
+        AFTER INSERT ON achievements
+        WHEN NEW.certificate_path IS NOT NULL
+        BEGIN
+            UPDATE blobs SET refcount = refcount + 1 WHERE path = NEW.certificate_path;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_blobs_achievement_delete
+        AFTER DELETE ON achievements
+        WHEN OLD.certificate_path IS NOT NULL
+        BEGIN
+            UPDATE blobs SET refcount = refcount - 1 WHERE path = OLD.certificate_path;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_blobs_achievement_update
+        AFTER UPDATE OF certificate_path ON achievements
+        WHEN OLD.certificate_path IS NOT NEW.certificate_path
+        BEGIN
+            UPDATE blobs SET refcount = refcount - 1 WHERE path = OLD.certificate_path;
+            UPDATE blobs SET refcount = refcount + 1 WHERE path = NEW.certificate_path;
+        END
+    """)
+
+
+@migration(10, "achievements: perceptual hash and near-duplicate flag")
+def _certificate_phash(cursor):
+    columns = _column_names(cursor, "achievements")
+    if "certificate_phash" not in columns:
+        cursor.execute("ALTER TABLE achievements ADD COLUMN certificate_phash TEXT")
+    if "near_duplicate_of" not in columns:
+        cursor.execute("ALTER TABLE achievements ADD COLUMN near_duplicate_of INTEGER")
+
+
+@migration(11, "ocr_results cache keyed by certificate SHA-256")
+def _ocr_results(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ocr_results (
+            sha256 TEXT PRIMARY KEY,
+            raw_text TEXT NOT NULL,
+            parsed_data TEXT,
+            engine_version TEXT NOT NULL,
+            duration_ms INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+@migration(12, "row_version and updated_at on achievements and student")
+def _row_versions(cursor):
+    # The public verification page derives its ETag from these, so a cheap
+    # lookup of two integers tells whether a cached copy is still current.
+    # Any UPDATE that leaves row_version alone bumps it; the trigger's own
+    # UPDATE changes row_version, so it does not fire again.
+    for table, key in (("achievements", "id"), ("student", "student_id")):
+        columns = _column_names(cursor, table)
+        if "row_version" not in columns:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN row_version INTEGER NOT NULL DEFAULT 1")
+        if "updated_at" not in columns:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN updated_at TIMESTAMP")
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_row_version
+            AFTER UPDATE ON {table}
+            WHEN NEW.row_version = OLD.row_version
+            BEGIN
+                UPDATE {table} SET row_version = OLD.row_version + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE {key} = NEW.{key};
+            END
+        """)
+
+
+@migration(13, "token_revocations for signed verification tokens")
+def _token_revocations(cursor):
+    # Only achievements whose signed fields were edited, or that were
+    # deleted, get a row, so verifiers can hold the whole table in memory.
+    # revision is the lowest still-valid token revision; NULL revokes every
+    # token. seq grows with every change, so verifiers fetch only new rows.
+    # Filling in a blank field (OCR results, certificate_hash backfills) is
+    # not an edit: no token ever showed the old value.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS token_revocations (
+            achievement_id INTEGER PRIMARY KEY,
+            revision INTEGER,
+            seq INTEGER NOT NULL,
+            revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_token_revocations_seq ON token_revocations (seq)")
+
+    next_seq = "(SELECT COALESCE(MAX(seq), 0) + 1 FROM token_revocations)"
+    upsert = f"""
+        ON CONFLICT(achievement_id) DO UPDATE
+        SET revision = revision + 1, seq = {next_seq}, revoked_at = CURRENT_TIMESTAMP
+    """
+
+    def edited(*columns):
+        return " OR ".join(f"(OLD.{c} IS NOT NEW.{c} AND COALESCE(OLD.{c}, '') <> '')" for c in columns)
+
+    achievement_columns = ("student_id", "achievement_type", "event_name", "position",
+                           "achievement_date", "organizer", "certificate_hash")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_achievements_token_revise
+        AFTER UPDATE OF {", ".join(achievement_columns)} ON achievements
+        WHEN {edited(*achievement_columns)}
+        BEGIN
+            INSERT INTO token_revocations (achievement_id, revision, seq) VALUES (NEW.id, 2, {next_seq})
+            {upsert};
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_student_token_revise
+        AFTER UPDATE OF student_name, student_dept ON student
+        WHEN {edited("student_name", "student_dept")}
+        BEGIN
+            INSERT INTO token_revocations (achievement_id, revision, seq)
+            SELECT id, 2, {next_seq} FROM achievements WHERE student_id = NEW.student_id
+            {upsert};
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_achievements_token_revoke
+        AFTER DELETE ON achievements
+        BEGIN
+            INSERT INTO token_revocations (achievement_id, revision, seq) VALUES (OLD.id, NULL, {next_seq})
+            ON CONFLICT(achievement_id) DO UPDATE
+            SET revision = NULL, seq = {next_seq}, revoked_at = CURRENT_TIMESTAMP;
+        END
+    """)
+
+
+@migration(14, "index_generations marker for the near-duplicate index")
+def _index_generations(cursor):
+    # The in-process BK-tree picks up new rows by id, but a certificate_phash
+    # filled in or changed on an existing row (backfill-phash) has no new
+    # id. Bumping a generation lets every process notice and rebuild.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS index_generations (
+            name TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO index_generations (name, generation) VALUES ('certificate_phash', 0)")
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_achievements_phash_generation
+        AFTER UPDATE OF certificate_phash ON achievements
+        WHEN OLD.certificate_phash IS NOT NEW.certificate_phash
+        BEGIN
+            UPDATE index_generations SET generation = generation + 1 WHERE name = 'certificate_phash';
+        END
+    """)
+
+
+@migration(15, "ocr_jobs.not_before for retry backoff")
+def _ocr_jobs_not_before(cursor):
+    # A failed job waits out an exponential backoff before it can be claimed again
+    if "not_before" not in _column_names(cursor, "ocr_jobs"):
+        cursor.execute("ALTER TABLE ocr_jobs ADD COLUMN not_before TIMESTAMP")
+
+
+@migration(16, "export_jobs owner and heartbeat")
+def _export_jobs_heartbeat(cursor):
+    # The owning process and the last time its worker made progress, so a
+    # job lost with its process can be told apart from one still running
+    columns = _column_names(cursor, "export_jobs")
+    if "owner" not in columns:
+        cursor.execute("ALTER TABLE export_jobs ADD COLUMN owner TEXT")
+    if "heartbeat_at" not in columns:
+        cursor.execute("ALTER TABLE export_jobs ADD COLUMN heartbeat_at TIMESTAMP")
+
+
+@migration(17, "name indexes so student/teacher exports stream without a sort")
+def _export_name_indexes(cursor):
+    # Exports are ordered by name; walking an index emits the first row at
+    # once instead of sorting the whole table in a temp B-tree first
+    for role in ("student", "teacher"):
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{role}_name ON {role} ({role}_name)")
+        # Department-filtered exports; also covers the department statistics
+        # and "department in use" checks, so the single-column index goes
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{role}_dept_name ON {role} ({role}_dept, {role}_name)")
+        cursor.execute(f"DROP INDEX IF EXISTS idx_{role}_dept")
@@ -0,0 +1,127 @@
+"""
+Keyset (cursor) pagination for list views.
+
+Pages are addressed by the sort key of their boundary rows rather than by
+OFFSET, so fetching page 1000 costs the same index seek as page 1. Cursors
+are opaque URL-safe tokens wrapping those key values.
+"""
+
+import base64
+import json
+from collections import namedtuple
+
+from flask import request, url_for
+
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+Page = namedtuple("Page", ["rows", "next_cursor", "prev_cursor"])
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token, size):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Returns:
+        list: The key values, or None if the token is malformed or has the
+              wrong number of keys (treated as "start from the first page")
+    """
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Parse a ?limit= argument, clamped to 1..maximum."""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+def paginate(cursor, query, params, keys, after=None, before=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Fetch one newest-first page of `query`.
+
+    Args:
+        cursor: sqlite3 cursor
+        query (str): SELECT ... FROM ... WHERE ... (no ORDER BY / LIMIT);
+                     the keyset condition is appended with AND
+        params (list): Parameters for query
+        keys (list): (sql_expression, result_column) pairs forming a unique
+                     sort key, most significant first, e.g.
+                     [("a.achievement_date", "achievement_date"), ("a.id", "id")]
+        after (str): Cursor of the last row of the previous page (go forward)
+        before (str): Cursor of the first row of the next page (go back)
+        limit (int): Page size
+
+    Returns:
+        Page: rows in descending key order plus next/prev cursors (None at the ends)
+    """
+    expressions = ", ".join(expr for expr, _ in keys)
+    placeholders = ", ".join("?" for _ in keys)
+    params = list(params)
+
+    after_values = decode_cursor(after, len(keys))
+    before_values = decode_cursor(before, len(keys)) if after_values is None else None
+
+    if before_values is not None:
+        # Walk backwards in ascending order, then flip the page around
+        query += f" AND ({expressions}) > ({placeholders})"
+        params += before_values
+        direction = "ASC"
+    else:
+        if after_values is not None:
+            query += f" AND ({expressions}) < ({placeholders})"
+            params += after_values
+        direction = "DESC"
+
+    order_by = ", ".join(f"{expr} {direction}" for expr, _ in keys)
+    cursor.execute(f"{query} ORDER BY {order_by} LIMIT ?", params + [limit + 1])
+    rows = cursor.fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if before_values is not None:
+        rows.reverse()
+
+    def key_of(row):
+        return encode_cursor(row[column] for _, column in keys)
+
+    if not rows:
+        return Page(rows, None, None)
+
+    if before_values is not None:
+        next_cursor = key_of(rows[-1])
+        prev_cursor = key_of(rows[0]) if has_more else None
+    else:
+        next_cursor = key_of(rows[-1]) if has_more else None
+        prev_cursor = key_of(rows[0]) if after_values is not None else None
+
+    return Page(rows, next_cursor, prev_cursor)
+
+
+def page_url(**changes):
+    """
+    URL for the current endpoint with the query string updated.
+
+    Paging cursors are dropped first so a link to one page never carries the
+    other direction's cursor along.
+    """
+    args = {k: v for k, v in request.args.items() if k not in ("after", "before")}
+    args.update({k: v for k, v in changes.items() if v is not None})
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
@@ -1,11 +1,24 @@
 """
 QR Code generation utility for achievement verification links.
 Converts achievement verification URLs into scannable QR codes.
+
+A QR image depends only on the URL it encodes, so rendered PNGs are cached
+twice: a bounded in-process LRU, and a folder on disk keyed by the SHA-256
+of the URL that survives restarts and is shared between worker processes.
 """
 
 import qrcode
 import io
 import base64
+import hashlib
+import os
+import tempfile
+from functools import lru_cache
+
+
+# Bump when the rendering parameters change so cached images are replaced
+QR_VERSION = 1
+MEMORY_CACHE_SIZE = 512
 
 
 def generate_qr_code(verification_url):
@@ -19,6 +32,17 @@ def generate_qr_code(verification_url):
     Returns:
         str: Base64 encoded PNG image of the QR code
     
+    Raises:
+        ValueError: If URL is empty or invalid
+    """
+    img_base64 = base64.b64encode(render_qr_png(verification_url)).decode("utf-8")
+    return f"data:image/png;base64,{img_base64}"
+
+
+def render_qr_png(verification_url):
+    """
+    Render the QR code for a URL as PNG bytes (uncached).
+
     Raises:
         ValueError: If URL is empty or invalid
     """
@@ -44,17 +68,48 @@ def generate_qr_code(verification_url):
         # Convert image to bytes
         img_buffer = io.BytesIO()
         img.save(img_buffer, format="PNG")
-        img_buffer.seek(0)
-        
-        # Encode to Base64
-        img_base64 = base64.b64encode(img_buffer.getvalue()).decode("utf-8")
-        
-        return f"data:image/png;base64,{img_base64}"
+        return img_buffer.getvalue()
         
     except Exception as e:
         raise ValueError(f"Failed to generate QR code: {str(e)}")
 
 
+def qr_cache_key(verification_url):
+    """Name of a URL's cached image: SHA-256 of the URL and QR_VERSION."""
+    return hashlib.sha256(f"{QR_VERSION}:{verification_url}".encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=MEMORY_CACHE_SIZE)
+def get_qr_png(verification_url, cache_dir=None):
+    """
+    PNG bytes of the QR code for a URL, rendered at most once.
+
+    Looks in the in-process LRU, then in cache_dir (if given), and only then
+    renders, writing the result to cache_dir atomically.
+
+    Returns:
+        tuple: (png bytes, strong ETag value: the cache key)
+    """
+    key = qr_cache_key(verification_url)
+    if cache_dir is None:
+        return render_qr_png(verification_url), key
+
+    path = os.path.join(cache_dir, key[:2], f"{key}.png")
+    try:
+        with open(path, "rb") as f:
+            return f.read(), key
+    except FileNotFoundError:
+        pass
+
+    png = render_qr_png(verification_url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    with os.fdopen(fd, "wb") as f:
+        f.write(png)
+    os.replace(temp_path, path)
+    return png, key
+
+
 def get_verification_url(request_host, achievement_id):
     """
     Helper function to construct the verification URL.
@@ -67,8 +122,25 @@ def get_verification_url(request_host, achievement_id):
     Returns:
         str: Complete verification URL
     """
+    verification_url = f"{_base_url(request_host)}/verify-achievement/{achievement_id}"
+    return verification_url
+
+
+def get_token_verification_url(request_host, token):
+    """
+    URL of the signed-token verification page, which is what QR codes encode.
+
+    Args:
+        request_host (str): Request host (e.g., "localhost:5000")
+        token (str): From utils.verification_token.make_token
+
+    Returns:
+        str: Complete verification URL
+    """
+    return f"{_base_url(request_host)}/verify/{token}"
+
+
+def _base_url(request_host):
     # Determine scheme (HTTPS in production, HTTP in dev)
     scheme = "https" if "localhost" not in request_host else "http"
-    
-    verification_url = f"{scheme}://{request_host}/verify-achievement/{achievement_id}"
-    return verification_url
+    return f"{scheme}://{request_host}"
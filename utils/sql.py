@@ -0,0 +1,30 @@
+"""
+Helpers for batched SQL lookups.
+
+Checking many keys at once is done with IN (...) lists rather than one
+query per key; these split the keys into chunks that stay under SQLite's
+bound-parameter limit.
+"""
+
+
+# Bound parameters per IN (...) lookup, well under SQLite's limit
+LOOKUP_CHUNK = 500
+
+
+def chunks(items, size=LOOKUP_CHUNK):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def select_existing(connection, query, values):
+    """
+    Subset of `values` returned by `query`, run once per chunk.
+
+    `query` selects one column and has a single {placeholders} IN list.
+    """
+    found = set()
+    for chunk in chunks(values):
+        sql = query.format(placeholders=", ".join("?" * len(chunk)))
+        found.update(row[0] for row in connection.execute(sql, chunk))
+    return found
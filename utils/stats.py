@@ -0,0 +1,84 @@
+"""
+Materialized statistics kept in step with the achievements table.
+
+The tables and the triggers that maintain them are created by the schema
+migrations; this module holds the from-scratch rebuilds used to backfill
+them and to repair them if they ever drift.
+"""
+
+
+def rebuild_teacher_stats(connection):
+    """
+    Recompute teacher_stats and teacher_student_counts from achievements.
+
+    Runs inside the caller's transaction and does not commit.
+
+    Returns:
+        int: Number of teachers with at least one achievement
+    """
+    connection.execute("DELETE FROM teacher_student_counts")
+    connection.execute("DELETE FROM teacher_stats")
+    connection.execute("""
+        INSERT INTO teacher_student_counts (teacher_id, student_id, total)
+        SELECT teacher_id, student_id, COUNT(*)
+        FROM achievements
+        GROUP BY teacher_id, student_id
+    """)
+    connection.execute("""
+        INSERT INTO teacher_stats (teacher_id, total_achievements, students_managed)
+        SELECT teacher_id, SUM(total), COUNT(*)
+        FROM teacher_student_counts
+        GROUP BY teacher_id
+    """)
+    return connection.execute("SELECT COUNT(*) FROM teacher_stats").fetchone()[0]
+
+
+# Exact values for each system_counters column
+SYSTEM_COUNTER_QUERIES = {
+    "total_students": "SELECT COUNT(*) FROM student",
+    "total_teachers": "SELECT COUNT(*) FROM teacher",
+    "total_achievements": "SELECT COUNT(*) FROM achievements",
+    "pending_student_approvals": "SELECT COUNT(*) FROM student WHERE is_approved = 0",
+    "pending_teacher_approvals": "SELECT COUNT(*) FROM teacher WHERE is_approved = 0",
+}
+
+
+def count_system_totals(connection):
+    """Compute the system_counters values directly from the base tables."""
+    return {
+        name: connection.execute(query).fetchone()[0]
+        for name, query in SYSTEM_COUNTER_QUERIES.items()
+    }
+
+
+def check_system_counters(connection, repair=False):
+    """
+    Compare system_counters against the base tables.
+
+    Args:
+        repair (bool): Overwrite drifted counters with the recounted values.
+                       Runs inside the caller's transaction and does not commit.
+
+    Returns:
+        dict: {counter: (stored, actual)} for every counter that drifted
+    """
+    actual = count_system_totals(connection)
+    columns = ", ".join(actual)
+    row = connection.execute(f"SELECT {columns} FROM system_counters WHERE id = 1").fetchone()
+    stored = dict(zip(actual, row)) if row else dict.fromkeys(actual)
+
+    drift = {
+        name: (stored[name], actual[name])
+        for name in actual
+        if stored[name] != actual[name]
+    }
+
+    if repair and drift:
+        placeholders = ", ".join("?" for _ in actual)
+        updates = ", ".join(f"{name} = excluded.{name}" for name in actual)
+        connection.execute(
+            f"INSERT INTO system_counters (id, {columns}) VALUES (1, {placeholders}) "
+            f"ON CONFLICT(id) DO UPDATE SET {updates}",
+            tuple(actual.values()),
+        )
+    return drift
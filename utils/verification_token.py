@@ -0,0 +1,107 @@
+"""
+Signed verification tokens carried by achievement QR codes.
+
+A token holds the fields shown on the public verification page, signed with
+HMAC (itsdangerous), so /verify/<token> can render without reading the
+achievements or student tables and the URL does not expose a guessable id
+on its own. Tokens carry no timestamp: the same record always yields the
+same token, which keeps the QR and export card caches valid.
+
+Editing a signed field (or deleting the achievement) is recorded by
+triggers in the small token_revocations table. Each token carries the
+revision it was issued at; a token below the current revision is stale,
+and every token of a deleted achievement is revoked. Verifiers keep an
+in-memory copy of that table, topped up with new rows every few seconds.
+"""
+
+import time
+
+from itsdangerous import BadData, URLSafeSerializer
+
+
+TOKEN_SALT = "achievement-verification"
+# Order of the signed payload; positional to keep the QR code small
+TOKEN_FIELDS = (
+    "id", "revision", "student_id", "student_name", "student_dept", "achievement_type",
+    "event_name", "position", "achievement_date", "organizer", "certificate_hash", "created_at",
+)
+# Enough of the SHA-256 to match a certificate file against
+HASH_PREFIX = 16
+
+VALID, STALE, REVOKED = "valid", "stale", "revoked"
+
+
+def _serializer(secret):
+    return URLSafeSerializer(secret, salt=TOKEN_SALT)
+
+
+def make_token(secret, achievement):
+    """
+    Sign an achievement's verification fields.
+
+    Args:
+        achievement (dict): The TOKEN_FIELDS columns; revision defaults to 1
+
+    Returns:
+        str: URL-safe token
+    """
+    claims = dict(achievement)
+    claims["revision"] = claims.get("revision") or 1
+    if claims.get("certificate_hash"):
+        claims["certificate_hash"] = claims["certificate_hash"][:HASH_PREFIX]
+    if claims.get("created_at"):
+        claims["created_at"] = str(claims["created_at"])[:10]
+    return _serializer(secret).dumps([claims.get(field) for field in TOKEN_FIELDS])
+
+
+def read_token(secret, token):
+    """
+    Check a token's signature and unpack it.
+
+    Raises:
+        ValueError: If the token is malformed or not signed with `secret`
+
+    Returns:
+        dict: TOKEN_FIELDS to their signed values
+    """
+    try:
+        values = _serializer(secret).loads(token)
+    except BadData:
+        raise ValueError("Invalid verification token")
+    if not isinstance(values, list) or len(values) != len(TOKEN_FIELDS):
+        raise ValueError("Invalid verification token")
+    return dict(zip(TOKEN_FIELDS, values))
+
+
+class RevocationSet:
+    """
+    In-memory copy of token_revocations. Every max_age seconds it fetches
+    the rows whose seq is above the highest one seen, not the whole table.
+    """
+
+    def __init__(self):
+        self._revisions = {}
+        self._seq = 0
+        self._checked_at = None
+
+    def _refresh(self, connection, max_age):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < max_age:
+            return
+        rows = connection.execute(
+            "SELECT achievement_id, revision, seq FROM token_revocations WHERE seq > ? ORDER BY seq",
+            (self._seq,)).fetchall()
+        for achievement_id, revision, seq in rows:
+            self._revisions[achievement_id] = revision
+            self._seq = seq
+        self._checked_at = now
+
+    def status(self, connection, claims, max_age):
+        """VALID, STALE (the record changed since signing) or REVOKED (deleted)."""
+        self._refresh(connection, max_age)
+        if claims["id"] not in self._revisions:
+            return VALID
+        revision = self._revisions[claims["id"]]
+        if revision is None:
+            return REVOKED
+        return VALID if claims["revision"] >= revision else STALE